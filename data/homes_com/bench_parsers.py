@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Benchmark / cross-check the Homes.com HTML parser backends.
+
+Runs parse_agents_from_search_html() and parse_license_number_from_profile_html()
+with the lxml backend and with the original BeautifulSoup code over the same
+pages, checks the AgentRecords (everything but scraped_at) and license numbers
+are identical, and reports pages/s for each.
+
+Pages come from fixture_server.py (every IL region, search pages 1..N plus the
+empty page after, and the profiles they link to), plus any saved pages passed
+with --html-dir (*.html; files with "profile" in the name are parsed as
+profiles, the rest as search pages).
+
+Usage
+  python data/homes_com/bench_parsers.py
+  python data/homes_com/bench_parsers.py --pages 5 --per-page 40 --repeat 3
+  python data/homes_com/bench_parsers.py --html-dir /tmp/homes_pages
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import sys
+import time
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+import fixture_server  # noqa: E402
+import scrape_agents  # noqa: E402
+
+
+def fixture_pages(max_pages: int, per_page: int) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """(search html, region) pairs and profile htmls, as the fixture server serves them."""
+    searches: List[Tuple[str, str]] = []
+    profiles: List[str] = []
+    for region in scrape_agents.IL_REGIONS_77:
+        slug = scrape_agents.slugify_city(region)
+        for page in range(1, max_pages + 2):
+            delay = 500 if page == 2 else 0  # some client-rendered pages (cards inside <template>)
+            html = fixture_server.search_page(slug, page, max_pages, per_page, render_delay_ms=delay)
+            searches.append((html, region))
+            if "agent-name" not in html:
+                break
+        for i in range(3):
+            _, href, _, _, _ = fixture_server._agent(slug, 1, i)
+            _, agent_slug, agent_id = href.strip("/").split("/")
+            profiles.append(fixture_server.profile_page(agent_slug, agent_id))
+    return searches, profiles
+
+
+def saved_pages(html_dir: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    searches: List[Tuple[str, str]] = []
+    profiles: List[str] = []
+    for path in sorted(glob.glob(os.path.join(html_dir, "*.html"))):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        if "profile" in os.path.basename(path):
+            profiles.append(html)
+        else:
+            searches.append((html, "Chicago, IL"))
+    return searches, profiles
+
+
+def _records(agents: List[Any]) -> List[Dict[str, Any]]:
+    out = []
+    for a in agents:
+        d = asdict(a)
+        d.pop("scraped_at")
+        out.append(d)
+    return out
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    best, result = float("inf"), None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=3, help="Fixture search pages per region.")
+    ap.add_argument("--per-page", type=int, default=20, help="Fixture agent cards per search page.")
+    ap.add_argument("--html-dir", help="Also parse saved pages from this directory.")
+    ap.add_argument("--repeat", type=int, default=1, help="Timing runs per backend (best is reported).")
+    args = ap.parse_args()
+
+    searches, profiles = fixture_pages(args.pages, args.per_page)
+    if args.html_dir:
+        more_s, more_p = saved_pages(args.html_dir)
+        searches += more_s
+        profiles += more_p
+    mb = (sum(len(h) for h, _ in searches) + sum(len(h) for h in profiles)) / 1e6
+    print(f"{len(searches)} search pages, {len(profiles)} profile pages ({mb:.1f} MB)")
+
+    def run_search(parse: Callable[[str, str], List[Any]]) -> List[List[Dict[str, Any]]]:
+        return [_records(parse(html, region)) for html, region in searches]
+
+    def run_profiles(parse: Callable[[str], Any]) -> List[Any]:
+        return [parse(html) for html in profiles]
+
+    failures = 0
+    cases = [
+        ("search", lambda: run_search(scrape_agents.parse_agents_from_search_html_bs4),
+         lambda: run_search(scrape_agents.parse_agents_from_search_html), len(searches)),
+        ("profile", lambda: run_profiles(scrape_agents.parse_license_number_from_profile_html_bs4),
+         lambda: run_profiles(scrape_agents.parse_license_number_from_profile_html), len(profiles)),
+    ]
+    for label, ref_fn, fast_fn, n in cases:
+        if not n:
+            continue
+        t_ref, ref = timed(ref_fn, args.repeat)
+        t_fast, fast = timed(fast_fn, args.repeat)
+        same = ref == fast
+        if not same:
+            failures += 1
+            i = next(i for i, (a, b) in enumerate(zip(ref, fast)) if a != b)
+            print(f"  MISMATCH on {label} page {i}:\n    bs4:  {ref[i]}\n    lxml: {fast[i]}")
+        found = sum(len(x) for x in ref) if label == "search" else sum(1 for x in ref if x)
+        print(
+            f"  {label:<8} bs4 {t_ref:6.2f}s ({n / t_ref:7.0f} pages/s) | lxml {t_fast:6.2f}s "
+            f"({n / t_fast:7.0f} pages/s) | {t_ref / t_fast:4.1f}x | {found} found | identical={same}"
+        )
+
+    print("OK" if not failures else f"{failures} mismatch(es)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
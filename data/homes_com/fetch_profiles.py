@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""Profile stage: visit Homes.com agent profiles for license numbers.
+
+Reads the agents the crawl (scrape_agents.py) has checkpointed in
+il_agents_pages.jsonl and, for each one without a license number whose
+profile hasn't been visited yet, loads `page_url` and parses the license.
+
+- pacing: by default one tab with the crawl's 3.5-6.5s random gap between
+  navigations; --concurrency N opts into N tabs in one browser (async
+  Playwright), still sharing one per-host --min-interval..--max-interval gap
+- browser profile: the crawl's own (.playwright-profile, worker 0, with its
+  cookies) unless a running crawl holds it; then .playwright-profile-profiles
+- HTML cache by URL (profile_cache.sqlite, zlib-compressed): a rerun, or a
+  --recheck after a parser fix, re-parses cached pages without a visit.
+  HOMES_COM_PROFILE_CACHE=off bypasses it, or set it to a path to move it.
+- every result is appended to il_agents_licenses.jsonl as it comes in (a
+  profile with no license is recorded too, so it isn't visited again)
+
+The stage only appends to its own log, so it can run while the crawl is
+still going, be killed, and be restarted; it picks up whatever is pending.
+il_agents.json is rebuilt from both logs at the end (or on a crash).
+
+Usage
+  python data/homes_com/fetch_profiles.py
+  python data/homes_com/fetch_profiles.py --concurrency 3 --min-interval 2 --max-interval 4
+  python data/homes_com/fetch_profiles.py --recheck        # retry profiles where no license was found
+
+Against the local fixture server (see fixture_server.py)
+  python data/homes_com/fetch_profiles.py --headless --channel "" --min-interval 0 --max-interval 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import async_playwright
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import scrape_agents as sa  # noqa: E402
+from page_store import PageStore  # noqa: E402
+
+CACHE_FILE = os.environ.get("HOMES_COM_PROFILE_CACHE") or os.path.join(sa.DATA_DIR, "profile_cache.sqlite")
+# Used only while a crawl holds worker 0's profile (sa.profile_dir_for(0)).
+PROFILE_DIR = os.path.join(sa.DATA_DIR, ".playwright-profile-profiles")
+
+DEFAULT_CONCURRENCY = 1
+DEFAULT_MIN_INTERVAL_S = sa.MIN_INTERVAL_S
+DEFAULT_MAX_INTERVAL_S = sa.MAX_INTERVAL_S
+DEFAULT_CACHE_MAX_AGE_S = 90 * 24 * 3600
+
+# Give up once this many profiles in a row come back with the Akamai block page.
+MAX_CONSECUTIVE_BLOCKS = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url        TEXT PRIMARY KEY,
+    body       BLOB NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+class HtmlCache:
+    """Profile HTML by URL, in one SQLite file."""
+
+    def __init__(self, path: str = CACHE_FILE, max_age_s: float = DEFAULT_CACHE_MAX_AGE_S) -> None:
+        self.path = path
+        self.max_age_s = max_age_s
+        self.enabled = path.lower() not in ("off", "0", "none")
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def get(self, url: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        row = self.db.execute("SELECT body, fetched_at FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None or time.time() - row[1] > self.max_age_s:
+            return None
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def put(self, url: str, html: str) -> None:
+        if not self.enabled:
+            return
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO pages (url, body, fetched_at) VALUES (?, ?, ?)",
+                (url, zlib.compress(html.encode("utf-8")), time.time()),
+            )
+
+
+class HostRateLimiter:
+    """Async, per host: a random min_s..max_s gap between navigation starts.
+
+    Shared by every tab, so adding tabs overlaps page loads without raising
+    the request rate any one host sees.
+    """
+
+    def __init__(self, min_s: float = DEFAULT_MIN_INTERVAL_S, max_s: float = DEFAULT_MAX_INTERVAL_S) -> None:
+        self.min_s = min_s
+        self.max_s = max(min_s, max_s)
+        self._next: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def wait(self, url: str) -> None:
+        host = urlsplit(url).netloc
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            delay = self._next.get(host, 0.0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next[host] = time.monotonic() + random.uniform(self.min_s, self.max_s)
+
+
+async def _route_filter(route: Any) -> None:
+    if sa.is_blocked_request(route.request):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def wait_ready(page: Any, selector: str, timeout_ms: int = sa.READY_TIMEOUT_MS) -> str:
+    """Async twin of scrape_agents.wait_ready()."""
+    start = time.monotonic()
+    try:
+        await page.wait_for_selector(selector, state="attached", timeout=min(sa.FIRST_LOOK_MS, timeout_ms))
+        return sa.READY
+    except PlaywrightTimeoutError:
+        pass
+    remaining = max(1, int(timeout_ms - (time.monotonic() - start) * 1000))
+    try:
+        await page.wait_for_load_state("networkidle", timeout=remaining)
+        idle = True
+    except PlaywrightTimeoutError:
+        idle = False
+    if await page.query_selector(selector) is not None:
+        return sa.READY
+    return sa.SETTLED if idle else sa.TIMED_OUT
+
+
+def browser_profile_dir() -> str:
+    """Worker 0's profile (the crawl's session and cookies), or PROFILE_DIR while a crawl has it open."""
+    shared = sa.profile_dir_for(0)
+    if sa.profile_in_use(shared):
+        sa.log(f"  {os.path.basename(shared)} is in use (crawl running?); using {os.path.basename(PROFILE_DIR)}")
+        return PROFILE_DIR
+    return shared
+
+
+def pending_agents(store: PageStore, recheck: bool = False) -> List[Dict[str, Any]]:
+    """Agents with no license number whose profile hasn't been visited (or, with recheck, at all)."""
+    checked = set() if recheck else store.profiles_checked()
+    return [a for a in store.agents() if not a.get("license_number") and a["page_url"] not in checked]
+
+
+async def _fetch_all(
+    store: PageStore,
+    todo: List[Dict[str, Any]],
+    cache: HtmlCache,
+    limiter: HostRateLimiter,
+    concurrency: int,
+    headless: bool,
+    channel: Optional[str],
+    block_assets: bool,
+    ready_timeout_ms: int,
+) -> Dict[str, int]:
+    stats = {"cached": 0, "fetched": 0, "found": 0, "errors": 0, "blocked": 0}
+    blocks_in_a_row = 0
+    done = 0
+
+    def record(url: str, html: str) -> None:
+        nonlocal done
+        lic = sa.parse_license_number_from_profile_html(html)
+        store.record_license(url, lic)
+        if lic:
+            stats["found"] += 1
+        done += 1
+        if done % 50 == 0:
+            sa.log(f"  Profile progress: {done}/{len(todo)} ({stats['found']} licenses)")
+
+    # Cache hits need no browser at all.
+    misses: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    for a in todo:
+        html = cache.get(a["page_url"])
+        if html is None:
+            misses.put_nowait(a)
+        else:
+            stats["cached"] += 1
+            record(a["page_url"], html)
+    if misses.empty():
+        return stats
+
+    async def worker(page: Any) -> None:
+        nonlocal blocks_in_a_row
+        while blocks_in_a_row < MAX_CONSECUTIVE_BLOCKS:
+            try:
+                a = misses.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            url = a["page_url"]
+            await limiter.wait(url)
+            try:
+                await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+                await wait_ready(page, sa.PROFILE_READY_SELECTOR, ready_timeout_ms)
+                html = await page.content()
+            except Exception as e:
+                stats["errors"] += 1
+                sa.log(f"  ERROR profile {url}: {e}")
+                continue
+            if sa.is_access_denied(html):
+                stats["blocked"] += 1
+                blocks_in_a_row += 1
+                sa.log(f"  BLOCKED (Access Denied): {url}")
+                continue
+            blocks_in_a_row = 0
+            stats["fetched"] += 1
+            cache.put(url, html)
+            record(url, html)
+
+    n = max(1, min(concurrency, misses.qsize()))
+    profile_dir = browser_profile_dir()
+    os.makedirs(profile_dir, exist_ok=True)
+    async with async_playwright() as p:
+        context = await p.chromium.launch_persistent_context(**sa.context_options(profile_dir, headless, channel))
+        await context.add_init_script(sa.STEALTH_JS)
+        if block_assets:
+            await context.route("**/*", _route_filter)
+        try:
+            pages = [await context.new_page() for _ in range(n)]
+            await asyncio.gather(*(worker(pg) for pg in pages))
+        finally:
+            await context.close()
+    if blocks_in_a_row >= MAX_CONSECUTIVE_BLOCKS:
+        sa.log(f"  Stopped after {MAX_CONSECUTIVE_BLOCKS} blocked profiles in a row; rerun later to resume.")
+    return stats
+
+
+def fetch_licenses(
+    store: PageStore,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    min_interval_s: float = DEFAULT_MIN_INTERVAL_S,
+    max_interval_s: float = DEFAULT_MAX_INTERVAL_S,
+    headless: bool = False,
+    channel: Optional[str] = "chrome",
+    block_assets: bool = True,
+    ready_timeout_ms: int = sa.READY_TIMEOUT_MS,
+    recheck: bool = False,
+    limit: Optional[int] = None,
+    cache: Optional[HtmlCache] = None,
+) -> Dict[str, int]:
+    """Fetch and record license numbers for every pending agent. Returns counts."""
+    todo = pending_agents(store, recheck=recheck)
+    if limit is not None:
+        todo = todo[:limit]
+    sa.log(f"Fetching profiles for license numbers: {len(todo)} pending, concurrency={concurrency}")
+    if not todo:
+        return {}
+    cache = cache or HtmlCache()
+    limiter = HostRateLimiter(min_interval_s, max_interval_s)
+    t0 = time.monotonic()
+    try:
+        stats = asyncio.run(
+            _fetch_all(store, todo, cache, limiter, concurrency, headless, channel, block_assets, ready_timeout_ms)
+        )
+    finally:
+        cache.close()
+    dt = time.monotonic() - t0
+    sa.log(
+        f"Profiles: {stats['fetched']} fetched, {stats['cached']} from cache, {stats['found']} licenses, "
+        f"{stats['errors']} errors, {stats['blocked']} blocked in {dt:.0f}s"
+    )
+    return stats
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Tabs loading profiles at once (default: %(default)s).",
+    )
+    ap.add_argument(
+        "--min-interval",
+        type=float,
+        default=DEFAULT_MIN_INTERVAL_S,
+        help="Min seconds between navigations to one host (default: %(default)s).",
+    )
+    ap.add_argument(
+        "--max-interval",
+        type=float,
+        default=DEFAULT_MAX_INTERVAL_S,
+        help="Max seconds between navigations to one host (default: %(default)s).",
+    )
+    ap.add_argument("--headless", action="store_true", help="Headless browser (Homes.com itself blocks this).")
+    ap.add_argument(
+        "--channel",
+        default="chrome",
+        help='Browser channel; "" for Playwright\'s bundled Chromium (default: %(default)s).',
+    )
+    ap.add_argument(
+        "--ready-timeout",
+        type=float,
+        default=sa.READY_TIMEOUT_MS / 1000,
+        help="Max seconds to wait for a profile's content after navigation (default: %(default)s).",
+    )
+    ap.add_argument("--load-assets", action="store_true", help="Don't block images, fonts, media and analytics.")
+    ap.add_argument("--recheck", action="store_true", help="Also retry profiles where no license was found.")
+    ap.add_argument("--limit", type=int, help="Only this many profiles (e.g. for a trial run).")
+    ap.add_argument(
+        "--cache-max-age-days",
+        type=float,
+        default=DEFAULT_CACHE_MAX_AGE_S / 86400,
+        help="Re-download cached profiles older than this (default: %(default)s).",
+    )
+    args = ap.parse_args()
+
+    with open(sa.LOG_FILE, "a", encoding="utf-8") as f:
+        f.write(f"\n==== profiles {datetime.now().isoformat(timespec='seconds')} ====\n")
+
+    store = PageStore(sa.PAGES_LOG, sa.LICENSES_LOG)
+    try:
+        fetch_licenses(
+            store,
+            concurrency=args.concurrency,
+            min_interval_s=args.min_interval,
+            max_interval_s=args.max_interval,
+            headless=args.headless,
+            channel=args.channel,
+            block_assets=not args.load_assets,
+            ready_timeout_ms=int(args.ready_timeout * 1000),
+            recheck=args.recheck,
+            limit=args.limit,
+            cache=HtmlCache(CACHE_FILE, args.cache_max_age_days * 86400),
+        )
+    finally:
+        n = store.write_agents(sa.OUT_JSON)
+        sa.log(f"Wrote {n} agents -> {sa.OUT_JSON}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
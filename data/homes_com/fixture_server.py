@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Homes.com agent directory, for offline scrape runs.
+
+Serves deterministic pages in the markup parse_agents_from_search_html() and
+parse_license_number_from_profile_html() expect:
+
+- /real-estate-agents/<city>-il/ and /real-estate-agents/<city>-il/p<N>/
+  search pages with `--per-page` agent cards (plus a "featured" repeat of one
+  card on page 1, like the real site); each city has 1..`--pages` pages, then
+  an empty results page
+- /real-estate-agents/<agent-slug>/<id>/ profile pages, most with a license #
+- /static/site.css, /static/analytics.js and the agent photos, so asset
+  blocking shows up in the request log
+
+`--render-delay-ms N` leaves the agent list empty in the HTML and fills it
+from a script after N ms (like a client-rendered page), to exercise the
+scraper's readiness waits.
+
+Usage
+  python data/homes_com/fixture_server.py --port 8765 --pages 3 --latency-ms 300
+  python data/homes_com/scrape_agents.py --base-url http://127.0.0.1:8765 --headless --channel "" --workers 4
+
+`--access-denied CITY_SLUG` answers that city with the Akamai block page.
+Only stdlib is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import html
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Set, Tuple
+
+FIRST = ["James", "Maria", "Robert", "Linda", "Michael", "Patricia", "David", "Jennifer", "Daniel", "Ana",
+         "Kevin", "Susan", "Brian", "Karen", "Jose", "Nicole", "Thomas", "Emily", "Steven", "Grace"]
+LAST = ["Smith", "Garcia", "Johnson", "Nowak", "Williams", "Kowalski", "Brown", "O'Connor", "Lee", "Patel",
+        "Martinez", "Anderson", "Kim", "Rossi", "Nguyen", "Murphy", "Schmidt", "Lopez", "Wright", "Fischer"]
+COMPANIES = ["@properties Christie's International Real Estate", "Compass", "Coldwell Banker Realty",
+             "Baird & Warner", "Keller Williams Premier", "RE/MAX Suburban", "Redfin Corporation", ""]
+
+BLOCKED_HTML = (
+    "<html><head><title>Access Denied</title></head><body><h1>Access Denied</h1>"
+    "You don't have permission to access this server."
+    "<p>Reference: https://errors.edgesuite.net/18.abc</p></body></html>"
+)
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<link rel="stylesheet" href="/static/site.css">
+<style>.agent-card {{ display: flex; }} /* .agent-name {{}} */</style>
+<script>window.dataLayer = []; /* <li class="agent-card"><p class="agent-name">Not An Agent</p></li> */</script>
+<script src="/static/analytics.js" async></script>
+</head>
+<body>
+<!-- <li><span class="agent-name">Commented Out</span></li> -->
+<header><nav><ul><li><a href="/">Homes.com</a></li><li><a href="/real-estate-agents/">Find an Agent</a></li></ul></nav></header>
+<main>
+{body}
+</main>
+<footer><p>&copy; Homes.com fixture</p></footer>
+</body>
+</html>
+"""
+
+
+def _rng(*parts: object) -> random.Random:
+    return random.Random(zlib.crc32("|".join(map(str, parts)).encode("utf-8")))
+
+
+def _agent(city_slug: str, page: int, i: int) -> Tuple[str, str, str, str, str]:
+    r = _rng(city_slug, page, i)
+    first, last = r.choice(FIRST), r.choice(LAST)
+    name = f"{first} {r.choice('ABCDEFGHJKLMNPRSTW')}. {last}" if r.random() < 0.3 else f"{first} {last}"
+    agent_id = f"{zlib.crc32(f'{city_slug}/{page}/{i}'.encode()):08x}"
+    slug = "-".join(name.lower().replace(".", "").replace("'", "").split())
+    href = f"/real-estate-agents/{slug}/{agent_id}/"
+    phone = f"({r.randint(200, 999)}) {r.randint(200, 999)}-{r.randint(0, 9999):04d}" if r.random() < 0.9 else ""
+    return name, href, r.choice(COMPANIES), phone, f"/images/agents/{agent_id}.jpg"
+
+
+def _card(agent: Tuple[str, str, str, str, str], lazy_img: bool) -> str:
+    name, href, company, phone, photo = (html.escape(x) for x in agent)
+    img = f'<img data-src="{photo}" alt="">' if lazy_img else f'<img src="{photo}" alt="{name}">'
+    parts = [
+        '<li class="agent-card">',
+        f'  <a class="agent-photo" href="{href}">{img}</a>',
+        '  <div class="agent-info">',
+        f'    <p class="agent-name">{name}</p>',
+    ]
+    if company:
+        parts.append(f'    <p class="company">{company}</p>')
+    if phone:
+        parts.append(f'    <a class="phone" href="tel:{phone}">{phone}</a>')
+    parts += ["  </div>", "</li>"]
+    return "\n".join(parts)
+
+
+def search_page(city_slug: str, page: int, max_pages: int, per_page: int, render_delay_ms: int = 0) -> str:
+    n_pages = 1 + zlib.crc32(city_slug.encode("utf-8")) % max_pages
+    city = city_slug[: -len("-il")].replace("-", " ").title()
+    title = f"Real Estate Agents in {city}, IL"
+    if page > n_pages:
+        body = f'<h1>{title}</h1>\n<p class="no-results">No agents found.</p>'
+        return PAGE_TEMPLATE.format(title=html.escape(title), body=body)
+
+    agents = [_agent(city_slug, page, i) for i in range(per_page)]
+    cards = [_card(a, lazy_img=(i % 5 == 4)) for i, a in enumerate(agents)]
+    featured = ""
+    if page == 1 and agents:
+        featured = f'<section class="featured"><ul class="featured-agents">\n{_card(agents[0], False)}\n</ul></section>\n'
+    pager = " ".join(
+        f'<a href="/real-estate-agents/{city_slug}/{"" if p == 1 else f"p{p}/"}">{p}</a>' for p in range(1, n_pages + 1)
+    )
+    cards_html = "\n".join(cards)
+    if render_delay_ms:
+        listing = (
+            f'<ul class="agents-list"></ul>\n<template id="agent-cards">\n{cards_html}\n</template>\n'
+            "<script>setTimeout(function () {\n"
+            "  var t = document.getElementById('agent-cards');\n"
+            "  document.querySelector('.agents-list').innerHTML = t.innerHTML;\n"
+            f"  t.remove();\n}}, {render_delay_ms});</script>\n"
+        )
+        featured = ""
+    else:
+        listing = f'<ul class="agents-list">\n{cards_html}\n</ul>\n'
+    body = f'<h1>{html.escape(title)}</h1>\n{featured}{listing}<div class="pagination">{pager}</div>'
+    return PAGE_TEMPLATE.format(title=html.escape(title), body=body)
+
+
+def profile_page(agent_slug: str, agent_id: str) -> str:
+    r = _rng(agent_slug, agent_id)
+    name = agent_slug.replace("-", " ").title()
+    about = f"<p>{html.escape(name)} has helped Illinois buyers and sellers for {r.randint(1, 30)} years.</p>"
+    roll = r.random()
+    if roll < 0.6:
+        lic = f"<p class=\"license\">License # {r.randint(471000000, 475999999)}</p>"
+    elif roll < 0.8:
+        lic = f"<dl><dt>IL License</dt><dd>{r.randint(471000000, 475999999)}</dd></dl>"
+    else:
+        lic = ""
+    body = f'<h1 class="agent-name">{html.escape(name)}</h1>\n<section class="about">{about}\n{lic}</section>'
+    return PAGE_TEMPLATE.format(title=html.escape(f"{name} - Real Estate Agent"), body=body)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    server_version = "HomesFixture/1.0"
+    max_pages = 3
+    per_page = 20
+    latency_s = 0.0
+    render_delay_ms = 0
+    blocked: Set[str] = set()
+    quiet = False
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: str, content_type: str = "text/html; charset=utf-8") -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def route(self, path: str) -> Tuple[int, str, str]:
+        if path.startswith("/static/"):
+            kind = "text/css" if path.endswith(".css") else "application/javascript"
+            return 200, "/* fixture */", kind
+        if path.startswith("/images/"):
+            return 200, "", "image/jpeg"
+
+        parts = [p for p in path.split("?")[0].split("/") if p]
+        if len(parts) < 2 or parts[0] != "real-estate-agents":
+            return 404, "<html><body>Not found</body></html>", "text/html; charset=utf-8"
+
+        slug = parts[1]
+        page: Optional[int] = None
+        if len(parts) == 2:
+            page = 1
+        elif len(parts) == 3 and parts[2].startswith("p") and parts[2][1:].isdigit():
+            page = int(parts[2][1:])
+
+        if page is not None and slug.endswith("-il"):
+            if slug in self.blocked:
+                return 403, BLOCKED_HTML, "text/html; charset=utf-8"
+            body = search_page(slug, page, self.max_pages, self.per_page, self.render_delay_ms)
+            return 200, body, "text/html; charset=utf-8"
+        if len(parts) == 3:
+            return 200, profile_page(slug, parts[2]), "text/html; charset=utf-8"
+        return 404, "<html><body>Not found</body></html>", "text/html; charset=utf-8"
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        status, body, content_type = self.route(self.path)
+        self._send(status, body, content_type)
+
+
+def serve(
+    port: int = 8765,
+    host: str = "127.0.0.1",
+    pages: int = 3,
+    per_page: int = 20,
+    latency_ms: int = 0,
+    render_delay_ms: int = 0,
+    blocked: Optional[List[str]] = None,
+    quiet: bool = False,
+    background: bool = False,
+) -> ThreadingHTTPServer:
+    """Start the fixture server (in a daemon thread if `background`)."""
+    handler = type(
+        "Handler",
+        (FixtureHandler,),
+        {
+            "max_pages": max(1, pages),
+            "per_page": per_page,
+            "latency_s": latency_ms / 1000.0,
+            "render_delay_ms": render_delay_ms,
+            "blocked": set(blocked or ()),
+            "quiet": quiet,
+        },
+    )
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    if background:
+        threading.Thread(target=httpd.serve_forever, name="homes-fixture", daemon=True).start()
+    return httpd
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--pages", type=int, default=3, help="Max search pages per city (each city gets 1..N).")
+    ap.add_argument("--per-page", type=int, default=20, help="Agent cards per search page.")
+    ap.add_argument("--latency-ms", type=int, default=0, help="Delay added to every response.")
+    ap.add_argument("--render-delay-ms", type=int, default=0, help="Fill search results from JS after this delay.")
+    ap.add_argument("--access-denied", action="append", default=[], metavar="CITY_SLUG",
+                    help="Serve the Akamai block page for this city slug (e.g. naperville-il).")
+    ap.add_argument("--quiet", action="store_true", help="No per-request log lines.")
+    args = ap.parse_args()
+
+    httpd = serve(
+        args.port,
+        args.host,
+        args.pages,
+        args.per_page,
+        args.latency_ms,
+        args.render_delay_ms,
+        args.access_denied,
+        args.quiet,
+    )
+    print(f"Homes.com fixture on http://{args.host}:{args.port}/real-estate-agents/chicago-loop-il/", flush=True)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,20 @@ Usage
   python data/homes_com/match_agents_to_idfpr.py --test
 
   python data/homes_com/match_agents_to_idfpr.py --min-score 92
+
+Candidates are blocked per city on name tokens, their Soundex codes and the
+name with spaces dropped, so only IDFPR records sharing a (phonetic) name part
+are scored. Unless the best blocked candidate is a perfect 100, the whole city
+pool is then checked for a higher score with rapidfuzz's `process.extractOne`
+(cut off at the blocked score, so most of the pool is rejected early). A name
+the keys miss ("JamesKnapp" with a typo) still finds its record, and the result
+is the same as `--exhaustive`, which scores the whole pool in Python; `--verify`
+runs both and reports any agent where they disagree:
+  python data/homes_com/match_agents_to_idfpr.py --verify
+
+`--batch` groups agents by city and scores each agents x city-pool matrix with
+rapidfuzz's multi-threaded `process.cdist` (exhaustive, same results):
+  python data/homes_com/match_agents_to_idfpr.py --batch --workers -1
 """
 
 from __future__ import annotations
@@ -24,17 +38,24 @@ import argparse
 import json
 import os
 import re
+import sys
 from collections import defaultdict
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
-from rapidfuzz import fuzz
+import numpy as np
+from rapidfuzz import fuzz, process
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IDFPR_DIR = os.path.join(os.path.dirname(BASE_DIR), "idfpr")
 HOMES_JSON = os.path.join(BASE_DIR, "il_agents.json")
-IDFPR_JSON = os.path.join(os.path.dirname(BASE_DIR), "idfpr", "real_estate_broker_raw.json")
+IDFPR_JSON = os.path.join(IDFPR_DIR, "real_estate_broker_raw.json")
 OUT_JSON = os.path.join(BASE_DIR, "idfpr_homes_com_enrichment.json")
 
+sys.path.insert(0, IDFPR_DIR)
+from idfpr_roster import MATCH_FIELDS  # noqa: E402
+from roster_cache import load_roster  # noqa: E402
+
 
 def norm(s: str) -> str:
     s = s or ""
@@ -50,6 +71,105 @@ def full_name_idfpr(rec: dict) -> str:
     return " ".join(parts)
 
 
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def soundex(token: str) -> str:
+    """American Soundex of a normalized (lowercase a-z0-9) token."""
+    letters = [c for c in token if "a" <= c <= "z"]
+    if not letters:
+        return ""
+    out = [letters[0].upper()]
+    prev = _SOUNDEX_CODES.get(letters[0], "")
+    for c in letters[1:]:
+        code = _SOUNDEX_CODES.get(c, "")
+        if code and code != prev:
+            out.append(code)
+            if len(out) == 4:
+                break
+        if c not in "hw":
+            prev = code
+    return "".join(out).ljust(4, "0")
+
+
+def block_keys(normed_name: str) -> Set[str]:
+    """Blocking keys for a normalized name.
+
+    Each token, its Soundex code, and the code's digits alone (so a typo in the
+    first letter still lands in the same block). Single-letter tokens (middle
+    initials) are skipped; they would put most of a city into one block. The
+    whole name and each adjacent pair with the space dropped are keyed as
+    tokens too, so "jamesknapp" and "james knapp" share a block.
+    """
+    keys: Set[str] = set()
+    toks = normed_name.split()
+    if len(toks) > 1:
+        keys.add("t:" + "".join(toks))
+        keys.update("t:" + a + b for a, b in zip(toks, toks[1:]))
+    for tok in toks:
+        if len(tok) < 2:
+            continue
+        keys.add("t:" + tok)
+        code = soundex(tok)
+        if code:
+            keys.add("p:" + code)
+            if code[1:] != "000":
+                keys.add("d:" + code[1:])
+    return keys
+
+
+@dataclass
+class Candidate:
+    license_number: str
+    name: str
+    normed: str
+    city: str
+
+
+@dataclass
+class CityIndex:
+    """IDFPR records for one city, with names normalized once and blocked."""
+
+    candidates: List[Candidate] = field(default_factory=list)
+    normed: List[str] = field(default_factory=list)
+    blocks: Dict[str, List[int]] = field(default_factory=lambda: defaultdict(list))
+
+    def add(self, rec: dict) -> None:
+        name = full_name_idfpr(rec)
+        cand = Candidate(
+            license_number=str(rec.get("license_number")),
+            name=name,
+            normed=norm(name),
+            city=rec.get("city") or "",
+        )
+        pos = len(self.candidates)
+        self.candidates.append(cand)
+        self.normed.append(cand.normed)
+        for key in block_keys(cand.normed):
+            self.blocks[key].append(pos)
+
+    def lookup(self, normed_name: str) -> List[int]:
+        """Positions of candidates sharing a block key, in roster order."""
+        hits: Set[int] = set()
+        for key in block_keys(normed_name):
+            hits.update(self.blocks.get(key, ()))
+        return sorted(hits)
+
+
+def build_index(records: Iterable[dict]) -> Dict[str, CityIndex]:
+    index: Dict[str, CityIndex] = defaultdict(CityIndex)
+    for rec in records:
+        index[norm(rec.get("city") or "")].add(rec)
+    return index
+
+
 @dataclass
 class Match:
     score: float
@@ -58,42 +178,182 @@ class Match:
     idfpr_city: str
 
 
-def best_match(agent_name: str, city: str, idfpr_by_city: Dict[str, List[dict]]) -> Optional[Match]:
-    city_key = norm(city)
-    pool = idfpr_by_city.get(city_key, [])
-
-    if not pool:
+def _best_of(target: str, pool: List[Candidate], positions: Iterable[int]) -> Tuple[float, int]:
+    """Best score and its position (-1 if none); the first position wins a tie."""
+    best_score: float = -1.0
+    best_pos = -1
+    for pos in positions:
+        score = fuzz.token_sort_ratio(target, pool[pos].normed)
+        if score > best_score or (score == best_score and pos < best_pos):
+            best_score = score
+            best_pos = pos
+    return best_score, best_pos
+
+
+def best_match(
+    agent_name: str,
+    city: str,
+    idfpr_by_city: Dict[str, CityIndex],
+    exhaustive: bool = False,
+    min_score: float = 0.0,
+) -> Optional[Match]:
+    """Best-scoring IDFPR record in the agent's city (first one on a tie, in roster order).
+
+    With min_score, a blocked lookup may return a below-threshold best where
+    the exhaustive one finds a better (but still rejected) record; which
+    agents are accepted, and their matches, are the same either way.
+    """
+    city_index = idfpr_by_city.get(norm(city))
+
+    if not city_index or not city_index.candidates:
         return None
 
     target = norm(agent_name)
-    best: Optional[Match] = None
-
-    for rec in pool:
-        cand_name = norm(full_name_idfpr(rec))
-        score = fuzz.token_sort_ratio(target, cand_name)
-        if (best is None) or (score > best.score):
-            best = Match(
-                score=score,
-                idfpr_license=str(rec.get("license_number")),
-                idfpr_name=full_name_idfpr(rec),
-                idfpr_city=rec.get("city") or "",
-            )
+    pool = city_index.candidates
+    positions: Sequence[int] = range(len(pool)) if exhaustive else city_index.lookup(target)
+    best_score, best_pos = _best_of(target, pool, positions)
+    if not exhaustive and best_score < 100 and len(positions) < len(pool):
+        # A record the keys missed may still score higher (or tie earlier in the roster),
+        # but one under min_score is rejected anyway, so only look for hits above both.
+        # extractOne turns the cutoff into a whole edit distance, which can drop a hit
+        # scoring exactly best_score; cut off a little low and rescore the hit here.
+        hit = process.extractOne(
+            target, city_index.normed, scorer=fuzz.token_sort_ratio, score_cutoff=max(best_score - 0.01, min_score)
+        )
+        if hit is not None:
+            score = fuzz.token_sort_ratio(target, hit[0])
+            if score > best_score or (score == best_score and hit[2] < best_pos):
+                best_score, best_pos = score, hit[2]
+
+    if best_pos < 0:
+        return None
+    best_cand = pool[best_pos]
+
+    return Match(
+        score=best_score,
+        idfpr_license=best_cand.license_number,
+        idfpr_name=best_cand.name,
+        idfpr_city=best_cand.city,
+    )
+
+
+def batch_best_matches(
+    agents: List[dict],
+    idfpr_by_city: Dict[str, CityIndex],
+    min_score: float = 0.0,
+    workers: int = -1,
+    chunk_size: int = 256,
+) -> List[Optional[Match]]:
+    """best_match for many agents at once, one cdist call per city chunk.
+
+    Scores below `min_score` are cut off inside rapidfuzz, so agents whose best
+    candidate falls short come back as None. The matrix is uint8 (an eighth of
+    float64), which rounds scores to whole numbers, so only the columns holding
+    a row's rounded maximum are rescored exactly; the first exact maximum wins,
+    the same tie-break as the loop in best_match.
+    """
+    by_city: Dict[str, List[int]] = defaultdict(list)
+    for i, a in enumerate(agents):
+        by_city[norm(a.get("city") or "")].append(i)
+
+    out: List[Optional[Match]] = [None] * len(agents)
+
+    for city_key, positions in by_city.items():
+        city_index = idfpr_by_city.get(city_key)
+        if not city_index or not city_index.candidates:
+            continue
 
-    return best
+        for start in range(0, len(positions), chunk_size):
+            chunk = positions[start : start + chunk_size]
+            queries = [norm(agents[i].get("agent_name") or "") for i in chunk]
+            scores = process.cdist(
+                queries,
+                city_index.normed,
+                scorer=fuzz.token_sort_ratio,
+                score_cutoff=min_score,
+                dtype=np.uint8,
+                workers=workers,
+            )
+            row_max = scores.max(axis=1)
+            for row, agent_pos in enumerate(chunk):
+                if min_score > 0 and not row_max[row]:
+                    continue
+                score, col = -1.0, -1
+                for c in np.flatnonzero(scores[row] == row_max[row]):
+                    exact = fuzz.token_sort_ratio(queries[row], city_index.normed[c])
+                    if exact > score:
+                        score, col = exact, int(c)
+                if score < min_score:
+                    continue
+                cand = city_index.candidates[col]
+                out[agent_pos] = Match(
+                    score=score,
+                    idfpr_license=cand.license_number,
+                    idfpr_name=cand.name,
+                    idfpr_city=cand.city,
+                )
+
+    return out
+
+
+def match_all(
+    agents: List[dict], idfpr_by_city: Dict[str, CityIndex], exhaustive: bool = False, min_score: float = 0.0
+) -> List[Optional[Match]]:
+    return [
+        best_match(a.get("agent_name") or "", a.get("city") or "", idfpr_by_city, exhaustive, min_score)
+        for a in agents
+    ]
+
+
+def _accepted(m: Optional[Match], min_score: float) -> Optional[Tuple[str, float]]:
+    return (m.idfpr_license, m.score) if m and m.score >= min_score else None
+
+
+def verify(agents: List[dict], idfpr_by_city: Dict[str, CityIndex], min_score: float) -> int:
+    """Compare blocked and exhaustive matching at `min_score`. Returns the number of agents that differ."""
+    blocked = match_all(agents, idfpr_by_city, min_score=min_score)
+    full = match_all(agents, idfpr_by_city, exhaustive=True)
+    diffs = 0
+    for a, b, f in zip(agents, blocked, full):
+        mb, mf = _accepted(b, min_score), _accepted(f, min_score)
+        if mb != mf:
+            diffs += 1
+            if diffs <= 20:
+                print(f"  {a.get('agent_name')!r} ({a.get('city')}): blocked {mb} vs exhaustive {mf}")
+    print(f"Agents: {len(agents)} | blocked vs exhaustive differ on {diffs} at --min-score {min_score:g}")
+    return diffs
 
 
 def main() -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--min-score", type=float, default=92.0)
     ap.add_argument("--test", action="store_true", help="Only process first 200 Homes.com agents")
+    ap.add_argument(
+        "--exhaustive",
+        action="store_true",
+        help="Score every IDFPR record in the agent's city instead of the blocked candidates.",
+    )
+    ap.add_argument(
+        "--verify",
+        action="store_true",
+        help="Match with blocking and with --exhaustive and report agents whose match differs.",
+    )
+    ap.add_argument(
+        "--batch",
+        action="store_true",
+        help="Score agents city-by-city with rapidfuzz.process.cdist (multi-threaded).",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=-1,
+        help="Threads for --batch scoring (default: -1 = all cores).",
+    )
     args = ap.parse_args()
 
     homes_agents: List[dict] = json.load(open(HOMES_JSON, "r", encoding="utf-8"))
-    idfpr: List[dict] = json.load(open(IDFPR_JSON, "r", encoding="utf-8"))
-
-    idfpr_by_city: Dict[str, List[dict]] = defaultdict(list)
-    for rec in idfpr:
-        idfpr_by_city[norm(rec.get("city") or "")].append(rec)
+    # Columnar cache of the roster; rebuilt automatically when the JSON changes.
+    idfpr_by_city = build_index(load_roster(IDFPR_JSON).records(MATCH_FIELDS))
 
     if args.test:
         homes_agents = homes_agents[:200]
@@ -101,8 +361,15 @@ def main() -> None:
     enrichments: List[dict] = []
     misses = 0
 
-    for a in homes_agents:
-        m = best_match(a.get("agent_name") or "", a.get("city") or "", idfpr_by_city)
+    if args.verify:
+        raise SystemExit(1 if verify(homes_agents, idfpr_by_city, args.min_score) else 0)
+
+    if args.batch:
+        matches = batch_best_matches(homes_agents, idfpr_by_city, min_score=args.min_score, workers=args.workers)
+    else:
+        matches = match_all(homes_agents, idfpr_by_city, exhaustive=args.exhaustive, min_score=args.min_score)
+
+    for a, m in zip(homes_agents, matches):
         if not m or m.score < args.min_score:
             misses += 1
             continue
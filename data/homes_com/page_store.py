@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""page_store.py
+
+Append-only checkpoint log for the Homes.com crawl (scrape_agents.py).
+
+`il_agents_pages.jsonl` gets one line per finished search page:
+
+  {"kind": "page", "region": "Oak Park, IL", "page": 2, "url": "...", "ts": 1760000000.0,
+   "end": false, "agents": [{...AgentRecord...}, ...]}
+
+`end: true` marks the empty page after a region's last one, so a finished
+region is skipped without a browser visit. Only a page that plainly shows no
+results gets it; a page that failed to load is not recorded at all.
+
+Profile lookups (fetch_profiles.py) go to a second log, `il_agents_licenses.jsonl`:
+
+  {"kind": "license", "page_url": "...", "license_number": "471012345" | null, "ts": ...}
+
+Each stage only appends to its own file, so the crawl and the profile stage
+can run (and be restarted) independently, at the same time.
+
+Opening the store replays the page log into a (region, page) -> (ts, end)
+index; the agent records stay on disk. A rerun only visits pages that are
+missing, or older than `refresh_before` in refresh mode. Later lines win, so
+a refreshed page replaces the earlier copy of its agents. `write_agents()`
+rebuilds the il_agents.json array from both logs. Readers stop at an
+unterminated last line; the writer of that file drops it (crash mid-write)
+before its first append.
+
+Usage
+  store = PageStore(PAGES_LOG, LICENSES_LOG)
+  if store.page_done(region, page, refresh_before) is None: ...
+  store.record_page(region, page, url, agents)           # or ([], end=True) past the last page
+  store.record_license(page_url, license_number)
+  store.write_agents(OUT_JSON)
+
+Only stdlib is used.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+
+def _dump(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False)
+
+
+class PageStore:
+    def __init__(self, path: str, licenses_path: Optional[str] = None) -> None:
+        self.path = path
+        self.licenses_path = licenses_path or os.path.splitext(path)[0] + "_licenses.jsonl"
+        self.pages: Dict[Tuple[str, int], Tuple[float, bool]] = {}
+        self._lock = threading.Lock()
+        self._repaired: Set[str] = set()
+        for rec in self.iter_records():
+            if rec.get("kind") == "page":
+                self.pages[(rec["region"], int(rec["page"]))] = (float(rec.get("ts", 0)), bool(rec.get("end")))
+
+    # -- startup ----------------------------------------------------------
+
+    @staticmethod
+    def _drop_torn_tail(path: str) -> None:
+        if not os.path.exists(path):
+            return
+        size = os.path.getsize(path)
+        if size == 0:
+            return
+        with open(path, "rb+") as f:
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Walk back to the last complete line.
+            pos = size
+            while pos > 0:
+                step = min(pos, 1 << 16)
+                f.seek(pos - step)
+                chunk = f.read(step)
+                i = chunk.rfind(b"\n")
+                if i >= 0:
+                    f.truncate(pos - step + i + 1)
+                    return
+                pos -= step
+            f.truncate(0)
+
+    # -- reads ------------------------------------------------------------
+
+    def iter_records(self, path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        path = path or self.path
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # torn, or still being written by the other stage
+                if line.strip():
+                    yield json.loads(line)
+
+    def page_done(self, region: str, page: int, refresh_before: float = 0.0) -> Optional[bool]:
+        """None if the page still needs fetching, else whether it ended the region."""
+        hit = self.pages.get((region, page))
+        if hit is None or hit[0] < refresh_before:
+            return None
+        return hit[1]
+
+    def region_done(self, region: str, max_pages: int, refresh_before: float = 0.0) -> bool:
+        for page in range(1, max_pages + 1):
+            end = self.page_done(region, page, refresh_before)
+            if end is None:
+                return False
+            if end:
+                return True
+        return True
+
+    def profiles_checked(self) -> Set[str]:
+        """page_urls whose profile has been visited (license found or not)."""
+        return {rec["page_url"] for rec in self.iter_records(self.licenses_path)}
+
+    def agents(self) -> List[Dict[str, Any]]:
+        """One record per page_url from the latest copy of each page, plus licenses found since.
+
+        Pages past a region's (latest) end marker are left out, so a refresh
+        that finds a region shrank drops the agents on its old tail pages.
+        """
+        latest: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        for rec in self.iter_records():
+            if rec.get("kind") == "page":
+                latest[(rec["region"], int(rec["page"]))] = rec
+        licenses = {
+            rec["page_url"]: rec["license_number"]
+            for rec in self.iter_records(self.licenses_path)
+            if rec.get("license_number")
+        }
+
+        ends: Dict[str, int] = {}
+        for (region, page), rec in latest.items():
+            if rec.get("end") and page < ends.get(region, page + 1):
+                ends[region] = page
+
+        by_url: Dict[str, Dict[str, Any]] = {}
+        for (region, page), rec in sorted(latest.items(), key=lambda kv: kv[1].get("ts", 0)):
+            if page >= ends.get(region, page + 1):
+                continue
+            for a in rec.get("agents", []):
+                by_url[a["page_url"]] = a
+        for url, lic in licenses.items():
+            if url in by_url and not by_url[url].get("license_number"):
+                by_url[url]["license_number"] = lic
+        return list(by_url.values())
+
+    # -- writes -----------------------------------------------------------
+
+    def _append(self, path: str, rec: Dict[str, Any]) -> None:
+        line = _dump(rec) + "\n"
+        with self._lock:
+            if path not in self._repaired:
+                # Only a writer trims a torn tail, so a reader never cuts
+                # off a line the other stage is in the middle of appending.
+                self._drop_torn_tail(path)
+                self._repaired.add(path)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def record_page(
+        self, region: str, page: int, url: str, agents: List[Dict[str, Any]], end: bool = False
+    ) -> None:
+        ts = time.time()
+        self._append(
+            self.path,
+            {"kind": "page", "region": region, "page": page, "url": url, "ts": ts, "end": end, "agents": agents},
+        )
+        with self._lock:
+            self.pages[(region, page)] = (ts, end)
+
+    def record_license(self, page_url: str, license_number: Optional[str]) -> None:
+        self._append(
+            self.licenses_path,
+            {"kind": "license", "page_url": page_url, "license_number": license_number, "ts": time.time()},
+        )
+
+    def write_agents(self, out_json: str) -> int:
+        """Rebuild the il_agents.json array from the log (atomically). Returns the agent count."""
+        items = self.agents()
+        if not items and os.path.exists(out_json) and os.path.getsize(out_json) > 2:
+            # Never replace a non-empty file with nothing.
+            return 0
+        tmp = f"{out_json}.{os.getpid()}.tmp"  # both stages may rebuild it
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(items, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, out_json)
+        return len(items)
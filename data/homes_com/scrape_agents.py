@@ -6,8 +6,9 @@ Why Playwright?
 - A real browser session (non-headless Chromium) works reliably.
 
 Outputs
-- data/homes_com/il_agents.json
-- data/homes_com/scrape_log.txt
+- data/homes_com/il_agents_pages.jsonl (append-only checkpoint, see page_store.py)
+- data/homes_com/il_agents.json (rebuilt from the checkpoint at the end, or on a crash)
+- data/homes_com/scrape_log.txt (appended to)
 
 Usage (recommended)
   source .venv/bin/activate
@@ -16,35 +17,112 @@ Usage (recommended)
 Full run
   python data/homes_com/scrape_agents.py
 
-Optional: also visit each agent profile page to extract license # (slow)
+Optional: also visit each agent profile page to extract license #; this runs
+the profile stage (fetch_profiles.py, which can also be run on its own,
+alongside or after the crawl) once the search pages are done. It loads one
+profile at a time at the crawl's pace unless told otherwise
   python data/homes_com/scrape_agents.py --fetch-profiles
+  python data/homes_com/scrape_agents.py --fetch-profiles --profile-concurrency 3 --profile-min-interval 2
+
+Resume: every finished search page is checkpointed, so rerunning the same
+command only visits the pages that are missing; finished regions are skipped.
+Re-check pages fetched more than N days ago, or just rewrite il_agents.json
+  python data/homes_com/scrape_agents.py --refresh-older-than 14
+  python data/homes_com/scrape_agents.py --rebuild
+
+Worker pool: N browser windows, each with its own persistent profile
+(.playwright-profile, .playwright-profile-1, ...) and its own rate limiter,
+pulling regions from a shared queue
+  python data/homes_com/scrape_agents.py --workers 3
+
+Against the local fixture server (no Homes.com traffic)
+  python data/homes_com/fixture_server.py --port 8765 &
+  python data/homes_com/scrape_agents.py --base-url http://127.0.0.1:8765 --headless --channel "" --workers 4
 
 Notes
-- Rate-limited with a 2–3s delay between page navigations.
+- Rate-limited with a 3.5–6.5s delay between page navigations (per worker).
+- Pages are parsed as soon as the agent cards (or, on profiles, the license
+  text) are in the DOM, or once the network goes idle, bounded by
+  --ready-timeout; no fixed sleeps.
+- Images, fonts, media and analytics/ad requests are blocked (--load-assets
+  turns that off).
+- Pages are parsed with lxml + precompiled XPath; HOMES_COM_PARSER=bs4 uses the
+  original BeautifulSoup code (python data/homes_com/bench_parsers.py checks
+  both give the same records).
 - Pagination URLs on Homes.com look like: /real-estate-agents/chicago-il/p2/
 """
 
 from __future__ import annotations
 
 import argparse
-import json
 import os
+import queue
 import random
 import re
+import socket
 import sys
+import threading
 import time
 from dataclasses import asdict, dataclass
 from datetime import datetime
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 from urllib.parse import urljoin
 
+import lxml.html
 from bs4 import BeautifulSoup
+from lxml import etree
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
 
-BASE = "https://www.homes.com"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from page_store import PageStore  # noqa: E402
+
+BASE = os.environ.get("HOMES_COM_BASE_URL", "https://www.homes.com").rstrip("/")
 DATA_DIR = os.path.dirname(os.path.abspath(__file__))
 OUT_JSON = os.path.join(DATA_DIR, "il_agents.json")
 LOG_FILE = os.path.join(DATA_DIR, "scrape_log.txt")
+PAGES_LOG = os.path.join(DATA_DIR, "il_agents_pages.jsonl")
+LICENSES_LOG = os.path.join(DATA_DIR, "il_agents_licenses.jsonl")
+
+# Gap between one browser's navigations to Homes.com (random, in seconds).
+MIN_INTERVAL_S = 3.5
+MAX_INTERVAL_S = 6.5
+
+
+# Readiness: a search page is usable once its agent cards are in the DOM, a
+# profile once its license line is. Pages without them (end of pagination,
+# profiles with no license) are taken once the network has gone idle.
+SEARCH_READY_SELECTOR = ".agent-name"
+PROFILE_READY_SELECTOR = "text=/license/i"
+# Shown on a search page past the last page of results.
+NO_RESULTS_SELECTOR = ".no-results"
+FIRST_LOOK_MS = 2000
+READY_TIMEOUT_MS = 15000
+
+# wait_ready() outcomes.
+READY = "ready"          # selector matched
+SETTLED = "settled"      # network went idle without it
+TIMED_OUT = "timed out"  # neither within the timeout (slow render?)
+
+# Requests the parser never needs.
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+BLOCKED_URL_PARTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "connect.facebook",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "newrelic.com",
+    "nr-data.net",
+    "quantserve.com",
+    "scorecardresearch.com",
+    "bat.bing.com",
+    "analytics",
+)
 
 
 IL_REGIONS_77 = [
@@ -149,12 +227,19 @@ class AgentRecord:
     scraped_at: str = ""
 
 
+_LOG_LOCK = threading.Lock()
+
+
 def log(msg: str) -> None:
     ts = time.strftime("%Y-%m-%d %H:%M:%S")
+    worker = threading.current_thread().name
+    if worker.startswith("scrape-"):
+        msg = f"[{worker[len('scrape-'):]}] {msg}"
     line = f"[{ts}] {msg}"
-    print(line)
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(line + "\n")
+    with _LOG_LOCK:
+        print(line, flush=True)
+        with open(LOG_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
 
 
 def slugify_city(region: str) -> str:
@@ -177,7 +262,110 @@ def build_search_url(region: str, page: int = 1) -> str:
     return f"{BASE}/real-estate-agents/{slug}/p{page}/"
 
 
+# HTML parsing. The default backend walks an lxml tree with precompiled XPath;
+# HOMES_COM_PARSER=bs4 selects the original BeautifulSoup code, which stays as
+# the reference (bench_parsers.py checks both give the same records).
+PARSER_BACKEND = os.environ.get("HOMES_COM_PARSER", "lxml")
+
+
+def _class_xpath(cls: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+
+_X_AGENT_NAMES = etree.XPath(f"//*[{_class_xpath('agent-name')}]")
+_X_CARD = etree.XPath("ancestor::li[1]")
+_X_PROFILE_LINK = etree.XPath("(.//a[starts-with(@href, '/real-estate-agents/')])[1]")
+_X_COMPANY = etree.XPath(f"(.//*[{_class_xpath('company')}])[1]")
+_X_PHONE = etree.XPath(f"(.//*[{_class_xpath('phone')}])[1]")
+_X_IMG = etree.XPath("(.//img)[1]")
+
+# Text inside these isn't page text; BeautifulSoup's get_text() skips it too.
+_NON_TEXT_TAGS = frozenset({"script", "style", "template", "rt", "rp"})
+
+
+def _strings(el: Any, skip: bool = False) -> Iterator[str]:
+    """Text nodes under `el` in document order, minus comments and _NON_TEXT_TAGS."""
+    skip = skip or el.tag in _NON_TEXT_TAGS
+    if el.text and not skip:
+        yield el.text
+    for child in el:
+        if isinstance(child.tag, str):
+            yield from _strings(child, skip)
+        if child.tail and not skip:
+            yield child.tail
+
+
+def _get_text(el: Any, sep: str) -> str:
+    """Same as BeautifulSoup's el.get_text(sep, strip=True)."""
+    # bs4 types a string by its innermost such container, so e.g. a card inside
+    # a <template> has no text even though the selectors still match it.
+    skip = any(anc.tag in _NON_TEXT_TAGS for anc in el.iterancestors())
+    return sep.join(t for t in (s.strip() for s in _strings(el, skip)) if t)
+
+
+def _parse_tree(html: str) -> Optional[Any]:
+    if PARSER_BACKEND != "lxml":
+        return None
+    try:
+        return lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        # Empty input, or a str with an XML encoding declaration: use bs4.
+        return None
+
+
+def _dedupe(agents: List[AgentRecord]) -> List[AgentRecord]:
+    # Deduplicate by page_url (multiple DOM fragments can reference same agent)
+    uniq: Dict[str, AgentRecord] = {}
+    for a in agents:
+        uniq[a.page_url] = a
+    return list(uniq.values())
+
+
 def parse_agents_from_search_html(html: str, region: str) -> List[AgentRecord]:
+    root = _parse_tree(html)
+    if root is None:
+        return parse_agents_from_search_html_bs4(html, region)
+
+    agents: List[AgentRecord] = []
+
+    # Cards contain .agent-name, .company, .phone, and link to /real-estate-agents/<slug>/<id>/
+    for name_el in _X_AGENT_NAMES(root):
+        li = _X_CARD(name_el)
+        if not li:
+            continue
+        li = li[0]
+
+        a = _X_PROFILE_LINK(li)
+        href = a[0].get("href") if a else None
+        if not href:
+            continue
+
+        company_el = _X_COMPANY(li)
+        phone_el = _X_PHONE(li)
+        img_el = _X_IMG(li)
+
+        photo_url = None
+        if img_el:
+            photo_url = img_el[0].get("src") or img_el[0].get("data-src")
+
+        agents.append(
+            AgentRecord(
+                agent_name=_get_text(name_el, " "),
+                city=city_display(region),
+                state="IL",
+                brokerage=_get_text(company_el[0], " ") if company_el else None,
+                phone=_get_text(phone_el[0], " ") if phone_el else None,
+                photo_url=photo_url,
+                page_url=urljoin(BASE, href),
+                license_number=None,
+                scraped_at=datetime.utcnow().isoformat() + "Z",
+            )
+        )
+
+    return _dedupe(agents)
+
+
+def parse_agents_from_search_html_bs4(html: str, region: str) -> List[AgentRecord]:
     soup = BeautifulSoup(html, "lxml")
 
     agents: List[AgentRecord] = []
@@ -221,11 +409,7 @@ def parse_agents_from_search_html(html: str, region: str) -> List[AgentRecord]:
             )
         )
 
-    # Deduplicate by page_url (multiple DOM fragments can reference same agent)
-    uniq: Dict[str, AgentRecord] = {}
-    for a in agents:
-        uniq[a.page_url] = a
-    return list(uniq.values())
+    return _dedupe(agents)
 
 
 LICENSE_PATTERNS = [
@@ -234,10 +418,7 @@ LICENSE_PATTERNS = [
 ]
 
 
-def parse_license_number_from_profile_html(html: str) -> Optional[str]:
-    # Homes.com profile pages vary; as a fallback, regex over visible text.
-    soup = BeautifulSoup(html, "lxml")
-    text = soup.get_text("\n", strip=True)
+def _find_license(text: str) -> Optional[str]:
     for pat in LICENSE_PATTERNS:
         m = pat.search(text)
         if m:
@@ -245,98 +426,301 @@ def parse_license_number_from_profile_html(html: str) -> Optional[str]:
     return None
 
 
-def sleep_rl(min_s: float = 3.5, max_s: float = 6.5) -> None:
-    """Rate-limit / add jitter. Homes.com is bot-sensitive."""
-    time.sleep(random.uniform(min_s, max_s))
-
+def parse_license_number_from_profile_html(html: str) -> Optional[str]:
+    # Homes.com profile pages vary; as a fallback, regex over visible text.
+    root = _parse_tree(html)
+    if root is None:
+        return parse_license_number_from_profile_html_bs4(html)
+    return _find_license(_get_text(root, "\n"))
 
-def run(
-    regions: List[str],
-    max_pages_per_city: int = 50,
-    fetch_profiles: bool = False,
-) -> List[Dict[str, Any]]:
-    results: Dict[str, AgentRecord] = {}
 
-    with sync_playwright() as p:
-        # IMPORTANT: headless=True gets Access Denied. Use a real browser session.
-        # Also: Homes.com/Akamai is sensitive to automation; using the installed Chrome
-        # channel and hiding webdriver flags improves reliability.
-        profile_dir = os.path.join(DATA_DIR, ".playwright-profile")
-        os.makedirs(profile_dir, exist_ok=True)
-
-        context = p.chromium.launch_persistent_context(
-            user_data_dir=profile_dir,
-            headless=False,
-            channel="chrome",
-            viewport={"width": 1280, "height": 720},
-            args=[
-                "--disable-blink-features=AutomationControlled",
-                "--no-default-browser-check",
-                "--no-first-run",
-            ],
-        )
-        context.add_init_script(
-            """
-            // Basic webdriver stealth.
-            Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-            """
-        )
-        page = context.new_page()
+def parse_license_number_from_profile_html_bs4(html: str) -> Optional[str]:
+    soup = BeautifulSoup(html, "lxml")
+    text = soup.get_text("\n", strip=True)
+    return _find_license(text)
+
+
+class RateLimiter:
+    """Rate-limit / add jitter between one browser's navigations. Homes.com is bot-sensitive.
+
+    Keeps a random MIN_INTERVAL_S..MAX_INTERVAL_S gap between navigation starts;
+    time already spent loading and parsing the previous page counts towards it.
+    """
+
+    def __init__(self, min_s: float = MIN_INTERVAL_S, max_s: float = MAX_INTERVAL_S) -> None:
+        self.min_s = min_s
+        self.max_s = max_s
+        self._next = 0.0
+
+    def wait(self) -> None:
+        delay = self._next - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next = time.monotonic() + random.uniform(self.min_s, self.max_s)
+
+
+def profile_dir_for(worker: int) -> str:
+    # Chrome locks a profile directory, so each worker needs its own; worker 0
+    # keeps the original one (and its cookies).
+    name = ".playwright-profile" if worker == 0 else f".playwright-profile-{worker}"
+    return os.path.join(DATA_DIR, name)
+
+
+def profile_in_use(profile_dir: str) -> bool:
+    """Whether a running Chrome holds `profile_dir` (its SingletonLock names a live process)."""
+    try:
+        target = os.readlink(os.path.join(profile_dir, "SingletonLock"))  # "<hostname>-<pid>"
+    except OSError:
+        return False
+    host, _, pid = target.rpartition("-")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True  # can't check; leave it alone, as Chrome would
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False  # stale lock from a crash; Chrome takes it over
+    except PermissionError:
+        pass  # alive, owned by another user
+    return True
+
+
+def is_blocked_request(req: Any) -> bool:
+    return req.resource_type in BLOCKED_RESOURCE_TYPES or any(part in req.url for part in BLOCKED_URL_PARTS)
+
+
+def _route_filter(route: Any) -> None:
+    if is_blocked_request(route.request):
+        route.abort()
+    else:
+        route.continue_()
+
+
+def wait_ready(page: Any, selector: str, timeout_ms: int = READY_TIMEOUT_MS) -> str:
+    """Wait for `selector` to be in the DOM, else for network idle; at most `timeout_ms`.
+
+    Returns READY, SETTLED or TIMED_OUT.
+    """
+    start = time.monotonic()
+    try:
+        page.wait_for_selector(selector, state="attached", timeout=min(FIRST_LOOK_MS, timeout_ms))
+        return READY
+    except PlaywrightTimeoutError:
+        pass
+
+    # Not there yet: either still rendering (keep waiting while requests are in
+    # flight) or a page that will never have it. Network idle is tracked from
+    # navigation, so this returns at once if the page already settled.
+    remaining = max(1, int(timeout_ms - (time.monotonic() - start) * 1000))
+    try:
+        page.wait_for_load_state("networkidle", timeout=remaining)
+        idle = True
+    except PlaywrightTimeoutError:
+        idle = False
+    if page.query_selector(selector) is not None:
+        return READY
+    return SETTLED if idle else TIMED_OUT
+
+
+# Basic webdriver stealth.
+STEALTH_JS = """
+Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+"""
 
-        for region in regions:
-            log(f"City: {region}")
-            for page_num in range(1, max_pages_per_city + 1):
-                url = build_search_url(region, page=page_num)
-                log(f"  Search page {page_num}: {url}")
 
-                try:
-                    page.goto(url, wait_until="domcontentloaded", timeout=60000)
-                    page.wait_for_timeout(6000)
-                except Exception as e:
-                    log(f"    ERROR navigating: {e}")
-                    break
-
-                html = page.content()
-                if "Access Denied" in html and "errors.edgesuite" in html:
-                    log("    BLOCKED (Access Denied). Stopping.")
-                    break
+def context_options(profile_dir: str, headless: bool, channel: Optional[str]) -> Dict[str, Any]:
+    """launch_persistent_context() kwargs; shared with the async profile stage."""
+    # IMPORTANT: headless=True gets Access Denied. Use a real browser session.
+    # Also: Homes.com/Akamai is sensitive to automation; using the installed Chrome
+    # channel and hiding webdriver flags improves reliability.
+    return {
+        "user_data_dir": profile_dir,
+        "headless": headless,
+        "channel": channel or None,
+        "viewport": {"width": 1280, "height": 720},
+        "args": [
+            "--disable-blink-features=AutomationControlled",
+            "--no-default-browser-check",
+            "--no-first-run",
+        ],
+    }
+
+
+def open_context(
+    p: Any,
+    worker: int = 0,
+    headless: bool = False,
+    channel: Optional[str] = "chrome",
+    block_assets: bool = True,
+) -> Any:
+    profile_dir = profile_dir_for(worker)
+    os.makedirs(profile_dir, exist_ok=True)
+
+    context = p.chromium.launch_persistent_context(**context_options(profile_dir, headless, channel))
+    context.add_init_script(STEALTH_JS)
+    if block_assets:
+        context.route("**/*", _route_filter)
+    return context
+
+
+def is_access_denied(html: str) -> bool:
+    return "Access Denied" in html and "errors.edgesuite" in html
+
+
+def scrape_region(
+    page: Any,
+    region: str,
+    max_pages_per_city: int,
+    limiter: RateLimiter,
+    store: PageStore,
+    refresh_before: float = 0.0,
+    ready_timeout_ms: int = READY_TIMEOUT_MS,
+) -> int:
+    """Walk one region's search pages, checkpointing each into `store`. Returns agents parsed.
+
+    Pages already in the store (and newer than `refresh_before`) are skipped
+    without a visit; a stored end-of-results marker finishes the region.
+    """
+    parsed = 0
+    skipped = 0
+    log(f"City: {region}")
+    for page_num in range(1, max_pages_per_city + 1):
+        done = store.page_done(region, page_num, refresh_before)
+        if done is not None:
+            if done:
+                break
+            skipped += 1
+            continue
 
-                agents = parse_agents_from_search_html(html, region)
-                log(f"    Parsed agents: {len(agents)}")
+        url = build_search_url(region, page=page_num)
+        limiter.wait()
+        log(f"  Search page {page_num}: {url}")
 
-                if not agents:
-                    # likely end of pagination or failed load
-                    break
+        try:
+            resp = page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            state = wait_ready(page, SEARCH_READY_SELECTOR, ready_timeout_ms)
+        except Exception as e:
+            log(f"    ERROR navigating: {e}")
+            break
 
-                for a in agents:
-                    results[a.page_url] = a
+        html = page.content()
+        if is_access_denied(html):
+            log("    BLOCKED (Access Denied). Stopping.")
+            break
 
-                sleep_rl()
+        agents = parse_agents_from_search_html(html, region)
+        log(f"    Parsed agents: {len(agents)}")
 
-            sleep_rl()
+        if agents:
+            store.record_page(region, page_num, url, [asdict(a) for a in agents])
+            parsed += len(agents)
+            continue
 
-        if fetch_profiles and results:
-            log(f"Fetching profiles for license numbers: {len(results)} agents")
-            for i, a in enumerate(list(results.values()), start=1):
-                if a.license_number:
-                    continue
-                if i % 50 == 0:
-                    log(f"  Profile progress: {i}/{len(results)}")
+        # Only a page that plainly has no results ends the region for good; a
+        # slow render, an HTTP error or a half-loaded page is retried next run.
+        status = resp.status if resp is not None else None
+        if status == 200 and (state == SETTLED or page.query_selector(NO_RESULTS_SELECTOR) is not None):
+            store.record_page(region, page_num, url, [], end=True)
+        else:
+            log(f"    No agents (HTTP {status}, {state}); not checkpointed, will retry")
+        break
+
+    if skipped:
+        log(f"  {region}: {skipped} page(s) already checkpointed, skipped")
+    return parsed
+
+
+def _crawl_worker(
+    worker: int,
+    regions: "queue.Queue[str]",
+    max_pages_per_city: int,
+    store: PageStore,
+    refresh_before: float,
+    headless: bool,
+    channel: Optional[str],
+    block_assets: bool,
+    ready_timeout_ms: int,
+) -> None:
+    # The sync Playwright API is bound to the thread that started it, so every
+    # worker runs its own Playwright instance and browser.
+    limiter = RateLimiter()
+    with sync_playwright() as p:
+        context = open_context(p, worker, headless=headless, channel=channel, block_assets=block_assets)
+        page = context.new_page()
+        try:
+            while True:
                 try:
-                    page.goto(a.page_url, wait_until="domcontentloaded", timeout=60000)
-                    page.wait_for_timeout(5000)
-                    html = page.content()
-                    a.license_number = parse_license_number_from_profile_html(html)
+                    region = regions.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    scrape_region(page, region, max_pages_per_city, limiter, store, refresh_before, ready_timeout_ms)
                 except Exception as e:
-                    log(f"  ERROR profile {a.page_url}: {e}")
-                sleep_rl()
+                    log(f"  ERROR region {region}: {e}")
+        finally:
+            context.close()
 
-        context.close()
 
-    return [asdict(a) for a in results.values()]
+def run(
+    regions: List[str],
+    store: PageStore,
+    max_pages_per_city: int = 50,
+    fetch_profiles: bool = False,
+    workers: int = 1,
+    headless: bool = False,
+    channel: Optional[str] = "chrome",
+    block_assets: bool = True,
+    ready_timeout_ms: int = READY_TIMEOUT_MS,
+    refresh_before: float = 0.0,
+    profile_concurrency: int = 1,
+    profile_min_interval_s: float = MIN_INTERVAL_S,
+    profile_max_interval_s: float = MAX_INTERVAL_S,
+) -> None:
+    """Crawl every region that still has unvisited (or stale) pages into `store`.
+
+    With `fetch_profiles`, the profile stage runs afterwards with the
+    `profile_*` pacing (by default one tab, paced like a crawl worker).
+    """
+    pending = [r for r in regions if not store.region_done(r, max_pages_per_city, refresh_before)]
+    log(f"Regions pending: {len(pending)} ({len(regions) - len(pending)} complete in {store.path})")
+
+    todo: "queue.Queue[str]" = queue.Queue()
+    for region in pending:
+        todo.put(region)
+
+    n = max(1, min(workers, len(pending)))
+    args = (todo, max_pages_per_city, store, refresh_before, headless, channel, block_assets, ready_timeout_ms)
+    if n == 1 and pending:
+        _crawl_worker(0, *args)
+    elif n > 1:
+        log(f"Worker pool: {n} browsers")
+        threads = [
+            threading.Thread(target=_crawl_worker, args=(i, *args), name=f"scrape-w{i}", daemon=True)
+            for i in range(n)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    if fetch_profiles:
+        # Imported here: fetch_profiles builds on this module.
+        import fetch_profiles as profile_stage
+
+        profile_stage.fetch_licenses(
+            store,
+            concurrency=profile_concurrency,
+            min_interval_s=profile_min_interval_s,
+            max_interval_s=profile_max_interval_s,
+            headless=headless,
+            channel=channel,
+            block_assets=block_assets,
+            ready_timeout_ms=ready_timeout_ms,
+        )
 
 
 def main() -> None:
+    global BASE
+
     ap = argparse.ArgumentParser()
     ap.add_argument("--test", action="store_true", help="Run a small test (1–2 cities).")
     ap.add_argument(
@@ -348,32 +732,114 @@ def main() -> None:
     ap.add_argument(
         "--fetch-profiles",
         action="store_true",
-        help="Also visit each agent profile page to extract license numbers (slow).",
+        help="Then run the profile stage (fetch_profiles.py) for license numbers.",
+    )
+    ap.add_argument(
+        "--profile-concurrency",
+        type=int,
+        default=1,
+        help="With --fetch-profiles: tabs loading profiles at once (default: %(default)s).",
+    )
+    ap.add_argument(
+        "--profile-min-interval",
+        type=float,
+        default=MIN_INTERVAL_S,
+        help="With --fetch-profiles: min seconds between profile navigations (default: %(default)s).",
+    )
+    ap.add_argument(
+        "--profile-max-interval",
+        type=float,
+        default=MAX_INTERVAL_S,
+        help="With --fetch-profiles: max seconds between profile navigations (default: %(default)s).",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Browsers crawling regions in parallel, each rate-limited on its own (default: 1).",
+    )
+    ap.add_argument(
+        "--base-url",
+        default=BASE,
+        help="Site to crawl, e.g. http://127.0.0.1:8765 for fixture_server.py (default: %(default)s).",
+    )
+    ap.add_argument("--headless", action="store_true", help="Headless browser (Homes.com itself blocks this).")
+    ap.add_argument(
+        "--channel",
+        default="chrome",
+        help='Browser channel; "" for Playwright\'s bundled Chromium (default: %(default)s).',
+    )
+    ap.add_argument(
+        "--ready-timeout",
+        type=float,
+        default=READY_TIMEOUT_MS / 1000,
+        help="Max seconds to wait for a page's content after navigation (default: %(default)s).",
+    )
+    ap.add_argument(
+        "--load-assets",
+        action="store_true",
+        help="Don't block images, fonts, media and analytics requests.",
+    )
+    ap.add_argument(
+        "--refresh-older-than",
+        type=float,
+        metavar="DAYS",
+        help="Revisit checkpointed search pages fetched more than DAYS ago (default: never).",
+    )
+    ap.add_argument(
+        "--rebuild",
+        action="store_true",
+        help=f"Only rewrite {os.path.basename(OUT_JSON)} from {os.path.basename(PAGES_LOG)}; no crawling.",
     )
     args = ap.parse_args()
 
-    # reset log each run
+    BASE = args.base_url.rstrip("/")
+
+    # append: a resumed run keeps the earlier runs' log
     os.makedirs(DATA_DIR, exist_ok=True)
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        f.write("")
+    with open(LOG_FILE, "a", encoding="utf-8") as f:
+        f.write(f"\n==== run {datetime.now().isoformat(timespec='seconds')} ====\n")
+
+    store = PageStore(PAGES_LOG, LICENSES_LOG)
+    if args.rebuild:
+        n = store.write_agents(OUT_JSON)
+        log(f"Rebuilt {OUT_JSON} from {PAGES_LOG}: {n} agents")
+        return
 
     regions = IL_REGIONS_77
     if args.test:
         regions = ["Chicago, IL", "Naperville, IL"]
 
-    log(f"Starting Homes.com scrape. Regions: {len(regions)}")
-    log(f"max_pages_per_city={args.max_pages_per_city}, fetch_profiles={args.fetch_profiles}")
+    refresh_before = 0.0
+    if args.refresh_older_than is not None:
+        refresh_before = time.time() - args.refresh_older_than * 86400
 
-    items = run(
-        regions=regions,
-        max_pages_per_city=args.max_pages_per_city,
-        fetch_profiles=args.fetch_profiles,
+    log(f"Starting Homes.com scrape. Regions: {len(regions)}")
+    log(
+        f"max_pages_per_city={args.max_pages_per_city}, fetch_profiles={args.fetch_profiles}, "
+        f"workers={args.workers}, base={BASE}, refresh_older_than={args.refresh_older_than}"
     )
 
-    with open(OUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(items, f, indent=2, ensure_ascii=False)
-
-    log(f"DONE. Wrote {len(items)} agents -> {OUT_JSON}")
+    try:
+        run(
+            regions=regions,
+            store=store,
+            max_pages_per_city=args.max_pages_per_city,
+            fetch_profiles=args.fetch_profiles,
+            workers=args.workers,
+            headless=args.headless,
+            channel=args.channel,
+            block_assets=not args.load_assets,
+            ready_timeout_ms=int(args.ready_timeout * 1000),
+            refresh_before=refresh_before,
+            profile_concurrency=args.profile_concurrency,
+            profile_min_interval_s=args.profile_min_interval,
+            profile_max_interval_s=args.profile_max_interval,
+        )
+    finally:
+        # Also on a crash / Ctrl-C: everything checkpointed so far lands in the JSON.
+        n = store.write_agents(OUT_JSON)
+        log(f"DONE. Wrote {n} agents -> {OUT_JSON}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Streaming readers for the IDFPR roster exports in this folder.
+
+- `*_raw.json`: one big JSON array of license records (pretty-printed)
+- `*.csv`: normalized roster with header
+  name,license_number,type,company,city,state,zip,county,licensed_since,expires,disciplined
+
+Both readers yield one record at a time, so peak memory stays at one record
+(plus a read buffer) instead of the whole file. Pass `fields` to keep only the
+columns a consumer needs, e.g. MATCH_FIELDS for the Homes.com matcher.
+
+Usage
+  import sys; sys.path.insert(0, "data/idfpr")
+  from idfpr_roster import iter_raw_records, MATCH_FIELDS
+
+  for rec in iter_raw_records("data/idfpr/real_estate_broker_raw.json", fields=MATCH_FIELDS):
+      ...
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+# license_number + name parts + city: what name/city matching needs.
+MATCH_FIELDS = ("license_number", "first_name", "middle", "last_name", "city")
+
+_WS = " \t\r\n"
+_DECODER = json.JSONDecoder()
+
+
+def project(rec: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return rec
+    return {k: rec.get(k) for k in fields}
+
+
+def iter_raw_records(
+    path: str,
+    fields: Optional[Sequence[str]] = None,
+    chunk_size: int = 1 << 16,
+) -> Iterator[Dict[str, Any]]:
+    """Yield the objects of a top-level JSON array without loading the array."""
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_ws() -> None:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _WS:
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+
+        skip_ws()
+        if pos >= len(buf):
+            return
+        if buf[pos] != "[":
+            raise ValueError(f"{path}: expected a JSON array")
+        pos += 1
+
+        first = True
+        while True:
+            skip_ws()
+            if pos >= len(buf):
+                raise ValueError(f"{path}: unexpected end of file")
+            if buf[pos] == "]":
+                return
+            if not first:
+                if buf[pos] != ",":
+                    raise ValueError(f"{path}: expected ',' at offset {pos}")
+                pos += 1
+                skip_ws()
+            first = False
+
+            while True:
+                try:
+                    obj, end = _DECODER.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    # Record straddles the buffer edge; read more and retry.
+                    if not fill():
+                        raise
+                    continue
+                if end == len(buf) and not eof and fill():
+                    # A bare scalar could have been cut short; re-decode.
+                    continue
+                break
+            pos = end
+
+            if isinstance(obj, dict):
+                yield project(obj, fields)
+
+
+def iter_csv_records(path: str, fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, str]]:
+    """Yield CSV rows as dicts; with `fields`, only those columns ("" if absent)."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fields is None:
+            yield from csv.DictReader(f)
+            return
+
+        r = csv.reader(f)
+        header = next(r, [])
+        cols = {name: i for i, name in enumerate(header)}
+        picks = [(k, cols.get(k)) for k in fields]
+        for row in r:
+            if not row:
+                continue
+            yield {k: (row[i] if i is not None and i < len(row) else "") for k, i in picks}
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""Compact columnar cache of the IDFPR rosters, memory-mapped on reload.
+
+Parsing `real_estate_broker_raw.json` (62K pretty-printed records) or the
+roster CSVs takes seconds on every run. This converts a roster once into
+`data/idfpr/.cache/<file>.rcol` and later runs mmap that file instead:
+
+- one column per field: uint32 offsets + one UTF-8 blob (values as strings;
+  numbers, booleans, lists and objects as their JSON text, null as "")
+- a uint32 permutation sorted by license_number for `get(license)` lookups
+- rows keep the source order
+
+The cache is rebuilt when the source changes: size/mtime are checked first,
+and if those moved the SHA-256 of the source decides (a touched but unchanged
+file only gets its header refreshed).
+
+Usage
+  python data/idfpr/roster_cache.py            # (re)build caches for data/idfpr/*_raw.json + *.csv
+
+  import sys; sys.path.insert(0, "data/idfpr")
+  from roster_cache import load_roster
+  roster = load_roster("data/idfpr/real_estate_broker_raw.json")
+  roster.get("475184955")
+  for rec in roster.records(("license_number", "city")): ...
+
+Stdlib only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from idfpr_roster import iter_csv_records, iter_raw_records
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(HERE, ".cache")
+
+MAGIC = b"RCOL2\n"  # RCOL1 stored non-string values with str()
+KEY_FIELD = "license_number"
+
+_U32 = "I" if array("I").itemsize == 4 else "L"
+_LEN = struct.Struct("<I")
+
+
+def cache_path_for(source_path: str) -> str:
+    return os.path.join(CACHE_DIR, os.path.basename(source_path) + ".rcol")
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _source_stat(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns)
+
+
+def _iter_source(source_path: str) -> Iterator[Dict[str, Any]]:
+    if source_path.endswith(".json"):
+        return iter_raw_records(source_path)
+    return iter_csv_records(source_path)
+
+
+def _as_str(v: Any) -> str:
+    if v is None:
+        return ""
+    return v if isinstance(v, str) else json.dumps(v, ensure_ascii=False, separators=(",", ":"))
+
+
+def _pad4(n: int) -> int:
+    return (4 - n % 4) % 4
+
+
+def _write_cache(cache_path: str, meta: Dict[str, Any], payload_parts: Sequence[bytes]) -> None:
+    cache_dir = os.path.dirname(cache_path)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    header = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    header += b" " * _pad4(len(MAGIC) + _LEN.size + len(header))
+    tmp = cache_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(_LEN.pack(len(header)))
+        f.write(header)
+        for part in payload_parts:
+            f.write(part)
+    os.replace(tmp, cache_path)
+
+
+def build_cache(source_path: str, cache_path: Optional[str] = None) -> str:
+    """Parse a roster once and write its columnar cache. Returns the cache path."""
+    cache_path = cache_path or cache_path_for(source_path)
+    size, mtime_ns = _source_stat(source_path)
+
+    fields: List[str] = []
+    columns: Dict[str, List[str]] = {}
+    n = 0
+    for rec in _iter_source(source_path):
+        for k in rec:
+            if k is not None and k not in columns:
+                fields.append(k)
+                columns[k] = [""] * n
+        for k in fields:
+            columns[k].append(_as_str(rec.get(k)))
+        n += 1
+
+    parts: List[bytes] = []
+    offset = 0
+    col_meta: Dict[str, List[int]] = {}
+    for k in fields:
+        encoded = [v.encode("utf-8") for v in columns[k]]
+        offs = array(_U32, [0]) * (n + 1)
+        pos = 0
+        for i, b in enumerate(encoded):
+            pos += len(b)
+            offs[i + 1] = pos
+        blob = b"".join(encoded)
+        col_meta[k] = [offset, offset + len(offs) * offs.itemsize, len(blob)]
+        parts.append(offs.tobytes())
+        parts.append(blob + b"\0" * _pad4(len(blob)))
+        offset += len(parts[-2]) + len(parts[-1])
+
+    keys = columns.get(KEY_FIELD, [""] * n)
+    order = array(_U32, sorted(range(n), key=keys.__getitem__))
+    order_off = offset
+    parts.append(order.tobytes())
+
+    meta = {
+        "source": os.path.basename(source_path),
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "sha256": sha256_file(source_path),
+        "byteorder": sys.byteorder,
+        "rows": n,
+        "fields": fields,
+        "columns": col_meta,
+        "order_off": order_off,
+    }
+    _write_cache(cache_path, meta, parts)
+    return cache_path
+
+
+def _read_meta(mm: mmap.mmap) -> Tuple[Dict[str, Any], int]:
+    if mm[: len(MAGIC)] != MAGIC:
+        raise ValueError("not a roster cache")
+    (hlen,) = _LEN.unpack_from(mm, len(MAGIC))
+    start = len(MAGIC) + _LEN.size
+    meta = json.loads(bytes(mm[start : start + hlen]))
+    return meta, start + hlen
+
+
+class Column:
+    """Read-only string column backed by the mmap."""
+
+    def __init__(self, offsets: memoryview, blob: memoryview) -> None:
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self._blob[self._offsets[i] : self._offsets[i + 1]], "utf-8")
+
+
+class RosterCache:
+    def __init__(self, cache_path: str) -> None:
+        self.path = cache_path
+        with open(cache_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.meta, payload = _read_meta(self._mm)
+        self.fields: List[str] = self.meta["fields"]
+        self._rows: int = self.meta["rows"]
+
+        view = memoryview(self._mm)[payload:]
+        self._columns: Dict[str, Column] = {}
+        for k, (off, blob_off, blob_len) in self.meta["columns"].items():
+            offsets = view[off:blob_off].cast(_U32)
+            self._columns[k] = Column(offsets, view[blob_off : blob_off + blob_len])
+        order_off = self.meta["order_off"]
+        self._order = view[order_off : order_off + 4 * self._rows].cast(_U32)
+        self._empty = [""] * self._rows
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def column(self, name: str) -> Sequence[str]:
+        return self._columns.get(name) or self._empty
+
+    def record(self, i: int, fields: Optional[Sequence[str]] = None) -> Dict[str, str]:
+        return {k: self.column(k)[i] for k in (fields or self.fields)}
+
+    def records(self, fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, str]]:
+        """Rows in source order, optionally projected to `fields`."""
+        cols = [(k, self.column(k)) for k in (fields or self.fields)]
+        for i in range(self._rows):
+            yield {k: col[i] for k, col in cols}
+
+    def get(self, license_number: str) -> Optional[Dict[str, str]]:
+        keys = self.column(KEY_FIELD)
+        order = self._order
+        lo, hi = 0, self._rows
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if keys[order[mid]] < license_number:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._rows and keys[order[lo]] == license_number:
+            return self.record(order[lo])
+        return None
+
+
+def _is_fresh(cache_path: str, source_path: str) -> bool:
+    """True if the cache matches the source; refreshes the header on touch-only changes."""
+    try:
+        with open(cache_path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                meta, payload = _read_meta(mm)
+                size, mtime_ns = _source_stat(source_path)
+                if meta.get("byteorder") != sys.byteorder:
+                    return False
+                if (meta.get("size"), meta.get("mtime_ns")) == (size, mtime_ns):
+                    return True
+                if meta.get("size") != size or meta.get("sha256") != sha256_file(source_path):
+                    return False
+                meta["mtime_ns"] = mtime_ns
+                payload_bytes = mm[payload:]
+            finally:
+                mm.close()
+    except (OSError, ValueError):
+        return False
+    _write_cache(cache_path, meta, [payload_bytes])
+    return True
+
+
+def load_roster(source_path: str, cache_path: Optional[str] = None) -> RosterCache:
+    """Open the cache for a roster file, building it first if missing or stale."""
+    cache_path = cache_path or cache_path_for(source_path)
+    if not _is_fresh(cache_path, source_path):
+        build_cache(source_path, cache_path)
+    return RosterCache(cache_path)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("paths", nargs="*", help="Roster files (default: data/idfpr/*_raw.json + *.csv)")
+    args = ap.parse_args()
+
+    paths = args.paths or sorted(glob.glob(os.path.join(HERE, "*_raw.json")) + glob.glob(os.path.join(HERE, "*.csv")))
+    for path in paths:
+        t0 = time.perf_counter()
+        cache_path = build_cache(path)
+        t1 = time.perf_counter()
+        roster = load_roster(path)
+        t2 = time.perf_counter()
+        print(
+            f"{os.path.basename(path)}: {len(roster):,} rows -> {os.path.relpath(cache_path, HERE)} "
+            f"({os.path.getsize(cache_path):,} bytes; build {t1 - t0:.2f}s, reload {(t2 - t1) * 1000:.1f}ms)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""job_stream.py
+
+Read finished Outscraper jobs without loading the whole /requests/{id} body.
+
+A Maps search job with 15-20 queries at limit=500 comes back as one JSON
+document of tens of MB:
+
+  {"id": "...", "status": "Success", "data": [[{place}, ...], [{place}, ...], ...]}
+
+Decoding that with json.loads (and then copying every place to annotate it)
+held the bytes, the text, the parsed tree and the copies at once, so peak
+memory grew with the payload. Here:
+
+- the client copies the body to a spooled temp file as it arrives
+  (`SyncOutscraperClient.get_spooled`, in memory up to 1 MB, on disk above)
+- `JobStatus.read()` decodes only the top-level fields (`status`, `id`,
+  `error`, ...) into a dict, so the poll loops keep working on it unchanged
+- `JobStatus.groups()` then walks the `data` array: one query's places
+  (nested shape) or FLAT_CHUNK places (flat shape) are decoded at a time
+- `save_job()` caches each query's raw results, annotates the places in
+  place (no per-item copy) and appends them to the category store, all
+  inside `store.batch()`, so the batch still commits or rolls back as one
+
+Peak memory is about one query's results (<= limit places) plus the read
+buffer, however large the job.
+
+Usage
+  status = JobStatus.read(*CLIENT.get_spooled(f"/requests/{request_id}"))
+  if status.get("status") == "Success":
+      shape, n_items, total_unique, added = save_job(status, batch, category, store, CACHE, ...)
+
+Only stdlib is used.
+"""
+
+from __future__ import annotations
+
+import codecs
+import contextlib
+import json
+import re
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from places_store import CategoryStore, city_from_query
+from response_cache import ResponseCache
+
+READ_CHUNK = 1 << 18
+# Flat-shape places are decoded and saved this many at a time.
+FLAT_CHUNK = 500
+# save_job() shape for a body that could not be decoded (nothing was saved).
+BAD_JSON = "bad JSON"
+
+_DECODER = json.JSONDecoder()
+_WS = re.compile(r"[ \t\r\n]*")
+
+
+class _Reader:
+    """Pulls one JSON value at a time off a binary file, reading it in chunks."""
+
+    def __init__(self, fp: IO[bytes]) -> None:
+        fp.seek(0)
+        self.fp = fp
+        self.utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _more(self) -> bool:
+        if self.eof:
+            return False
+        data = self.fp.read(READ_CHUNK)
+        self.eof = not data
+        self.buf = self.buf[self.pos:] + self.utf8.decode(data, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character ("" at the end), not consumed."""
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                return ""
+
+    def take(self, ch: str) -> bool:
+        if self.peek() == ch:
+            self.pos += 1
+            return True
+        return False
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                v, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._more():
+                    raise
+                continue  # cut off at the end of the buffer
+            if end == len(self.buf) and self._more():
+                continue  # a number may go on in the next chunk
+            self.pos = end
+            return v
+
+    def elements(self) -> Iterator[str]:
+        """After "[": yields each element's first character; the caller must read the element."""
+        while True:
+            c = self.peek()
+            if c == "]":
+                self.pos += 1
+                return
+            if c == "":
+                raise ValueError("truncated JSON array")
+            if c == ",":
+                self.pos += 1
+                continue
+            yield c
+
+    def skip(self) -> None:
+        """Read past one value, decoding array elements one at a time."""
+        if self.take("["):
+            for _ in self.elements():
+                self.skip()
+        else:
+            self.value()
+
+    def fields(self, out: Dict[str, Any], stop_at_data: bool) -> bool:
+        """Read object members into `out` up to the closing "}", or up to "data" (True)."""
+        while True:
+            c = self.peek()
+            if c in ("}", ""):
+                return False
+            if c == ",":
+                self.pos += 1
+                continue
+            key = self.value()
+            if not self.take(":"):
+                raise ValueError("expected ':' in JSON object")
+            if key == "data":
+                if stop_at_data:
+                    return True
+                self.skip()
+                continue
+            out[key] = self.value()
+
+
+class JobStatus(dict):
+    """A /requests/{id} status: its top-level fields as a dict, `data` left in the body.
+
+    Use groups() (or save_job) for the places; `status.get("data")` is not set.
+    """
+
+    def __init__(self, fields: Optional[Dict[str, Any]] = None, body: Optional[IO[bytes]] = None) -> None:
+        super().__init__(fields or {})
+        self.body = body
+        self.shape = "none"
+
+    @classmethod
+    def read(cls, body: Optional[IO[bytes]], error: Optional[Dict[str, Any]] = None) -> "JobStatus":
+        """From get_spooled()'s (file, error) pair. The file is closed unless it holds data."""
+        if body is None:
+            return cls(error)
+        fields: Dict[str, Any] = {}
+        try:
+            r = _Reader(body)
+            if not r.take("{"):
+                raise ValueError("not a JSON object")
+            has_data = r.fields(fields, stop_at_data=True)
+            if has_data and "status" not in fields:
+                # "data" came first: read the fields after it too (one extra pass).
+                r.skip()
+                r.fields(fields, stop_at_data=False)
+        except ValueError as e:  # includes JSONDecodeError
+            body.seek(0)
+            detail = body.read(2000).decode("utf-8", errors="replace")
+            body.close()
+            return cls({"error": f"Bad JSON: {e}", "detail": detail})
+        if not has_data:
+            body.close()
+            return cls(fields)
+        return cls(fields, body)
+
+    def close(self) -> None:
+        if self.body is not None:
+            self.body.close()
+            self.body = None
+
+    def groups(self) -> Iterator[Tuple[Optional[int], List[Dict[str, Any]]]]:
+        """Yields (query index, raw places) per query, or (None, places) for the flat shape.
+
+        Sets `shape` like normalize_data_shape() in the scrape scripts:
+        "nested", "flat", "empty", "none" or "unknown". A response that
+        mixes lists and objects is read by its first element's kind.
+        """
+        if self.body is None:
+            self.shape = "none"
+            return
+        r = _Reader(self.body)
+        r.take("{")
+        if not r.fields({}, stop_at_data=True) or r.peek() == "n":
+            self.shape = "none"
+            return
+        if r.peek() == "{":
+            self.shape = "unknown"
+            yield None, [r.value()]
+            return
+        if not r.take("["):
+            self.shape = "unknown"
+            return
+
+        elements = r.elements()
+        first = next(elements, None)
+        if first is None:
+            self.shape = "empty"
+        elif first == "[":
+            self.shape = "nested"
+            for i, c in enumerate(_chain(first, elements)):
+                if c != "[":
+                    r.skip()
+                    continue
+                r.pos += 1
+                group = [v for v in (r.value() for _ in r.elements()) if isinstance(v, dict)]
+                yield i, group
+        elif first == "{":
+            self.shape = "flat"
+            chunk: List[Dict[str, Any]] = []
+            for _ in _chain(first, elements):
+                v = r.value()
+                if isinstance(v, dict):
+                    chunk.append(v)
+                    if len(chunk) >= FLAT_CHUNK:
+                        yield None, chunk
+                        chunk = []
+            if chunk:
+                yield None, chunk
+        else:
+            self.shape = "unknown"
+
+
+def _chain(first: str, rest: Iterator[str]) -> Iterator[str]:
+    yield first
+    yield from rest
+
+
+def annotate(items: List[Dict[str, Any]], category: str, query: Optional[str]) -> List[Dict[str, Any]]:
+    """Add _category / _query / _il_city in place (the places were just decoded, nothing shares them)."""
+    for it in items:
+        it.setdefault("_category", category)
+        q = query or it.get("query") or it.get("_query")
+        if q:
+            it.setdefault("_query", q)
+            it.setdefault("_il_city", city_from_query(str(q)))
+    return items
+
+
+class _PartialResponse(Exception):
+    """The job answered fewer or more queries than were sent: don't cache it."""
+
+
+def answered_queries(shape: str, n_groups: int, batch_queries: List[str]) -> List[str]:
+    """Queries a response of `shape` with `n_groups` result lists fully answers.
+
+    Only an empty list, or one result list per query, says which query got
+    which places; a missing group or flat places answer none of them.
+    """
+    if shape == "empty" or (shape == "nested" and n_groups == len(batch_queries)):
+        return list(batch_queries)
+    return []
+
+
+def save_job(
+    status: JobStatus,
+    batch_queries: List[str],
+    category: str,
+    store: CategoryStore,
+    cache: Optional[ResponseCache] = None,
+    endpoint: str = "",
+    params: Optional[Dict[str, Any]] = None,
+    latency_s: float = 0.0,
+) -> Tuple[str, int, int, int]:
+    """Stream a finished job's places into `store` (one transaction) and `cache`.
+
+    Only the cities of answered_queries() are recorded as covered: a nested
+    response missing a result list, or flat, "none" and "unknown" data, save
+    their places without it, so those cities are searched again. Per-query
+    cache entries are only kept when the response has one result list per
+    query, as with ResponseCache.put_batch(). Closes the status body.
+
+    Returns (shape, places in the response, total_unique, added). A body
+    that turns out to be cut off or malformed saves nothing (shape "bad JSON").
+    """
+    n_items = 0
+    n_groups = 0
+    total_unique, added = len(store), 0
+    try:
+        with store.batch():
+            writer = cache.writer(endpoint, params or {}, latency_s, len(batch_queries)) if cache else None
+            try:
+                with (writer or contextlib.nullcontext(None)) as put:
+                    for i, items in status.groups():
+                        q = batch_queries[i] if i is not None and i < len(batch_queries) else None
+                        if put is not None and q is not None:
+                            put(q, items)  # raw results, before they are annotated
+                        n_groups += 1
+                        n_items += len(items)
+                        total_unique, n = store.append(annotate(items, category, q))
+                        added += n
+                    answered = answered_queries(status.shape, n_groups, batch_queries)
+                    if put is not None and (status.shape != "nested" or not answered):
+                        raise _PartialResponse
+            except _PartialResponse:
+                pass
+            if answered:
+                total_unique, _ = store.append([], cities=[city_from_query(q) for q in answered])
+    except ValueError:  # JSONDecodeError included; the batch was rolled back
+        return BAD_JSON, n_items, len(store), 0
+    finally:
+        status.close()
+    return status.shape, n_items, total_unique, added
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""outscraper_client.py
+
+Shared asyncio client for the Outscraper API, used by every scrape script here.
+
+- keep-alive HTTP/1.1 connection pool (one TLS handshake per pooled connection,
+  not per request)
+- bounded concurrency (`max_concurrency` requests in flight)
+- retry with exponential backoff on 429 / 5xx / timeouts / dropped connections
+  (honours Retry-After); `submit` (starting a job, which the API bills once
+  per call) only retries a 429 or a connection that could not be opened, when
+  nothing can have been started
+- `poll_many` fetches many /requests/{id} statuses at the same time
+- `get_spooled` / `poll_many_spooled` copy the body to a spooled temp file as
+  it arrives instead of decoding it, for job_stream.py to read incrementally
+- `SyncOutscraperClient` wraps it for the blocking scripts
+
+Errors come back the way the old per-script `api_request` returned them:
+{"error": "HTTP 404", "detail": "..."} or {"error": "<message>"}.
+
+Point it at a local stub server with OUTSCRAPER_BASE_URL=http://127.0.0.1:8000
+(or base_url=...).
+
+Only stdlib is used.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import ssl
+import tempfile
+import urllib.parse
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+API_KEY = os.environ.get("OUTSCRAPER_API_KEY", "")
+BASE_URL = os.environ.get("OUTSCRAPER_BASE_URL", "https://api.app.outscraper.com")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+READ_CHUNK = 1 << 16
+# get_spooled(): bodies up to this size stay in memory, bigger ones go to a temp file.
+SPOOL_MAX_MEMORY = 1 << 20
+
+Conn = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class _ConnectionLost(Exception):
+    """Peer closed a (possibly stale keep-alive) connection mid-request."""
+
+
+class _ConnectFailed(Exception):
+    """No connection could be opened, so the request was never sent."""
+
+
+class _BadResponse(Exception):
+    """The response could not be parsed as HTTP/1.1 (e.g. a header line over the stream limit)."""
+
+
+async def _read_response(
+    reader: asyncio.StreamReader, sink: Optional[IO[bytes]] = None
+) -> Tuple[int, Dict[str, str], bytes, bool]:
+    """Read one HTTP/1.1 response. Returns (status, headers, body, keep_alive).
+
+    With a `sink` the body is written there piece by piece as it arrives (and
+    `body` is b""), so a large one is never held in memory whole.
+    """
+    try:
+        status_line = await reader.readuntil(b"\r\n")
+    except (asyncio.IncompleteReadError, ConnectionError) as e:
+        raise _ConnectionLost(str(e)) from e
+    parts = status_line.decode("latin-1").split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+        raise _ConnectionLost(f"bad status line: {status_line[:80]!r}")
+    version, status = parts[0], int(parts[1])
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"\r\n":
+            break
+        k, _, v = line.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+
+    chunks: List[bytes] = []
+    put = sink.write if sink is not None else chunks.append
+
+    async def copy(n: int) -> None:
+        while n > 0:
+            piece = await reader.readexactly(min(n, READ_CHUNK))
+            put(piece)
+            n -= len(piece)
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+            if size == 0:
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                break
+            await copy(size)
+            await reader.readexactly(2)
+    elif "content-length" in headers:
+        await copy(int(headers["content-length"]))
+    else:
+        while True:
+            piece = await reader.read(READ_CHUNK)
+            if not piece:
+                break
+            put(piece)
+        headers["connection"] = "close"
+    body = b"".join(chunks)
+
+    conn_hdr = headers.get("connection", "").lower()
+    keep_alive = conn_hdr != "close" and not (version == "HTTP/1.0" and conn_hdr != "keep-alive")
+    return status, headers, body, keep_alive
+
+
+class OutscraperClient:
+    def __init__(
+        self,
+        api_key: str = API_KEY,
+        base_url: str = BASE_URL,
+        max_concurrency: int = 8,
+        timeout_s: float = 180.0,
+        max_retries: int = 4,
+        backoff_s: float = 5.0,
+        max_backoff_s: float = 120.0,
+        log: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        u = urllib.parse.urlsplit(base_url)
+        self.api_key = api_key
+        self.host = u.hostname or "localhost"
+        self.tls = u.scheme == "https"
+        self.port = u.port or (443 if self.tls else 80)
+        self.base_path = u.path.rstrip("/")
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.log = log or (lambda msg: None)
+
+        self._max_concurrency = max_concurrency
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._idle: List[Conn] = []
+        self._ssl = ssl.create_default_context() if self.tls else None
+        self.connections_opened = 0
+
+    # -- connection pool --------------------------------------------------
+
+    async def _acquire(self, fresh: bool = False) -> Tuple[Conn, bool]:
+        """A pooled connection (reused=True) or a new one; `fresh` skips the pool."""
+        while self._idle and not fresh:
+            conn = self._idle.pop()
+            if not conn[0].at_eof() and not conn[1].is_closing():
+                return conn, True
+            conn[1].close()
+        try:
+            reader, writer = await asyncio.open_connection(
+                self.host, self.port, ssl=self._ssl, server_hostname=self.host if self.tls else None
+            )
+        except OSError as e:
+            raise _ConnectFailed(str(e)) from e
+        self.connections_opened += 1
+        return (reader, writer), False
+
+    def _release(self, conn: Conn, keep_alive: bool) -> None:
+        if keep_alive:
+            self._idle.append(conn)
+        else:
+            conn[1].close()
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    # -- requests ---------------------------------------------------------
+
+    def _target(self, endpoint: str, params: Optional[Dict[str, Any]]) -> str:
+        target = f"{self.base_path}{endpoint}"
+        if params:
+            target += "?" + urllib.parse.urlencode(params, doseq=True)
+        return target
+
+    async def _send_once(
+        self, target: str, sink: Optional[IO[bytes]] = None, fresh: bool = False
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        request = (
+            f"GET {target} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\n"
+            f"X-API-KEY: {self.api_key}\r\n"
+            "Accept: application/json\r\n"
+            "Accept-Encoding: identity\r\n"
+            "Connection: keep-alive\r\n"
+            "\r\n"
+        ).encode("latin-1")
+
+        # A pooled connection may have been dropped by the server while idle;
+        # that shows up as an immediate EOF and is retried on a fresh socket.
+        # (`fresh` requests, which must not be sent twice, never take one.)
+        while True:
+            conn, reused = await self._acquire(fresh)
+            if sink is not None:
+                sink.seek(0)
+                sink.truncate()
+            try:
+                conn[1].write(request)
+                await conn[1].drain()
+                status, headers, body, keep_alive = await _read_response(conn[0], sink)
+            except (_ConnectionLost, ConnectionError, asyncio.IncompleteReadError) as e:
+                conn[1].close()
+                if reused:
+                    continue
+                raise _ConnectionLost(str(e)) from e
+            except (asyncio.LimitOverrunError, ValueError) as e:
+                # A status/header/chunk-size line over the stream limit, or a bad number in one.
+                conn[1].close()
+                raise _BadResponse(str(e)) from e
+            except BaseException:
+                conn[1].close()
+                raise
+            self._release(conn, keep_alive)
+            return status, headers, body
+
+    def _retry_delay(self, attempt: int, headers: Optional[Dict[str, str]] = None) -> float:
+        retry_after = (headers or {}).get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff_s)
+            except ValueError:
+                pass
+        return min(self.backoff_s * (2**attempt), self.max_backoff_s)
+
+    async def _fetch(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]],
+        sink: Optional[IO[bytes]],
+        idempotent: bool = True,
+    ) -> Tuple[Optional[int], bytes, Dict[str, Any]]:
+        """Send with retries. Returns (status, body, {}) or (None, b"", error dict).
+
+        A request that is not `idempotent` is only retried when it cannot have
+        reached the API (the connection never opened) or was refused (429);
+        after a timeout, a dropped connection or a 5xx it may have run, so the
+        error is returned instead.
+        """
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self._max_concurrency)
+        target = self._target(endpoint, params)
+
+        async with self._sem:
+            for attempt in range(self.max_retries + 1):
+                last = attempt == self.max_retries
+                try:
+                    status, headers, body = await asyncio.wait_for(
+                        self._send_once(target, sink, fresh=not idempotent), self.timeout_s
+                    )
+                except asyncio.TimeoutError:
+                    if last or not idempotent:
+                        return None, b"", {"error": f"timed out after {self.timeout_s:.0f}s"}
+                    wait = self._retry_delay(attempt)
+                    self.log(f"  Request timed out ({endpoint}). Retrying in {wait:.0f}s...")
+                    await asyncio.sleep(wait)
+                    continue
+                except _BadResponse as e:
+                    return None, b"", {"error": f"Bad response: {e}"}
+                except (_ConnectFailed, _ConnectionLost, OSError) as e:
+                    if last or not (idempotent or isinstance(e, _ConnectFailed)):
+                        return None, b"", {"error": str(e)}
+                    wait = self._retry_delay(attempt)
+                    self.log(f"  Request error ({endpoint}, attempt {attempt + 1}): {e}. Retrying in {wait:.0f}s...")
+                    await asyncio.sleep(wait)
+                    continue
+
+                if status in RETRY_STATUSES and not last and (idempotent or status == 429):
+                    wait = self._retry_delay(attempt, headers)
+                    self.log(f"  HTTP {status} ({endpoint}). Waiting {wait:.0f}s...")
+                    await asyncio.sleep(wait)
+                    continue
+                return status, body, {}
+
+        return None, b"", {"error": "Max retries exceeded"}
+
+    async def get(
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None, idempotent: bool = True
+    ) -> Dict[str, Any]:
+        """GET an endpoint and decode its JSON body (or an {"error": ...} dict)."""
+        status, body, err = await self._fetch(endpoint, params, None, idempotent)
+        if status is None:
+            return err
+        text = body.decode("utf-8", errors="replace")
+        if status >= 400:
+            return {"error": f"HTTP {status}", "detail": text[:2000]}
+        try:
+            return json.loads(text)
+        except ValueError as e:
+            return {"error": f"Bad JSON: {e}", "detail": text[:2000]}
+
+    async def submit(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """get() for a call that starts a job: not retried once it may have reached the API."""
+        return await self.get(endpoint, params, idempotent=False)
+
+    async def get_spooled(
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[IO[bytes]], Dict[str, Any]]:
+        """GET without decoding: (body file at offset 0, {}) or (None, error dict).
+
+        The body is copied to a SpooledTemporaryFile as it arrives (in memory
+        up to SPOOL_MAX_MEMORY, then on disk), for job_stream.py to parse
+        incrementally. The caller closes the file.
+        """
+        sink = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        status, _, err = await self._fetch(endpoint, params, sink)
+        if status is None or status >= 400:
+            detail = b""
+            if status is not None:
+                sink.seek(0)
+                detail = sink.read(2000)
+            sink.close()
+            return None, err or {"error": f"HTTP {status}", "detail": detail.decode("utf-8", errors="replace")}
+        sink.seek(0)
+        return sink, {}
+
+    async def get_many(self, calls: Iterable[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        return list(await asyncio.gather(*(self.get(ep, params) for ep, params in calls)))
+
+    async def poll_many(self, request_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch /requests/{id} for every id concurrently; returns id -> status body."""
+        ids = list(request_ids)
+        results = await self.get_many((f"/requests/{rid}", None) for rid in ids)
+        return dict(zip(ids, results))
+
+    async def poll_many_spooled(
+        self, request_ids: Iterable[str]
+    ) -> Dict[str, Tuple[Optional[IO[bytes]], Dict[str, Any]]]:
+        """poll_many(), with each body left undecoded (see get_spooled)."""
+        ids = list(request_ids)
+        results = await asyncio.gather(*(self.get_spooled(f"/requests/{rid}") for rid in ids))
+        return dict(zip(ids, results))
+
+
+class SyncOutscraperClient:
+    """Blocking facade over OutscraperClient; keeps one event loop (and pool) alive."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self._loop = asyncio.new_event_loop()
+        self.aio = OutscraperClient(*args, **kwargs)
+
+    def _run(self, coro: Any) -> Any:
+        return self._loop.run_until_complete(coro)
+
+    def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return self._run(self.aio.get(endpoint, params))
+
+    def submit(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return self._run(self.aio.submit(endpoint, params))
+
+    def get_many(self, calls: Iterable[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        return self._run(self.aio.get_many(calls))
+
+    def poll_many(self, request_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        return self._run(self.aio.poll_many(request_ids))
+
+    def get_spooled(
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[IO[bytes]], Dict[str, Any]]:
+        return self._run(self.aio.get_spooled(endpoint, params))
+
+    def poll_many_spooled(
+        self, request_ids: Iterable[str]
+    ) -> Dict[str, Tuple[Optional[IO[bytes]], Dict[str, Any]]]:
+        return self._run(self.aio.poll_many_spooled(request_ids))
+
+    def check_job(self, request_id: str) -> Dict[str, Any]:
+        return self.get(f"/requests/{request_id}")
+
+    def get_balance(self) -> Optional[float]:
+        prof = self.get("/profile")
+        if "error" in prof:
+            return None
+        try:
+            return float(prof.get("balance"))
+        except (TypeError, ValueError):
+            return None
+
+    def close(self) -> None:
+        if not self._loop.is_closed():
+            self._run(self.aio.close())
+            self._loop.close()
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""places_store.py
+
+One local store for every Outscraper category: a SQLite table keyed by
+(place_id, category), with indexes on category, city and postal code.
+
+The scrape scripts append batches through `PlacesStore.category(...)`, which
+keeps the interface the scripts used before it (append / len / in / iter_items / compact),
+so each batch is one transaction: either all of its new places land or none.
+A batch streamed in several appends (job_stream.py) wraps them in
+`store.batch()` to keep that.
+Within a category the first record for a place_id wins, as before; the same
+place may be listed under several categories.
+
+Exports are queries, not reloads:
+- `export_category()` writes the legacy il_<category>_results.json array
+- `export_master()` writes il_all_professionals_master.json (one record per
+  place_id, from the first category in `categories` order that has it)
+The `master` view and the `category_counts` view are there for ad-hoc
+`sqlite3` use.
+
+Coverage: a (category, city) -> (last_scraped, record_count) table, updated
+in the same transaction as each batch (`append(items, cities=...)`), so query
+planning is a primary-key lookup per city instead of a scan of every saved
+record (`plan_cities()`, optionally re-running cities older than N days).
+Categories stored before it existed are seeded from their places once.
+
+Stored records are the JSON text they arrived as, so exports join rows
+without re-encoding. On first use of a category its existing
+il_<category>_results.jsonl log (one place per line, as earlier versions of
+the scrape scripts appended them) or legacy JSON array is imported once.
+
+Storage is outscraper_places.sqlite next to the scripts (OUTSCRAPER_PLACES_DB
+moves it).
+
+Usage
+  python3 data/outscraper/places_store.py                    # counts per category
+  python3 data/outscraper/places_store.py --export           # rewrite every category file + master
+  python3 data/outscraper/places_store.py --import il_home_inspector_results.json "home inspector"
+
+  PLACES = PlacesStore()
+  store = PLACES.category("home inspector", "il_home_inspector_results.json")
+  cities = store.plan(CITIES_IL, older_than_s=30 * 86400)
+  total_unique, added = store.append(items, cities=batch_cities)
+  store.compact()
+
+Only stdlib is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DB_FILE = os.environ.get("OUTSCRAPER_PLACES_DB") or os.path.join(HERE, "outscraper_places.sqlite")
+MASTER_FILE = os.path.join(HERE, "il_all_professionals_master.json")
+
+# run_scrape.py's category order; export_master() takes a record from the first that has it.
+CATEGORIES = [
+    "real estate agent",
+    "mortgage lender",
+    "home inspector",
+    "real estate appraiser",
+    "real estate attorney",
+    "homeowners insurance agent",
+]
+
+# The primary key's leading column doubles as the place_id index.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS places (
+    place_id    TEXT NOT NULL,
+    category    TEXT NOT NULL,
+    name        TEXT,
+    city        TEXT,
+    postal_code TEXT,
+    search_city TEXT,
+    query       TEXT,
+    data        TEXT NOT NULL,
+    added_at    REAL NOT NULL,
+    PRIMARY KEY (place_id, category)
+);
+CREATE INDEX IF NOT EXISTS places_category ON places (category);
+CREATE INDEX IF NOT EXISTS places_city ON places (city);
+CREATE INDEX IF NOT EXISTS places_postal_code ON places (postal_code);
+CREATE TABLE IF NOT EXISTS imports (
+    category    TEXT PRIMARY KEY,
+    source      TEXT NOT NULL,
+    n           INTEGER NOT NULL,
+    imported_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    category     TEXT NOT NULL,
+    city         TEXT NOT NULL,
+    last_scraped REAL NOT NULL,
+    record_count INTEGER NOT NULL,
+    PRIMARY KEY (category, city)
+);
+CREATE VIEW IF NOT EXISTS master AS
+    SELECT * FROM places AS p
+    WHERE p.rowid = (SELECT MIN(rowid) FROM places WHERE place_id = p.place_id);
+CREATE VIEW IF NOT EXISTS category_counts AS
+    SELECT category, COUNT(*) AS n, MAX(added_at) AS last_added FROM places GROUP BY category;
+"""
+
+
+def _dump(item: Dict[str, Any]) -> str:
+    # Same separators as json.dump(list, ensure_ascii=False), so exports can
+    # join rows into an array without re-encoding.
+    return json.dumps(item, ensure_ascii=False)
+
+
+def place_id_of(item: Dict[str, Any]) -> str:
+    return (item.get("place_id") or "").strip()
+
+
+def city_from_query(q: str) -> str:
+    # "<cat> in <city>, IL"
+    if " in " in q:
+        city = q.split(" in ", 1)[1].strip()
+    else:
+        city = q.strip()
+    return city.removesuffix(", IL").strip()
+
+
+def _str(v: Any) -> Optional[str]:
+    if v is None:
+        return None
+    s = str(v).strip()
+    return s or None
+
+
+def _row(category: str, item: Dict[str, Any], now: float) -> Tuple[Any, ...]:
+    query = _str(item.get("_query") or item.get("query"))
+    search_city = _str(item.get("_il_city")) or (_str(city_from_query(query)) if query else None)
+    return (
+        place_id_of(item),
+        category,
+        _str(item.get("name")),
+        _str(item.get("city")),
+        _str(item.get("postal_code")),
+        search_city,
+        query,
+        _dump(item),
+        now,
+    )
+
+
+def _write_array(path: str, rows: Iterable[Tuple[str]]) -> int:
+    tmp = path + ".tmp"
+    n = 0
+    with open(tmp, "w", encoding="utf-8") as out:
+        out.write("[")
+        for (data,) in rows:
+            if n:
+                out.write(", ")
+            out.write(data)
+            n += 1
+        out.write("]")
+    os.replace(tmp, path)
+    return n
+
+
+class PlacesStore:
+    def __init__(self, path: str = DB_FILE) -> None:
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._depth = 0
+        self._coverage: Dict[Tuple[str, str], int] = {}
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        # Opened lazily so importing a script never touches the file.
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def category(self, category: str, json_path: str) -> "CategoryStore":
+        """The per-category handle the scrape scripts write through."""
+        self.import_legacy(category, json_path)
+        self.seed_coverage(category)
+        return CategoryStore(self, category, json_path)
+
+    # -- writes -----------------------------------------------------------
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group writes into one transaction: committed on exit, rolled back on error.
+
+        Nested uses join the outermost one, so add() calls inside it commit
+        together, and their coverage counts are summed per city and written
+        once at the end.
+        """
+        self._depth += 1
+        try:
+            if self._depth > 1:
+                yield
+                return
+            try:
+                with self.db:
+                    yield
+                    if self._coverage:
+                        now = time.time()
+                        self.db.executemany(
+                            "INSERT INTO coverage (category, city, last_scraped, record_count) VALUES (?, ?, ?, ?) "
+                            "ON CONFLICT(category, city) DO UPDATE SET "
+                            "last_scraped = excluded.last_scraped, record_count = excluded.record_count",
+                            [(cat, city, now, n) for (cat, city), n in self._coverage.items()],
+                        )
+            finally:
+                self._coverage.clear()
+        finally:
+            self._depth -= 1
+
+    def add(self, category: str, items: Iterable[Dict[str, Any]], cities: Optional[Iterable[str]] = None) -> int:
+        """Insert records with place_ids new to `category`, in one transaction. Returns rows added.
+
+        `cities` are the searched cities the batch answered (even with no
+        results); their coverage entries are updated in the same transaction.
+        """
+        now = time.time()
+        rows = [_row(category, it, now) for it in items if place_id_of(it)]
+        cities = list(cities or ())
+        if not rows and not cities:
+            return 0
+        with self.transaction():
+            before = self.db.total_changes
+            self.db.executemany("INSERT OR IGNORE INTO places VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            added = self.db.total_changes - before
+            if cities:
+                per_city: Dict[str, int] = dict.fromkeys(cities, 0)
+                for r in rows:
+                    if r[5] in per_city:
+                        per_city[r[5]] += 1
+                for c, n in per_city.items():
+                    key = (category, c)
+                    self._coverage[key] = self._coverage.get(key, 0) + n
+        return added
+
+    def seed_coverage(self, category: str) -> int:
+        """Build a category's coverage entries from its stored places, if it has none yet.
+
+        For results saved before coverage was tracked: a city counts as
+        scraped when it was searched, as of its newest stored place.
+        """
+        if self.db.execute("SELECT 1 FROM coverage WHERE category = ? LIMIT 1", (category,)).fetchone():
+            return 0
+        with self.db:
+            cur = self.db.execute(
+                "INSERT OR IGNORE INTO coverage (category, city, last_scraped, record_count) "
+                "SELECT category, search_city, MAX(added_at), COUNT(*) FROM places "
+                "WHERE category = ? AND search_city IS NOT NULL GROUP BY search_city",
+                (category,),
+            )
+        return cur.rowcount
+
+    def import_legacy(self, category: str, json_path: str, force: bool = False) -> int:
+        """Import a category's .jsonl append log (or legacy JSON array) once. Returns rows added."""
+        if not force and self.db.execute("SELECT 1 FROM imports WHERE category = ?", (category,)).fetchone():
+            return 0
+        base = json_path[: -len(".json")] if json_path.endswith(".json") else json_path
+        items: List[Dict[str, Any]] = []
+        source = ""
+        if os.path.exists(base + ".jsonl"):
+            source = base + ".jsonl"
+            with open(source, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.endswith("\n") and line.strip():
+                        items.append(json.loads(line))
+        elif os.path.exists(json_path):
+            source = json_path
+            with open(json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, list):
+                items = [x for x in data if isinstance(x, dict)]
+
+        now = time.time()
+        # Legacy records carry no timestamp; the file's mtime is when they were saved.
+        saved_at = os.path.getmtime(source) if source else now
+        rows = [_row(category, it, saved_at) for it in items if place_id_of(it)]
+        with self.db:
+            before = self.db.total_changes
+            self.db.executemany("INSERT OR IGNORE INTO places VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            added = self.db.total_changes - before
+            self.db.execute(
+                "INSERT OR REPLACE INTO imports (category, source, n, imported_at) VALUES (?, ?, ?, ?)",
+                (category, source, added, now),
+            )
+        return added
+
+    # -- reads ------------------------------------------------------------
+
+    def count(self, category: Optional[str] = None) -> int:
+        if category is None:
+            (n,) = self.db.execute("SELECT COUNT(*) FROM places").fetchone()
+        else:
+            (n,) = self.db.execute("SELECT COUNT(*) FROM places WHERE category = ?", (category,)).fetchone()
+        return n
+
+    def has(self, category: str, place_id: str) -> bool:
+        row = self.db.execute(
+            "SELECT 1 FROM places WHERE place_id = ? AND category = ?", (place_id, category)
+        ).fetchone()
+        return row is not None
+
+    def iter_items(self, category: str) -> Iterator[Dict[str, Any]]:
+        for (data,) in self.db.execute("SELECT data FROM places WHERE category = ? ORDER BY rowid", (category,)):
+            yield json.loads(data)
+
+    def coverage(self, category: str) -> Dict[str, Tuple[float, int]]:
+        """city -> (last_scraped, record_count) for one category."""
+        rows = self.db.execute("SELECT city, last_scraped, record_count FROM coverage WHERE category = ?", (category,))
+        return {city: (ts, n) for city, ts, n in rows}
+
+    def plan_cities(self, category: str, cities: Iterable[str], older_than_s: Optional[float] = None) -> List[str]:
+        """The `cities` still to scrape: never scraped, or (with older_than_s) last scraped longer ago."""
+        covered = self.coverage(category)
+        cutoff = time.time() - older_than_s if older_than_s is not None else None
+        out = []
+        for c in cities:
+            hit = covered.get(c)
+            if hit is None or (cutoff is not None and hit[0] < cutoff):
+                out.append(c)
+        return out
+
+    def categories(self) -> List[Tuple[str, int]]:
+        return list(self.db.execute("SELECT category, n FROM category_counts ORDER BY category"))
+
+    def coverage_summary(self) -> List[Tuple[str, int, float]]:
+        """(category, cities covered, oldest last_scraped) per category."""
+        return list(
+            self.db.execute(
+                "SELECT category, COUNT(*), MIN(last_scraped) FROM coverage GROUP BY category ORDER BY category"
+            )
+        )
+
+    # -- exports ----------------------------------------------------------
+
+    def export_category(self, category: str, json_path: str) -> int:
+        """Write the legacy JSON array for one category. Returns the record count.
+
+        Never replaces a non-empty legacy file with an empty array.
+        """
+        if not self.count(category) and os.path.exists(json_path) and os.path.getsize(json_path) > 2:
+            return 0
+        rows = self.db.execute("SELECT data FROM places WHERE category = ? ORDER BY rowid", (category,))
+        return _write_array(json_path, rows)
+
+    def export_master(self, json_path: str = MASTER_FILE, categories: Sequence[str] = CATEGORIES) -> int:
+        """One record per place_id across `categories`, first category in list order wins."""
+        cats = list(categories)
+        if not cats:
+            return 0
+        marks = ",".join("?" * len(cats))
+        rank = "CASE category " + " ".join(f"WHEN ? THEN {i}" for i in range(len(cats))) + " END"
+        sql = (
+            "SELECT data FROM ("
+            f"  SELECT data, {rank} AS cat_rank, rowid AS seq,"
+            f"         ROW_NUMBER() OVER (PARTITION BY place_id ORDER BY {rank}, rowid) AS pick"
+            f"  FROM places WHERE category IN ({marks})"
+            ") WHERE pick = 1 ORDER BY cat_rank, seq"
+        )
+        return _write_array(json_path, self.db.execute(sql, cats + cats + cats))
+
+
+class CategoryStore:
+    """One category of a PlacesStore: append / len / in / iter_items / compact."""
+
+    def __init__(self, places: PlacesStore, category: str, json_path: str) -> None:
+        self.places = places
+        self.category = category
+        self.json_path = json_path
+        self._n = places.count(category)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __contains__(self, place_id: str) -> bool:
+        return self.places.has(self.category, place_id)
+
+    def append(self, new_items: Iterable[Dict[str, Any]], cities: Optional[Iterable[str]] = None) -> Tuple[int, int]:
+        """Add records with unseen place_ids (one transaction). Returns (total_unique, newly_added).
+
+        Pass the batch's searched `cities` to record them as covered.
+        """
+        added = self.places.add(self.category, new_items, cities)
+        self._n += added
+        return (self._n, added)
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator["CategoryStore"]:
+        """append() calls inside share one transaction: all of them land or none do."""
+        n = self._n
+        try:
+            with self.places.transaction():
+                yield self
+        except BaseException:
+            self._n = n
+            raise
+
+    def iter_items(self) -> Iterator[Dict[str, Any]]:
+        return self.places.iter_items(self.category)
+
+    def plan(self, cities: Iterable[str], older_than_s: Optional[float] = None) -> List[str]:
+        return self.places.plan_cities(self.category, cities, older_than_s)
+
+    def compact(self) -> int:
+        """Write the legacy JSON array (atomically). Returns the record count."""
+        return self.places.export_category(self.category, self.json_path)
+
+
+def category_filename(category: str) -> str:
+    return os.path.join(HERE, f"il_{category.replace(' ', '_')}_results.json")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Outscraper places store: counts / exports / imports.")
+    ap.add_argument("--path", default=DB_FILE, help="Store file (default: %(default)s)")
+    ap.add_argument("--export", action="store_true", help="Rewrite every category's JSON file and the master file")
+    ap.add_argument("--import", dest="import_", nargs=2, metavar=("JSON", "CATEGORY"),
+                    help="Import a results file (or its .jsonl log) under CATEGORY")
+    args = ap.parse_args()
+
+    store = PlacesStore(args.path)
+    if args.import_:
+        path, category = args.import_
+        print(f"Imported {store.import_legacy(category, os.path.abspath(path), force=True):,} new places under '{category}'")
+    if args.export:
+        for category, _ in store.categories():
+            path = category_filename(category)
+            print(f"  {os.path.basename(path)}: {store.export_category(category, path):,}")
+        print(f"  {os.path.basename(MASTER_FILE)}: {store.export_master():,}")
+    print(f"Store: {args.path}")
+    covered = {c: (n, oldest) for c, n, oldest in store.coverage_summary()}
+    for category, n in store.categories():
+        cities, oldest = covered.get(category, (0, None))
+        since = f", oldest {time.strftime('%Y-%m-%d', time.localtime(oldest))}" if oldest else ""
+        print(f"  {category:<28} {n:>8,} places | {cities:>3} cities scraped{since}")
+    print(f"  {'(unique place_ids)':<28} {store.db.execute('SELECT COUNT(*) FROM master').fetchone()[0]:>8,}")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""response_cache.py
+
+Content-addressed cache of Outscraper Maps search results, one entry per query.
+
+Reruns of the scrape scripts resend the same "real estate agent in Naperville, IL"
+queries; each resend costs money and minutes. Entries are keyed by
+sha256(endpoint + normalized query + search params), where the query is
+lower-cased with whitespace collapsed and `async` is ignored, so a query hits
+whichever batch it was fetched in.
+
+- TTL: entries older than `ttl_s` (default 30 days) are misses and get purged
+- LRU: when the stored bytes exceed `max_bytes` the least recently used
+  entries are evicted
+- stats: hits/fetches plus the results and job seconds that were not re-fetched,
+  so `--stats` can report spend and wall time saved
+
+Storage is one SQLite file (outscraper_cache.sqlite next to the scripts; set
+OUTSCRAPER_CACHE=off to bypass it, or to a path to move it).
+
+Usage
+  python3 data/outscraper/response_cache.py --stats
+  python3 data/outscraper/response_cache.py --purge      # drop expired entries
+
+  CACHE = ResponseCache()
+  cached = CACHE.get_batch("/maps/search-v3", queries, params)  # per-query lists, or None
+  cached = CACHE.get_batch("/maps/search-v3", queries, params, fetched_after=cutoff)  # rescrape
+  hits, rest = CACHE.split("/maps/search-v3", queries, params)    # partial hits
+  CACHE.put_batch("/maps/search-v3", queries, params, per_query_results, latency_s)
+  with CACHE.writer("/maps/search-v3", params, latency_s, len(queries)) as put:
+      put(query, results)                                          # one query at a time
+
+Only stdlib is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE = os.environ.get("OUTSCRAPER_CACHE") or os.path.join(HERE, "outscraper_cache.sqlite")
+
+DEFAULT_TTL_S = 30 * 24 * 3600
+DEFAULT_MAX_BYTES = 1 << 30
+
+# Outscraper Maps pricing is per returned place (~$3 per 1,000 past the free tier).
+COST_PER_RESULT_USD = 0.003
+
+# Params that don't change what a query returns.
+_IGNORED_PARAMS = ("query", "async")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key        TEXT PRIMARY KEY,
+    endpoint   TEXT NOT NULL,
+    query      TEXT NOT NULL,
+    params     TEXT NOT NULL,
+    body       BLOB NOT NULL,
+    n_results  INTEGER NOT NULL,
+    size       INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    last_used  REAL NOT NULL,
+    fetch_s    REAL NOT NULL,
+    hits       INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def normalize_query(q: str) -> str:
+    return " ".join(q.lower().split())
+
+
+def _params_json(params: Dict[str, Any]) -> str:
+    kept = {k: params[k] for k in sorted(params) if k not in _IGNORED_PARAMS}
+    return json.dumps(kept, sort_keys=True, separators=(",", ":"))
+
+
+def cache_key(endpoint: str, query: str, params: Dict[str, Any]) -> str:
+    raw = "\n".join((endpoint, normalize_query(query), _params_json(params)))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path: str = CACHE_FILE,
+        ttl_s: float = DEFAULT_TTL_S,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.enabled = path.lower() not in ("off", "0", "none")
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        # Opened lazily so importing a script never touches the file.
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _bump(self, **deltas: float) -> None:
+        self.db.executemany(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            list(deltas.items()),
+        )
+
+    # -- reads ------------------------------------------------------------
+
+    def _fetch(
+        self, endpoint: str, queries: Sequence[str], params: Dict[str, Any], fetched_after: float = 0.0
+    ) -> Tuple[Dict[str, List[Dict[str, Any]]], List[str], List[Tuple[str, int, float]]]:
+        now = time.time()
+        keys = {q: cache_key(endpoint, q, params) for q in queries}
+        rows: Dict[str, Tuple[bytes, int, float, float]] = {}
+        key_list = list(set(keys.values()))
+        for i in range(0, len(key_list), 500):
+            chunk = key_list[i : i + 500]
+            marks = ",".join("?" * len(chunk))
+            for key, body, n, fetched_at, fetch_s in self.db.execute(
+                f"SELECT key, body, n_results, fetched_at, fetch_s FROM entries WHERE key IN ({marks})", chunk
+            ):
+                rows[key] = (body, n, fetched_at, fetch_s)
+
+        hits: Dict[str, List[Dict[str, Any]]] = {}
+        misses: List[str] = []
+        used: List[Tuple[str, int, float]] = []
+        for q in queries:
+            row = rows.get(keys[q])
+            if row is None or now - row[2] > self.ttl_s or row[2] < fetched_after:
+                misses.append(q)
+                continue
+            hits[q] = json.loads(zlib.decompress(row[0]))
+            used.append((keys[q], row[1], row[3]))
+        return hits, misses, used
+
+    def _record_hits(self, used: List[Tuple[str, int, float]]) -> None:
+        if not used:
+            return
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                "UPDATE entries SET last_used = ?, hits = hits + 1 WHERE key = ?", [(now, k) for k, _, _ in used]
+            )
+            self._bump(
+                hits=len(used),
+                saved_results=sum(n for _, n, _ in used),
+                saved_s=sum(s for _, _, s in used),
+            )
+
+    def get_batch(
+        self, endpoint: str, queries: Sequence[str], params: Dict[str, Any], fetched_after: float = 0.0
+    ) -> Optional[List[List[Dict[str, Any]]]]:
+        """Per-query results (nested, in query order) if every query is fresh, else None.
+
+        Entries fetched before `fetched_after` (a timestamp) count as misses too,
+        so a rescrape of cities older than N days doesn't get N+1-day-old answers.
+        """
+        if not self.enabled or not queries:
+            return None
+        hits, misses, used = self._fetch(endpoint, queries, params, fetched_after)
+        if misses:
+            return None
+        self._record_hits(used)
+        return [hits[q] for q in queries]
+
+    def split(
+        self, endpoint: str, queries: Sequence[str], params: Dict[str, Any], fetched_after: float = 0.0
+    ) -> Tuple[Dict[str, List[Dict[str, Any]]], List[str]]:
+        """For batch loops: (fresh cached results by query, queries still to fetch).
+
+        Only a partially cached batch is split. A fully cached one comes back
+        as ({}, queries) so the start-job call can answer it whole via
+        get_batch(); an uncached one is ({}, queries) as well. `fetched_after`
+        is as in get_batch().
+        """
+        if not self.enabled or not queries:
+            return {}, list(queries)
+        hits, misses, used = self._fetch(endpoint, queries, params, fetched_after)
+        if not hits or not misses:
+            return {}, list(queries)
+        self._record_hits(used)
+        return hits, misses
+
+    # -- writes -----------------------------------------------------------
+
+    def put_batch(
+        self,
+        endpoint: str,
+        queries: Sequence[str],
+        params: Dict[str, Any],
+        per_query: Sequence[Any],
+        latency_s: float = 0.0,
+    ) -> int:
+        """Store one finished job's per-query results. Returns the entries written.
+
+        `per_query[i]` must be the result list for `queries[i]` (the nested
+        response shape); anything else is not cached.
+        """
+        if not self.enabled or not queries or len(per_query) != len(queries):
+            return 0
+        if not all(isinstance(r, list) for r in per_query):
+            return 0
+
+        now = time.time()
+        params_json = _params_json(params)
+        fetch_s = latency_s / len(queries)
+        rows = []
+        for q, results in zip(queries, per_query):
+            body = zlib.compress(json.dumps(results, ensure_ascii=False).encode("utf-8"))
+            rows.append(
+                (cache_key(endpoint, q, params), endpoint, normalize_query(q), params_json,
+                 body, len(results), len(body), now, now, fetch_s)
+            )
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO entries "
+                "(key, endpoint, query, params, body, n_results, size, fetched_at, last_used, fetch_s) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._bump(fetched=len(rows))
+        self.evict()
+        return len(rows)
+
+    @contextlib.contextmanager
+    def writer(
+        self, endpoint: str, params: Dict[str, Any], latency_s: float = 0.0, n_queries: int = 1
+    ) -> Iterator[Callable[[str, List[Any]], None]]:
+        """put_batch() one query at a time, for results streamed off a job.
+
+        Yields `put(query, results)`; the entries commit together on exit
+        (nothing is kept on error), then the cache is evicted once.
+        """
+        if not self.enabled:
+            yield lambda q, results: None
+            return
+        params_json = _params_json(params)
+        fetch_s = latency_s / max(1, n_queries)
+        written = 0
+
+        def put(q: str, results: List[Any]) -> None:
+            nonlocal written
+            now = time.time()
+            body = zlib.compress(json.dumps(results, ensure_ascii=False).encode("utf-8"))
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(key, endpoint, query, params, body, n_results, size, fetched_at, last_used, fetch_s) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(endpoint, q, params), endpoint, normalize_query(q), params_json,
+                 body, len(results), len(body), now, now, fetch_s),
+            )
+            written += 1
+
+        with self.db:
+            yield put
+            if written:
+                self._bump(fetched=written)
+        if written:
+            self.evict()
+
+    def purge_expired(self) -> int:
+        with self.db:
+            cur = self.db.execute("DELETE FROM entries WHERE fetched_at < ?", (time.time() - self.ttl_s,))
+        return cur.rowcount
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+        removed = self.purge_expired()
+        (total,) = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if total <= self.max_bytes:
+            return removed
+
+        doomed: List[str] = []
+        for key, size in self.db.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            doomed.append(key)
+            total -= size
+        with self.db:
+            self.db.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in doomed])
+            self._bump(evicted=len(doomed))
+        return removed + len(doomed)
+
+    # -- report -----------------------------------------------------------
+
+    def stats(self, cost_per_result: float = COST_PER_RESULT_USD) -> Dict[str, Any]:
+        counters = dict(self.db.execute("SELECT name, value FROM counters"))
+        entries, size, results, expired = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(n_results), 0), "
+            "COALESCE(SUM(fetched_at < ?), 0) FROM entries",
+            (time.time() - self.ttl_s,),
+        ).fetchone()
+        hits = int(counters.get("hits", 0))
+        fetched = int(counters.get("fetched", 0))
+        saved_results = int(counters.get("saved_results", 0))
+        return {
+            "entries": entries,
+            "expired": expired,
+            "bytes": size,
+            "cached_results": results,
+            "hits": hits,
+            "fetched": fetched,
+            "hit_rate": hits / max(hits + fetched, 1),
+            "evicted": int(counters.get("evicted", 0)),
+            "saved_results": saved_results,
+            "saved_usd": saved_results * cost_per_result,
+            "saved_s": counters.get("saved_s", 0.0),
+        }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Outscraper response cache maintenance / report.")
+    ap.add_argument("--path", default=CACHE_FILE, help="Cache file (default: %(default)s)")
+    ap.add_argument("--stats", action="store_true", help="Print hit rate and API spend / wall time saved (default)")
+    ap.add_argument("--purge", action="store_true", help="Delete expired entries")
+    ap.add_argument("--ttl-days", type=float, default=DEFAULT_TTL_S / 86400, help="Entry lifetime in days")
+    ap.add_argument("--cost-per-result", type=float, default=COST_PER_RESULT_USD, help="USD per returned place")
+    args = ap.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"No cache at {args.path}")
+        return 0
+
+    cache = ResponseCache(args.path, ttl_s=args.ttl_days * 86400)
+    if args.purge:
+        print(f"Purged {cache.purge_expired()} expired entries")
+    if args.stats or not args.purge:
+        s = cache.stats(args.cost_per_result)
+        print(f"Cache: {args.path}")
+        print(f"  Entries: {s['entries']:,} ({s['expired']:,} expired) | {s['bytes'] / 1e6:.1f} MB | {s['cached_results']:,} results")
+        print(f"  Queries: {s['hits']:,} served from cache / {s['fetched']:,} fetched ({s['hit_rate'] * 100:.1f}% hit rate)")
+        print(f"  Evicted (LRU): {s['evicted']:,}")
+        print(f"  Saved: {s['saved_results']:,} results ≈ ${s['saved_usd']:.2f} API spend, {s['saved_s'] / 60:.1f} min of job time")
+    cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -9,41 +9,70 @@ Fixes prior parsing bug by handling BOTH Outscraper response shapes:
 
 Requirements from main task:
 - async API
-- batch size <= 15
-- poll interval 15s
+- batch size <= 15 (scheduler.py sizes batches up to that per category
+  from past job latency, persisted in scheduler_model.json)
+- poll interval 15s (first poll at the predicted completion, then backoff)
+- queries with a fresh entry in the response cache (response_cache.py) are not
+  re-sent; a fully cached batch is answered without starting a job
 - timeout 45 minutes per batch
-- append to per-category result files; never overwrite
+- append to per-category results; never overwrite
+  (each batch is one transaction in the shared places store, exported to the
+  legacy il_<cat>_results.json once per category; see places_store.py)
+- finished jobs are read off the response a query at a time (job_stream.py),
+  so a large job's JSON is never decoded whole
 - deduplicate by place_id
-- skip already-covered cities for mortgage lender + home inspector based on existing saved results
+- skip already-covered cities, per category, from the coverage index in the
+  places store (`--rescrape-older-than DAYS` re-runs cities scraped before then)
 - log to data/outscraper/scrape_log_fixed.txt
 - print balance after each category
 
+Pipelined mode (`--in-flight N`, N > 1) keeps N async jobs running at once,
+polls every outstanding request id in one loop, and saves each job's items as
+soon as it finishes (same place_id dedup / append-only save as serial mode).
+Outstanding jobs are polled concurrently over the shared keep-alive client:
+  python3 data/outscraper/run_fixed_scrape.py --in-flight 4
+
 Only stdlib is used.
 """
 
 from __future__ import annotations
 
+import argparse
 import json
 import os
 import sys
 import time
-import urllib.error
-import urllib.parse
-import urllib.request
-from typing import Any, Dict, Iterable, List, Optional, Tuple
-
-API_KEY = os.environ.get(
-    "OUTSCRAPER_API_KEY",
-    "",
-)
-BASE_URL = "https://api.app.outscraper.com"
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from outscraper_client import SyncOutscraperClient
+from job_stream import BAD_JSON, JobStatus, answered_queries, save_job
+from places_store import CategoryStore, PlacesStore, city_from_query
+from response_cache import ResponseCache
+from scheduler import AdaptiveScheduler
 
 HERE = os.path.dirname(os.path.abspath(__file__))  # data/outscraper
 LOG_FILE = os.path.join(HERE, "scrape_log_fixed.txt")
 
 BATCH_SIZE = 15
+MAX_BATCH = 15  # the task caps batches at 15 queries; the scheduler may only go lower
 POLL_INTERVAL_S = 15
 POLL_TIMEOUT_S = 45 * 60
+SUBMIT_BACKOFF_S = 30  # after a submit error (jobs in flight keep being polled)
+MAX_SUBMIT_ATTEMPTS = 3  # per batch, with --in-flight > 1, before leaving it for the next run
+SCHEDULER_FILE = os.path.join(HERE, "scheduler_model.json")
+
+SEARCH_ENDPOINT = "/maps/search-v3"
+# Everything but the queries; with each query this is also the response-cache key.
+SEARCH_PARAMS: Dict[str, Any] = {
+    "limit": 500,
+    "language": "en",
+    "region": "US",
+    "dropDuplicates": "true",
+    # keep enrichments off by default to reduce cost; enable only if needed
+    # "enrichments": ["emails_and_contacts"],
+}
 
 CITIES_IL = [
     "Chicago Loop",
@@ -142,27 +171,27 @@ def log(msg: str) -> None:
         f.write(line + "\n")
 
 
-def api_request(endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    url = f"{BASE_URL}{endpoint}"
-    if params:
-        url += "?" + urllib.parse.urlencode(params, doseq=True)
+# Shared keep-alive client (reads OUTSCRAPER_API_KEY / OUTSCRAPER_BASE_URL)
+CLIENT = SyncOutscraperClient(log=log)
 
-    req = urllib.request.Request(url)
-    req.add_header("X-API-KEY", API_KEY)
+# Learned per-category batch sizes / poll timing (BATCH_SIZE until there is history)
+SCHED = AdaptiveScheduler(
+    SCHEDULER_FILE,
+    timeout_s=POLL_TIMEOUT_S,
+    default_batch=BATCH_SIZE,
+    max_batch=MAX_BATCH,
+    min_poll_s=POLL_INTERVAL_S,
+)
 
-    try:
-        with urllib.request.urlopen(req, timeout=180) as resp:
-            raw = resp.read().decode("utf-8")
-            return json.loads(raw)
-    except urllib.error.HTTPError as e:
-        body = e.read().decode("utf-8", errors="replace") if getattr(e, "fp", None) else ""
-        return {"error": f"HTTP {e.code}", "detail": body[:2000]}
-    except Exception as e:
-        return {"error": str(e)}
+# Per-query response cache: reruns reuse fresh results instead of paying again
+CACHE = ResponseCache()
+
+# Every category's places, one SQLite store (places_store.py)
+PLACES = PlacesStore()
 
 
 def get_balance() -> Optional[float]:
-    prof = api_request("/profile")
+    prof = CLIENT.get("/profile")
     if "error" in prof:
         log(f"⚠️ Could not fetch profile: {prof}")
         return None
@@ -178,98 +207,22 @@ def category_to_filename(category: str) -> str:
     return os.path.join(HERE, f"il_{safe}_results.json")
 
 
-def load_existing_results(path: str) -> List[Dict[str, Any]]:
-    if not os.path.exists(path):
-        return []
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, list):
-            return [x for x in data if isinstance(x, dict)]
-        return []
-    except Exception as e:
-        log(f"⚠️ Failed reading existing results {path}: {e}")
-        return []
-
-
-def save_appending_dedup(path: str, existing: List[Dict[str, Any]], new_items: List[Dict[str, Any]]) -> Tuple[int, int]:
-    """Append new_items to existing, dedup by place_id, write full list.
-
-    Returns: (total_unique, newly_added_unique)
-    """
-    seen: set[str] = set()
-    out: List[Dict[str, Any]] = []
-
-    def add(item: Dict[str, Any]) -> bool:
-        pid = (item.get("place_id") or "").strip()
-        if not pid:
-            return False
-        if pid in seen:
-            return False
-        seen.add(pid)
-        out.append(item)
-        return True
-
-    for it in existing:
-        add(it)
-
-    added = 0
-    for it in new_items:
-        if add(it):
-            added += 1
-
-    tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(out, f, ensure_ascii=False)
-    os.replace(tmp, path)
-
-    return (len(out), added)
-
-
 def build_queries(category: str, cities: Iterable[str]) -> List[str]:
     return [f"{category} in {city}, IL" for city in cities]
 
 
-def city_from_query(q: str) -> str:
-    # "<cat> in <city>, IL"
-    if " in " in q:
-        city = q.split(" in ", 1)[1].strip()
-    else:
-        city = q.strip()
-    city = city.removesuffix(", IL").strip()
-    return city
-
-
-def covered_cities_from_results(items: List[Dict[str, Any]]) -> set[str]:
-    cities: set[str] = set()
-    for it in items:
-        # Prefer our explicit fields
-        c = (it.get("_il_city") or "").strip()
-        if c:
-            cities.add(c)
-            continue
-        q = (it.get("_query") or it.get("query") or "").strip()
-        if q:
-            cities.add(city_from_query(q))
-    return cities
-
-
-def start_async_job(batch_queries: List[str]) -> Dict[str, Any]:
-    params: Dict[str, Any] = {
-        "query": batch_queries,
-        "limit": 500,
-        "async": "true",
-        "language": "en",
-        "region": "US",
-        "dropDuplicates": "true",
-        # keep enrichments off by default to reduce cost; enable only if needed
-        # "enrichments": ["emails_and_contacts"],
-    }
-    return api_request("/maps/search-v3", params)
+def start_async_job(batch_queries: List[str], fetched_after: float = 0.0) -> Dict[str, Any]:
+    cached = CACHE.get_batch(SEARCH_ENDPOINT, batch_queries, SEARCH_PARAMS, fetched_after)
+    if cached is not None:
+        # Every query is fresh in the cache: answer like a sync response.
+        return {"status": "Success", "data": cached, "cached": True}
+    params: Dict[str, Any] = {"query": batch_queries, "async": "true", **SEARCH_PARAMS}
+    return CLIENT.submit(SEARCH_ENDPOINT, params)
 
 
-def check_job(request_id: str) -> Dict[str, Any]:
-    return api_request(f"/requests/{request_id}")
+def check_job(request_id: str) -> JobStatus:
+    # Spooled, not decoded: a finished job's places are streamed by save_job().
+    return JobStatus.read(*CLIENT.get_spooled(f"/requests/{request_id}"))
 
 
 def normalize_data_shape(data: Any) -> Tuple[str, List[List[Dict[str, Any]]]]:
@@ -300,7 +253,7 @@ def normalize_data_shape(data: Any) -> Tuple[str, List[List[Dict[str, Any]]]]:
     return ("unknown", [])
 
 
-def poll_until_complete(request_id: str, batch_queries: List[str]) -> Dict[str, Any]:
+def poll_until_complete(request_id: str, batch_queries: List[str], delays: Iterator[float]) -> JobStatus:
     deadline = time.time() + POLL_TIMEOUT_S
     poll_n = 0
     while True:
@@ -315,6 +268,7 @@ def poll_until_complete(request_id: str, batch_queries: List[str]) -> Dict[str,
         if st == "Error":
             return status
 
+        status.close()
         if time.time() >= deadline:
             status["status"] = "Timeout"
             return status
@@ -322,7 +276,7 @@ def poll_until_complete(request_id: str, batch_queries: List[str]) -> Dict[str,
         if poll_n == 1 or poll_n % 10 == 0:
             log(f"  ⏳ Job {request_id} status={st} (poll {poll_n})")
 
-        time.sleep(POLL_INTERVAL_S)
+        time.sleep(min(next(delays), max(0.0, deadline - time.time())))
 
 
 def extract_items_from_status(status: Dict[str, Any], batch_queries: List[str], category: str) -> List[Dict[str, Any]]:
@@ -368,46 +322,219 @@ def extract_items_from_status(status: Dict[str, Any], batch_queries: List[str],
     return out
 
 
-def run_category(category: str) -> None:
-    path = category_to_filename(category)
-    existing = load_existing_results(path)
+def rescrape_cutoff(older_than_s: Optional[float]) -> float:
+    """Oldest cache entry a run may use: a city re-planned as stale must really be searched again."""
+    return time.time() - older_than_s if older_than_s is not None else 0.0
 
-    # Determine cities to run
-    all_cities = list(CITIES_IL)
 
-    if category in ("mortgage lender", "home inspector"):
-        covered = covered_cities_from_results(existing)
-        if covered:
-            all_cities = [c for c in all_cities if c not in covered]
-            log(f"Skipping {len(covered)} already-covered cities for '{category}'. Remaining: {len(all_cities)}")
-        else:
-            log(f"No covered cities detected for '{category}' (existing file empty or missing fields). Running all {len(all_cities)} cities.")
+def take_cached(
+    batch: List[str], category: str, store: CategoryStore, fetched_after: float = 0.0
+) -> Tuple[List[str], int]:
+    """Save the cached part of a partially cached batch. Returns (queries to send, added).
+
+    Cache entries fetched before `fetched_after` are ignored (see rescrape_cutoff()).
+    """
+    hits, rest = CACHE.split(SEARCH_ENDPOINT, batch, SEARCH_PARAMS, fetched_after)
+    if not hits:
+        return rest, 0
+    cached_qs = [q for q in batch if q in hits]
+    items = extract_items_from_status({"data": [hits[q] for q in cached_qs]}, cached_qs, category)
+    total_unique, added = store.append(items, cities=[city_from_query(q) for q in cached_qs])
+    log(f"  💾 {len(cached_qs)} queries served from cache: added {added} new unique (total {total_unique}). Sending {len(rest)}.")
+    return rest, added
+
+
+@dataclass
+class RunningJob:
+    bnum: int
+    batch: List[str]
+    started: float
+    deadline: float
+    delays: Iterator[float]
+    next_poll: float
+    polls: int = 0
+
+
+def run_category_pipelined(
+    category: str,
+    store: CategoryStore,
+    queries: List[str],
+    in_flight: int,
+    fetched_after: float = 0.0,
+) -> None:
+    """Keep up to `in_flight` jobs running; save each batch as its job completes.
+
+    Appends happen one at a time on this thread, so dedup by place_id and the
+    append-only guarantee are the same as in the serial loop. A batch whose
+    submit fails goes back on a retry queue (drained before new queries are
+    taken) and submits pause for SUBMIT_BACKOFF_S while running jobs are polled.
+    """
+    retry: Deque[Tuple[List[str], int]] = deque()
+    pos = 0
+    bnum = 0
+    running: Dict[str, RunningJob] = {}
+    total_new_unique = 0
+    next_submit_at = 0.0
+
+    def save(items: List[Dict[str, Any]], batch: List[str]) -> Tuple[int, int]:
+        nonlocal total_new_unique
+        total_unique, added = store.append(items, cities=[city_from_query(q) for q in batch])
+        total_new_unique += added
+        return total_unique, added
+
+    while pos < len(queries) or retry or running:
+        while (retry or pos < len(queries)) and len(running) < in_flight and time.time() >= next_submit_at:
+            if retry:
+                batch, attempt = retry.popleft()
+                n = len(batch)
+            else:
+                n = SCHED.batch_size(category)
+                batch, attempt = queries[pos : pos + n], 0
+                pos += len(batch)
+            bnum += 1
+            log(f"\nBatch {bnum}/~{bnum + len(retry) + (len(queries) - pos + n - 1) // n}: {len(batch)} queries{f' (retry {attempt})' if attempt else ''}")
+            log(f"  First: {batch[0]}")
+            log(f"  Last:  {batch[-1]}")
+
+            batch, added = take_cached(batch, category, store, fetched_after)
+            total_new_unique += added
+
+            resp = start_async_job(batch, fetched_after)
+            if "error" in resp:
+                attempt += 1
+                if attempt < MAX_SUBMIT_ATTEMPTS:
+                    retry.append((batch, attempt))
+                    log(f"  ❌ Error starting job: {resp}. 🔁 Requeued (attempt {attempt + 1}/{MAX_SUBMIT_ATTEMPTS}); submits resume in {SUBMIT_BACKOFF_S}s.")
+                else:
+                    log(f"  ❌ Error starting job: {resp}. Giving up on this batch after {attempt} attempts (left for the next run).")
+                next_submit_at = time.time() + SUBMIT_BACKOFF_S
+                continue
+
+            request_id = resp.get("id")
+            if not request_id:
+                if resp.get("cached"):
+                    log("  💾 All queries served from cache.")
+                else:
+                    log(f"  ⚠️ No request id returned. Attempting to parse immediate data.")
+                status_like = {"status": "Success", "data": resp.get("data")}
+                shape, groups = normalize_data_shape(resp.get("data"))
+                answered = answered_queries(shape, len(groups), batch)
+                total_unique, added = save(extract_items_from_status(status_like, batch, category), answered)
+                log(f"  ✅ Saved after immediate response: added {added} new unique (total {total_unique}).")
+                continue
+
+            log(f"  Job started: {request_id} ({len(running) + 1} in flight)")
+            now = time.time()
+            running[request_id] = RunningJob(
+                bnum, batch, now, now + POLL_TIMEOUT_S, SCHED.poll_delays(category, len(batch)), now
+            )
+
+        now = time.time()
+        if not running:
+            time.sleep(max(0.0, next_submit_at - now))
+            continue
+
+        # Only poll jobs whose next poll time has come; sleep until the earliest
+        # (or until submits may resume) otherwise.
+        due = [rid for rid, job in running.items() if job.next_poll <= now]
+        if not due:
+            wake = min(job.next_poll for job in running.values())
+            if next_submit_at > now and len(running) < in_flight and (retry or pos < len(queries)):
+                wake = min(wake, next_submit_at)
+            time.sleep(max(0.0, wake - now))
+            continue
+
+        statuses = CLIENT.poll_many_spooled(due)
+        for request_id in due:
+            job = running[request_id]
+            status = JobStatus.read(*statuses[request_id])
+            job.polls += 1
+            if "error" in status:
+                log(f"  ❌ Poll error (batch {job.bnum}, poll {job.polls}): {status}")
+            st = status.get("status")
+
+            if st == "Success":
+                del running[request_id]
+                elapsed = time.time() - job.started
+                shape, n_items, total_unique, added = save_job(
+                    status, job.batch, category, store, CACHE, SEARCH_ENDPOINT, SEARCH_PARAMS, elapsed
+                )
+                if shape == BAD_JSON:
+                    log(f"  ❌ Batch {job.bnum} failed: the response could not be decoded. Saved nothing; its cities stay uncovered.")
+                else:
+                    total_new_unique += added
+                    SCHED.observe(category, len(job.batch), n_items, elapsed)
+                    log(f"  ✅ Batch {job.bnum} complete. Data shape={shape}. Added {added} new unique. Total unique now {total_unique}.")
+            elif st == "Error":
+                del running[request_id]
+                status.close()
+                log(f"  ❌ Batch {job.bnum} failed. Status: {st}. Error: {status.get('error') or status.get('detail')}")
+            elif time.time() >= job.deadline:
+                del running[request_id]
+                status.close()
+                SCHED.observe_timeout(category, len(job.batch))
+                log(f"  ⚠️ Batch {job.bnum} timed out after {POLL_TIMEOUT_S/60:.0f} minutes. Saving nothing for this batch.")
+            else:
+                status.close()
+                job.next_poll = min(time.time() + next(job.delays), job.deadline)
+                if job.polls == 1 or job.polls % 10 == 0:
+                    log(f"  ⏳ Job {request_id} (batch {job.bnum}) status={st} (poll {job.polls})")
+
+    store.compact()
+    log(f"\n✅ Category finished: {category}. Newly added unique this run: {total_new_unique}. Total on disk: {len(store)}")
+
+
+def run_category(category: str, in_flight: int = 1, rescrape_older_than_days: Optional[float] = None) -> None:
+    path = category_to_filename(category)
+    store = PLACES.category(category, path)
+
+    # Determine cities to run: the coverage index has when each city was last scraped
+    older_than_s = rescrape_older_than_days * 86400 if rescrape_older_than_days is not None else None
+    fetched_after = rescrape_cutoff(older_than_s)
+    all_cities = store.plan(CITIES_IL, older_than_s)
+    skipped = len(CITIES_IL) - len(all_cities)
+    if skipped:
+        fresh = "already-covered" if older_than_s is None else f"scraped in the last {rescrape_older_than_days:g} days,"
+        log(f"Skipping {skipped} {fresh} cities for '{category}'. Remaining: {len(all_cities)}")
+    else:
+        log(f"Running all {len(all_cities)} cities for '{category}'.")
 
     queries = build_queries(category, all_cities)
 
     log("\n" + "=" * 70)
     log(f"CATEGORY: {category}")
-    log(f"Existing records: {len(existing)}")
+    log(f"Existing records: {len(store)}")
     log(f"Total queries to run now: {len(queries)}")
+    log(f"Scheduler: {SCHED.describe(category)}")
     log("=" * 70)
 
     if not queries:
         log(f"✅ Nothing to do for category '{category}'.")
         return
 
+    if in_flight > 1:
+        run_category_pipelined(category, store, queries, in_flight, fetched_after)
+        return
+
     total_new_unique = 0
+    bstart = 0
+    bnum = 0
 
-    for bstart in range(0, len(queries), BATCH_SIZE):
-        bend = min(bstart + BATCH_SIZE, len(queries))
-        batch = queries[bstart:bend]
-        bnum = bstart // BATCH_SIZE + 1
-        btot = (len(queries) + BATCH_SIZE - 1) // BATCH_SIZE
+    while bstart < len(queries):
+        n = SCHED.batch_size(category)
+        batch = queries[bstart : bstart + n]
+        bstart += len(batch)
+        bnum += 1
+        btot = bnum + (len(queries) - bstart + n - 1) // n
 
-        log(f"\nBatch {bnum}/{btot}: {len(batch)} queries")
+        log(f"\nBatch {bnum}/~{btot}: {len(batch)} queries")
         log(f"  First: {batch[0]}")
         log(f"  Last:  {batch[-1]}")
 
-        resp = start_async_job(batch)
+        batch, added = take_cached(batch, category, store, fetched_after)
+        total_new_unique += added
+
+        resp = start_async_job(batch, fetched_after)
         if "error" in resp:
             log(f"  ❌ Error starting job: {resp}")
             time.sleep(5)
@@ -415,45 +542,70 @@ def run_category(category: str) -> None:
 
         request_id = resp.get("id")
 
-        # Sometimes Outscraper returns sync data
+        # Sometimes Outscraper returns sync data (or the whole batch was cached)
         if not request_id:
-            log(f"  ⚠️ No request id returned. Attempting to parse immediate data.")
+            if resp.get("cached"):
+                log("  💾 All queries served from cache.")
+            else:
+                log(f"  ⚠️ No request id returned. Attempting to parse immediate data.")
             status_like = {"status": "Success", "data": resp.get("data")}
             items = extract_items_from_status(status_like, batch, category)
-            total_before = len(existing)
-            total_unique, added = save_appending_dedup(path, existing, items)
-            existing = load_existing_results(path)  # reload to maintain consistent state
+            shape, groups = normalize_data_shape(resp.get("data"))
+            answered = answered_queries(shape, len(groups), batch)
+            total_unique, added = store.append(items, cities=[city_from_query(q) for q in answered])
             total_new_unique += added
             log(f"  ✅ Saved after immediate response: added {added} new unique (total {total_unique}).")
             continue
 
         log(f"  Job started: {request_id}")
-        status = poll_until_complete(request_id, batch)
+        started = time.time()
+        status = poll_until_complete(request_id, batch, SCHED.poll_delays(category, len(batch)))
 
         st = status.get("status")
         if st == "Success":
-            items = extract_items_from_status(status, batch, category)
-            total_unique, added = save_appending_dedup(path, existing, items)
-            existing = load_existing_results(path)
-            total_new_unique += added
-            shape, _ = normalize_data_shape(status.get("data"))
-            log(f"  ✅ Batch complete. Data shape={shape}. Added {added} new unique. Total unique now {total_unique}.")
+            elapsed = time.time() - started
+            shape, n_items, total_unique, added = save_job(
+                status, batch, category, store, CACHE, SEARCH_ENDPOINT, SEARCH_PARAMS, elapsed
+            )
+            if shape == BAD_JSON:
+                log("  ❌ Batch failed: the response could not be decoded. Saved nothing; its cities stay uncovered.")
+            else:
+                SCHED.observe(category, len(batch), n_items, elapsed)
+                total_new_unique += added
+                log(f"  ✅ Batch complete. Data shape={shape}. Added {added} new unique. Total unique now {total_unique}.")
         elif st == "Timeout":
+            SCHED.observe_timeout(category, len(batch))
             log(f"  ⚠️ Batch timed out after {POLL_TIMEOUT_S/60:.0f} minutes. Saving nothing for this batch.")
         else:
             log(f"  ❌ Batch failed. Status: {st}. Error: {status.get('error') or status.get('detail')}")
 
         time.sleep(1)
 
-    log(f"\n✅ Category finished: {category}. Newly added unique this run: {total_new_unique}. Total on disk: {len(load_existing_results(path))}")
+    store.compact()
+    log(f"\n✅ Category finished: {category}. Newly added unique this run: {total_new_unique}. Total on disk: {len(store)}")
 
 
 def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--in-flight",
+        type=int,
+        default=1,
+        help="Async jobs to keep running at once (default: 1 = one batch at a time).",
+    )
+    ap.add_argument(
+        "--rescrape-older-than",
+        type=float,
+        metavar="DAYS",
+        help="Also re-run cities last scraped more than DAYS ago (default: skip every covered city).",
+    )
+    args = ap.parse_args()
+
     os.makedirs(HERE, exist_ok=True)
 
     log("\n" + "=" * 70)
     log("OUTSCRAPER FIXED IL SCRAPER")
-    log(f"Batch size: {BATCH_SIZE} | Poll interval: {POLL_INTERVAL_S}s | Timeout: {POLL_TIMEOUT_S/60:.0f}m")
+    log(f"Batch size: {BATCH_SIZE} (adaptive) | Poll interval: {POLL_INTERVAL_S}s+ | Timeout: {POLL_TIMEOUT_S/60:.0f}m | In flight: {args.in_flight}")
     log("=" * 70)
 
     bal = get_balance()
@@ -461,7 +613,7 @@ def main() -> int:
         log(f"Starting balance: ${bal:.2f}")
 
     for cat in CATEGORIES_TO_RUN:
-        run_category(cat)
+        run_category(cat, in_flight=args.in_flight, rescrape_older_than_days=args.rescrape_older_than)
         bal = get_balance()
         if bal is not None:
             log(f"Balance after '{cat}': ${bal:.2f}")
@@ -4,12 +4,18 @@
 Outscraper async Google Maps scrape for Illinois "real estate agent" across the same 78 IL cities.
 
 Key requirements:
-- Batch size: 5 queries max (dense category)
+- Batch size: 5 queries to start (dense category); scheduler.py then sizes
+  batches from past job latency so predicted latency stays well under the
+  timeout (learned model persisted in scheduler_model.json)
 - Timeout: 60 minutes per batch
-- Poll interval: 15 seconds
+- Poll interval: 15 seconds minimum; first poll at the predicted completion,
+  then exponential backoff
 - Queries: "real estate agent in [City], IL"
 - Deduplicate by place_id across batches
-- Append results (never discard existing file contents)
+- Queries with a fresh response-cache entry (response_cache.py) are not re-sent
+- Append results (never discard existing file contents): each batch is one
+  transaction in the shared places store (places_store.py); the legacy
+  il_real_estate_agent_results.json array is written once at the end
 - Log to data/outscraper/scrape_log_reagent.txt
 - Print balance before and after
 - Handle both Outscraper response shapes:
@@ -28,24 +34,32 @@ from __future__ import annotations
 import json
 import os
 import time
-import urllib.error
-import urllib.parse
-import urllib.request
-from typing import Any, Dict, Iterable, List, Optional, Tuple
-
-API_KEY = os.environ.get(
-    "OUTSCRAPER_API_KEY",
-    "",
-)
-BASE_URL = "https://api.app.outscraper.com"
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from outscraper_client import SyncOutscraperClient
+from job_stream import BAD_JSON, JobStatus, answered_queries, save_job
+from places_store import CategoryStore, PlacesStore, city_from_query
+from response_cache import ResponseCache
+from scheduler import AdaptiveScheduler
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 LOG_FILE = os.path.join(HERE, "scrape_log_reagent.txt")
 
 CATEGORY = "real estate agent"
 BATCH_SIZE = 5
+MAX_BATCH = 25  # Outscraper API limit: queries per request
 POLL_INTERVAL_S = 15
 POLL_TIMEOUT_S = 60 * 60
+SCHEDULER_FILE = os.path.join(HERE, "scheduler_model.json")
+
+SEARCH_ENDPOINT = "/maps/search-v3"
+# Everything but the queries; with each query this is also the response-cache key.
+SEARCH_PARAMS: Dict[str, Any] = {
+    "limit": 500,
+    "language": "en",
+    "region": "US",
+    "dropDuplicates": "true",
+}
 
 # Same list as run_fixed_scrape.py
 CITIES_IL = [
@@ -138,27 +152,27 @@ def log(msg: str) -> None:
         f.write(line + "\n")
 
 
-def api_get(endpoint: str, params: Optional[Dict[str, Any]] = None, timeout_s: int = 180) -> Dict[str, Any]:
-    url = f"{BASE_URL}{endpoint}"
-    if params:
-        url += "?" + urllib.parse.urlencode(params, doseq=True)
+# Shared keep-alive client (reads OUTSCRAPER_API_KEY / OUTSCRAPER_BASE_URL)
+CLIENT = SyncOutscraperClient(log=log)
 
-    req = urllib.request.Request(url)
-    req.add_header("X-API-KEY", API_KEY)
+# Learned batch sizes / poll timing (BATCH_SIZE until there is history)
+SCHED = AdaptiveScheduler(
+    SCHEDULER_FILE,
+    timeout_s=POLL_TIMEOUT_S,
+    default_batch=BATCH_SIZE,
+    max_batch=MAX_BATCH,
+    min_poll_s=POLL_INTERVAL_S,
+)
 
-    try:
-        with urllib.request.urlopen(req, timeout=timeout_s) as resp:
-            raw = resp.read().decode("utf-8")
-            return json.loads(raw)
-    except urllib.error.HTTPError as e:
-        body = e.read().decode("utf-8", errors="replace") if getattr(e, "fp", None) else ""
-        return {"error": f"HTTP {e.code}", "detail": body[:2000]}
-    except Exception as e:
-        return {"error": str(e)}
+# Per-query response cache: reruns reuse fresh results instead of paying again
+CACHE = ResponseCache()
+
+# Every category's places, one SQLite store (places_store.py)
+PLACES = PlacesStore()
 
 
 def get_balance() -> Optional[float]:
-    prof = api_get("/profile")
+    prof = CLIENT.get("/profile")
     if "error" in prof:
         log(f"⚠️ Could not fetch profile: {prof}")
         return None
@@ -173,78 +187,22 @@ def out_path() -> str:
     return os.path.join(HERE, "il_real_estate_agent_results.json")
 
 
-def load_existing(path: str) -> List[Dict[str, Any]]:
-    if not os.path.exists(path):
-        return []
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, list):
-            return [x for x in data if isinstance(x, dict)]
-        return []
-    except Exception as e:
-        log(f"⚠️ Failed reading existing results {path}: {e}")
-        return []
-
-
-def save_appending_dedup(path: str, existing: List[Dict[str, Any]], new_items: List[Dict[str, Any]]) -> Tuple[int, int]:
-    seen: set[str] = set()
-    out: List[Dict[str, Any]] = []
-
-    def add(item: Dict[str, Any]) -> bool:
-        pid = (item.get("place_id") or "").strip()
-        if not pid:
-            return False
-        if pid in seen:
-            return False
-        seen.add(pid)
-        out.append(item)
-        return True
-
-    for it in existing:
-        add(it)
-
-    added = 0
-    for it in new_items:
-        if add(it):
-            added += 1
-
-    tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(out, f, ensure_ascii=False)
-    os.replace(tmp, path)
-
-    return (len(out), added)
-
-
 def build_queries(cities: Iterable[str]) -> List[str]:
     return [f"{CATEGORY} in {city}, IL" for city in cities]
 
 
-def city_from_query(q: str) -> str:
-    if " in " in q:
-        city = q.split(" in ", 1)[1].strip()
-    else:
-        city = q.strip()
-    if city.endswith(", IL"):
-        city = city[: -len(", IL")]
-    return city.strip()
-
-
 def start_async_job(batch_queries: List[str]) -> Dict[str, Any]:
-    params: Dict[str, Any] = {
-        "query": batch_queries,
-        "limit": 500,
-        "async": "true",
-        "language": "en",
-        "region": "US",
-        "dropDuplicates": "true",
-    }
-    return api_get("/maps/search-v3", params)
+    cached = CACHE.get_batch(SEARCH_ENDPOINT, batch_queries, SEARCH_PARAMS)
+    if cached is not None:
+        # Every query is fresh in the cache: answer like a sync response.
+        return {"status": "Success", "data": cached, "cached": True}
+    params: Dict[str, Any] = {"query": batch_queries, "async": "true", **SEARCH_PARAMS}
+    return CLIENT.submit(SEARCH_ENDPOINT, params)
 
 
-def check_job(request_id: str) -> Dict[str, Any]:
-    return api_get(f"/requests/{request_id}")
+def check_job(request_id: str) -> JobStatus:
+    # Spooled, not decoded: a finished job's places are streamed by save_job().
+    return JobStatus.read(*CLIENT.get_spooled(f"/requests/{request_id}"))
 
 
 def normalize_data_shape(data: Any) -> Tuple[str, List[List[Dict[str, Any]]]]:
@@ -267,7 +225,7 @@ def normalize_data_shape(data: Any) -> Tuple[str, List[List[Dict[str, Any]]]]:
     return ("unknown", [])
 
 
-def poll_until_complete(request_id: str) -> Dict[str, Any]:
+def poll_until_complete(request_id: str, delays: Iterator[float]) -> JobStatus:
     deadline = time.time() + POLL_TIMEOUT_S
     poll_n = 0
     while True:
@@ -278,6 +236,7 @@ def poll_until_complete(request_id: str) -> Dict[str, Any]:
         if st in ("Success", "Error"):
             return status
 
+        status.close()
         if time.time() >= deadline:
             status["status"] = "Timeout"
             return status
@@ -285,7 +244,7 @@ def poll_until_complete(request_id: str) -> Dict[str, Any]:
         if poll_n == 1 or poll_n % 10 == 0:
             log(f"  ⏳ Job {request_id} status={st} (poll {poll_n})")
 
-        time.sleep(POLL_INTERVAL_S)
+        time.sleep(min(next(delays), max(0.0, deadline - time.time())))
 
 
 def extract_items(status_or_resp: Dict[str, Any], batch_queries: List[str]) -> List[Dict[str, Any]]:
@@ -329,12 +288,24 @@ def extract_items(status_or_resp: Dict[str, Any], batch_queries: List[str]) -> L
     return out
 
 
+def take_cached(batch: List[str], store: CategoryStore) -> Tuple[List[str], int]:
+    """Save the cached part of a partially cached batch. Returns (queries to send, added)."""
+    hits, rest = CACHE.split(SEARCH_ENDPOINT, batch, SEARCH_PARAMS)
+    if not hits:
+        return rest, 0
+    cached_qs = [q for q in batch if q in hits]
+    items = extract_items({"data": [hits[q] for q in cached_qs]}, cached_qs)
+    total_unique, added = store.append(items, cities=[city_from_query(q) for q in cached_qs])
+    log(f"  💾 {len(cached_qs)} queries served from cache: added {added} new unique (total {total_unique}). Sending {len(rest)}.")
+    return rest, added
+
+
 def main() -> int:
     os.makedirs(HERE, exist_ok=True)
 
     log("\n" + "=" * 70)
     log("OUTSCRAPER IL SCRAPER — REAL ESTATE AGENT")
-    log(f"Batch size: {BATCH_SIZE} | Poll interval: {POLL_INTERVAL_S}s | Timeout: {POLL_TIMEOUT_S/60:.0f}m")
+    log(f"Batch size: {BATCH_SIZE} (adaptive) | Poll interval: {POLL_INTERVAL_S}s+ | Timeout: {POLL_TIMEOUT_S/60:.0f}m")
     log(f"Output: {out_path()}")
     log("=" * 70)
 
@@ -343,24 +314,31 @@ def main() -> int:
         log(f"Starting balance: ${bal0:.2f}")
 
     path = out_path()
-    existing = load_existing(path)
-    log(f"Existing records on disk: {len(existing)}")
+    store = PLACES.category(CATEGORY, path)
+    log(f"Existing records on disk: {len(store)}")
 
     queries = build_queries(CITIES_IL)
     log(f"Total queries: {len(queries)}")
+    log(f"Scheduler: {SCHED.describe(CATEGORY)}")
 
     total_new_unique = 0
 
-    for bstart in range(0, len(queries), BATCH_SIZE):
-        bend = min(bstart + BATCH_SIZE, len(queries))
-        batch = queries[bstart:bend]
-        bnum = bstart // BATCH_SIZE + 1
-        btot = (len(queries) + BATCH_SIZE - 1) // BATCH_SIZE
+    bstart = 0
+    bnum = 0
+    while bstart < len(queries):
+        n = SCHED.batch_size(CATEGORY)
+        batch = queries[bstart : bstart + n]
+        bstart += len(batch)
+        bnum += 1
+        btot = bnum + (len(queries) - bstart + n - 1) // n
 
-        log(f"\nBatch {bnum}/{btot}: {len(batch)} queries")
+        log(f"\nBatch {bnum}/~{btot}: {len(batch)} queries")
         log(f"  First: {batch[0]}")
         log(f"  Last:  {batch[-1]}")
 
+        batch, added = take_cached(batch, store)
+        total_new_unique += added
+
         resp = start_async_job(batch)
         if "error" in resp:
             log(f"  ❌ Error starting job: {resp}")
@@ -370,26 +348,36 @@ def main() -> int:
         request_id = resp.get("id")
 
         if not request_id:
-            log("  ⚠️ No request id returned (sync response?). Parsing immediate data.")
+            if resp.get("cached"):
+                log("  💾 All queries served from cache.")
+            else:
+                log("  ⚠️ No request id returned (sync response?). Parsing immediate data.")
             items = extract_items({"data": resp.get("data")}, batch)
-            total_unique, added = save_appending_dedup(path, existing, items)
-            existing = load_existing(path)
+            shape, groups = normalize_data_shape(resp.get("data"))
+            answered = answered_queries(shape, len(groups), batch)
+            total_unique, added = store.append(items, cities=[city_from_query(q) for q in answered])
             total_new_unique += added
             log(f"  ✅ Saved immediate response: added {added} new unique (total {total_unique}).")
             continue
 
         log(f"  Job started: {request_id}")
-        status = poll_until_complete(request_id)
+        started = time.time()
+        status = poll_until_complete(request_id, SCHED.poll_delays(CATEGORY, len(batch)))
         st = status.get("status")
 
         if st == "Success":
-            items = extract_items(status, batch)
-            total_unique, added = save_appending_dedup(path, existing, items)
-            existing = load_existing(path)
-            total_new_unique += added
-            shape, _ = normalize_data_shape(status.get("data"))
-            log(f"  ✅ Batch complete. Data shape={shape}. Added {added} new unique. Total unique now {total_unique}.")
+            elapsed = time.time() - started
+            shape, n_items, total_unique, added = save_job(
+                status, batch, CATEGORY, store, CACHE, SEARCH_ENDPOINT, SEARCH_PARAMS, elapsed
+            )
+            if shape == BAD_JSON:
+                log("  ❌ Batch failed: the response could not be decoded. Saved nothing; its cities stay uncovered.")
+            else:
+                SCHED.observe(CATEGORY, len(batch), n_items, elapsed)
+                total_new_unique += added
+                log(f"  ✅ Batch complete. Data shape={shape}. Added {added} new unique. Total unique now {total_unique}.")
         elif st == "Timeout":
+            SCHED.observe_timeout(CATEGORY, len(batch))
             log(f"  ⚠️ Batch timed out after {POLL_TIMEOUT_S/60:.0f} minutes. Saving nothing for this batch.")
         else:
             log(f"  ❌ Batch failed. Status: {st}. Error: {status.get('error') or status.get('detail')}")
@@ -398,7 +386,8 @@ def main() -> int:
 
     log("\n" + "=" * 70)
     log(f"DONE. Newly added unique this run: {total_new_unique}")
-    log(f"Total unique on disk: {len(load_existing(path))}")
+    store.compact()
+    log(f"Total unique on disk: {len(store)}")
 
     bal1 = get_balance()
     if bal1 is not None:
@@ -6,36 +6,52 @@ Runs ONLY the remaining Outscraper Google Maps categories for Illinois.
 Safety requirements:
 - Never overwrite existing results with empty data.
 - Load existing JSON first and append only new unique records (dedup by place_id).
-- Write via temp file + atomic replace.
+  Each batch is one transaction in the shared places store (places_store.py);
+  the legacy JSON array is written once per category via temp file + atomic replace.
 
 Logging:
 - Appends progress to scrape_log.txt in this folder.
 
+Cities already scraped for a category (the coverage index in places_store.py)
+are skipped; `--rescrape-older-than DAYS` re-runs the ones scraped before then.
+Queries with a fresh response-cache entry (response_cache.py) are not re-sent.
+Batch size / polling start at BATCH_SIZE / POLL_INTERVAL_S and then adapt per
+category to past job latency (scheduler.py, scheduler_model.json).
+
 This is based on run_fixed_scrape.py (kept intact for reference).
 """
 
 from __future__ import annotations
 
+import argparse
 import json
 import os
 import time
-import urllib.error
-import urllib.parse
-import urllib.request
-from typing import Any, Dict, Iterable, List, Optional, Tuple
-
-API_KEY = os.environ.get(
-    "OUTSCRAPER_API_KEY",
-    "",
-)
-BASE_URL = "https://api.app.outscraper.com"
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from outscraper_client import SyncOutscraperClient
+from job_stream import BAD_JSON, JobStatus, answered_queries, save_job
+from places_store import CategoryStore, PlacesStore, city_from_query
+from response_cache import ResponseCache
+from scheduler import AdaptiveScheduler
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 LOG_FILE = os.path.join(HERE, "scrape_log.txt")
 
 BATCH_SIZE = 15
+MAX_BATCH = 25  # Outscraper API limit: queries per request
 POLL_INTERVAL_S = 15
 POLL_TIMEOUT_S = 45 * 60
+SCHEDULER_FILE = os.path.join(HERE, "scheduler_model.json")
+
+SEARCH_ENDPOINT = "/maps/search-v3"
+# Everything but the queries; with each query this is also the response-cache key.
+SEARCH_PARAMS: Dict[str, Any] = {
+    "limit": 500,
+    "language": "en",
+    "region": "US",
+    "dropDuplicates": "true",
+}
 
 # 77 IL regions/cities list used in prior runs
 CITIES_IL = [
@@ -137,27 +153,27 @@ def log(msg: str) -> None:
         f.write(line + "\n")
 
 
-def api_request(endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    url = f"{BASE_URL}{endpoint}"
-    if params:
-        url += "?" + urllib.parse.urlencode(params, doseq=True)
+# Shared keep-alive client (reads OUTSCRAPER_API_KEY / OUTSCRAPER_BASE_URL)
+CLIENT = SyncOutscraperClient(log=log)
 
-    req = urllib.request.Request(url)
-    req.add_header("X-API-KEY", API_KEY)
+# Learned per-category batch sizes / poll timing (BATCH_SIZE until there is history)
+SCHED = AdaptiveScheduler(
+    SCHEDULER_FILE,
+    timeout_s=POLL_TIMEOUT_S,
+    default_batch=BATCH_SIZE,
+    max_batch=MAX_BATCH,
+    min_poll_s=POLL_INTERVAL_S,
+)
 
-    try:
-        with urllib.request.urlopen(req, timeout=180) as resp:
-            raw = resp.read().decode("utf-8")
-            return json.loads(raw)
-    except urllib.error.HTTPError as e:
-        body = e.read().decode("utf-8", errors="replace") if getattr(e, "fp", None) else ""
-        return {"error": f"HTTP {e.code}", "detail": body[:2000]}
-    except Exception as e:
-        return {"error": str(e)}
+# Per-query response cache: reruns reuse fresh results instead of paying again
+CACHE = ResponseCache()
+
+# Every category's places, one SQLite store (places_store.py)
+PLACES = PlacesStore()
 
 
 def get_balance() -> Optional[float]:
-    prof = api_request("/profile")
+    prof = CLIENT.get("/profile")
     if "error" in prof:
         log(f"⚠️ Could not fetch profile: {prof}")
         return None
@@ -173,68 +189,10 @@ def category_to_filename(category: str) -> str:
     return os.path.join(HERE, f"il_{safe}_results.json")
 
 
-def load_existing_results(path: str) -> List[Dict[str, Any]]:
-    if not os.path.exists(path):
-        return []
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, list):
-            return [x for x in data if isinstance(x, dict)]
-        return []
-    except Exception as e:
-        log(f"⚠️ Failed reading existing results {path}: {e}")
-        return []
-
-
-def save_appending_dedup(path: str, existing: List[Dict[str, Any]], new_items: List[Dict[str, Any]]) -> Tuple[int, int]:
-    """Append new_items to existing, dedup by place_id; write full list atomically."""
-    seen: set[str] = set()
-    out: List[Dict[str, Any]] = []
-
-    def add(item: Dict[str, Any]) -> bool:
-        pid = (item.get("place_id") or "").strip()
-        if not pid:
-            return False
-        if pid in seen:
-            return False
-        seen.add(pid)
-        out.append(item)
-        return True
-
-    for it in existing:
-        add(it)
-
-    added = 0
-    for it in new_items:
-        if add(it):
-            added += 1
-
-    # SAFETY: don't clobber an existing non-empty file with an empty write
-    if os.path.exists(path) and len(existing) > 0 and len(out) == 0:
-        log(f"❌ Refusing to overwrite non-empty {os.path.basename(path)} with empty output.")
-        return (len(existing), 0)
-
-    tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(out, f, ensure_ascii=False)
-    os.replace(tmp, path)
-    return (len(out), added)
-
-
 def build_queries(category: str, cities: Iterable[str]) -> List[str]:
     return [f"{category} in {city}, IL" for city in cities]
 
 
-def city_from_query(q: str) -> str:
-    if " in " in q:
-        city = q.split(" in ", 1)[1].strip()
-    else:
-        city = q.strip()
-    city = city.removesuffix(", IL").strip()
-    return city
-
-
 def normalize_data_shape(data: Any) -> Tuple[str, List[List[Dict[str, Any]]]]:
     if data is None:
         return ("none", [])
@@ -252,23 +210,21 @@ def normalize_data_shape(data: Any) -> Tuple[str, List[List[Dict[str, Any]]]]:
     return ("unknown", [])
 
 
-def start_async_job(batch_queries: List[str]) -> Dict[str, Any]:
-    params: Dict[str, Any] = {
-        "query": batch_queries,
-        "limit": 500,
-        "async": "true",
-        "language": "en",
-        "region": "US",
-        "dropDuplicates": "true",
-    }
-    return api_request("/maps/search-v3", params)
+def start_async_job(batch_queries: List[str], fetched_after: float = 0.0) -> Dict[str, Any]:
+    cached = CACHE.get_batch(SEARCH_ENDPOINT, batch_queries, SEARCH_PARAMS, fetched_after)
+    if cached is not None:
+        # Every query is fresh in the cache: answer like a sync response.
+        return {"status": "Success", "data": cached, "cached": True}
+    params: Dict[str, Any] = {"query": batch_queries, "async": "true", **SEARCH_PARAMS}
+    return CLIENT.submit(SEARCH_ENDPOINT, params)
 
 
-def check_job(request_id: str) -> Dict[str, Any]:
-    return api_request(f"/requests/{request_id}")
+def check_job(request_id: str) -> JobStatus:
+    # Spooled, not decoded: a finished job's places are streamed by save_job().
+    return JobStatus.read(*CLIENT.get_spooled(f"/requests/{request_id}"))
 
 
-def poll_until_complete(request_id: str) -> Dict[str, Any]:
+def poll_until_complete(request_id: str, delays: Iterator[float]) -> JobStatus:
     deadline = time.time() + POLL_TIMEOUT_S
     poll_n = 0
     while True:
@@ -279,6 +235,7 @@ def poll_until_complete(request_id: str) -> Dict[str, Any]:
         if st == "Success" or st == "Error":
             return status
 
+        status.close()
         if time.time() >= deadline:
             status["status"] = "Timeout"
             return status
@@ -286,7 +243,7 @@ def poll_until_complete(request_id: str) -> Dict[str, Any]:
         if poll_n == 1 or poll_n % 10 == 0:
             log(f"  ⏳ Job {request_id} status={st} (poll {poll_n})")
 
-        time.sleep(POLL_INTERVAL_S)
+        time.sleep(min(next(delays), max(0.0, deadline - time.time())))
 
 
 def extract_items_from_status(status: Dict[str, Any], batch_queries: List[str], category: str) -> List[Dict[str, Any]]:
@@ -328,31 +285,70 @@ def extract_items_from_status(status: Dict[str, Any], batch_queries: List[str],
     return out
 
 
-def run_category(category: str) -> None:
+def rescrape_cutoff(older_than_s: Optional[float]) -> float:
+    """Oldest cache entry a run may use: a city re-planned as stale must really be searched again."""
+    return time.time() - older_than_s if older_than_s is not None else 0.0
+
+
+def take_cached(
+    batch: List[str], category: str, store: CategoryStore, fetched_after: float = 0.0
+) -> Tuple[List[str], int]:
+    """Save the cached part of a partially cached batch. Returns (queries to send, added).
+
+    Cache entries fetched before `fetched_after` are ignored (see rescrape_cutoff()).
+    """
+    hits, rest = CACHE.split(SEARCH_ENDPOINT, batch, SEARCH_PARAMS, fetched_after)
+    if not hits:
+        return rest, 0
+    cached_qs = [q for q in batch if q in hits]
+    items = extract_items_from_status({"data": [hits[q] for q in cached_qs]}, cached_qs, category)
+    total_unique, added = store.append(items, cities=[city_from_query(q) for q in cached_qs])
+    log(f"  💾 {len(cached_qs)} queries served from cache: added {added} new unique (total {total_unique}). Sending {len(rest)}.")
+    return rest, added
+
+
+def run_category(category: str, rescrape_older_than_days: Optional[float] = None) -> None:
     path = category_to_filename(category)
-    existing = load_existing_results(path)
+    store = PLACES.category(category, path)
 
-    queries = build_queries(category, CITIES_IL)
+    # Only cities the coverage index has no (recent enough) scrape for
+    older_than_s = rescrape_older_than_days * 86400 if rescrape_older_than_days is not None else None
+    fetched_after = rescrape_cutoff(older_than_s)
+    cities = store.plan(CITIES_IL, older_than_s)
+    if len(cities) < len(CITIES_IL):
+        log(f"Skipping {len(CITIES_IL) - len(cities)} covered cities for '{category}'. Remaining: {len(cities)}")
+    queries = build_queries(category, cities)
 
     log("\n" + "=" * 70)
     log(f"CATEGORY: {category}")
-    log(f"Existing records: {len(existing)}")
+    log(f"Existing records: {len(store)}")
     log(f"Total queries: {len(queries)}")
+    log(f"Scheduler: {SCHED.describe(category)}")
     log("=" * 70)
 
+    if not queries:
+        log(f"✅ Nothing to do for category '{category}'.")
+        return
+
     total_new_unique = 0
 
-    for bstart in range(0, len(queries), BATCH_SIZE):
-        bend = min(bstart + BATCH_SIZE, len(queries))
-        batch = queries[bstart:bend]
-        bnum = bstart // BATCH_SIZE + 1
-        btot = (len(queries) + BATCH_SIZE - 1) // BATCH_SIZE
+    bstart = 0
+    bnum = 0
+    while bstart < len(queries):
+        n = SCHED.batch_size(category)
+        batch = queries[bstart : bstart + n]
+        bstart += len(batch)
+        bnum += 1
+        btot = bnum + (len(queries) - bstart + n - 1) // n
 
-        log(f"\nBatch {bnum}/{btot}: {len(batch)} queries")
+        log(f"\nBatch {bnum}/~{btot}: {len(batch)} queries")
         log(f"  First: {batch[0]}")
         log(f"  Last:  {batch[-1]}")
 
-        resp = start_async_job(batch)
+        batch, added = take_cached(batch, category, store, fetched_after)
+        total_new_unique += added
+
+        resp = start_async_job(batch, fetched_after)
         if "error" in resp:
             log(f"  ❌ Error starting job: {resp}")
             time.sleep(5)
@@ -361,42 +357,62 @@ def run_category(category: str) -> None:
         request_id = resp.get("id")
 
         if not request_id:
-            log("  ⚠️ No request id returned. Attempting to parse immediate data.")
+            if resp.get("cached"):
+                log("  💾 All queries served from cache.")
+            else:
+                log("  ⚠️ No request id returned. Attempting to parse immediate data.")
             status_like = {"status": "Success", "data": resp.get("data")}
             items = extract_items_from_status(status_like, batch, category)
-            total_unique, added = save_appending_dedup(path, existing, items)
-            existing = load_existing_results(path)
+            shape, groups = normalize_data_shape(resp.get("data"))
+            answered = answered_queries(shape, len(groups), batch)
+            total_unique, added = store.append(items, cities=[city_from_query(q) for q in answered])
             total_new_unique += added
             log(f"  ✅ Saved after immediate response: added {added} new unique (total {total_unique}).")
             continue
 
         log(f"  Job started: {request_id}")
-        status = poll_until_complete(request_id)
+        started = time.time()
+        status = poll_until_complete(request_id, SCHED.poll_delays(category, len(batch)))
         st = status.get("status")
 
         if st == "Success":
-            items = extract_items_from_status(status, batch, category)
-            total_unique, added = save_appending_dedup(path, existing, items)
-            existing = load_existing_results(path)
-            total_new_unique += added
-            shape, _ = normalize_data_shape(status.get("data"))
-            log(f"  ✅ Batch complete. Data shape={shape}. Added {added}. Total unique now {total_unique}.")
+            elapsed = time.time() - started
+            shape, n_items, total_unique, added = save_job(
+                status, batch, category, store, CACHE, SEARCH_ENDPOINT, SEARCH_PARAMS, elapsed
+            )
+            if shape == BAD_JSON:
+                log("  ❌ Batch failed: the response could not be decoded. Saved nothing; its cities stay uncovered.")
+            else:
+                SCHED.observe(category, len(batch), n_items, elapsed)
+                total_new_unique += added
+                log(f"  ✅ Batch complete. Data shape={shape}. Added {added}. Total unique now {total_unique}.")
         elif st == "Timeout":
+            SCHED.observe_timeout(category, len(batch))
             log(f"  ⚠️ Batch timed out after {POLL_TIMEOUT_S/60:.0f} minutes. Saving nothing for this batch.")
         else:
             log(f"  ❌ Batch failed. Status: {st}. Error: {status.get('error') or status.get('detail')}")
 
         time.sleep(1)
 
-    log(f"\n✅ Category finished: {category}. Newly added unique this run: {total_new_unique}. Total on disk: {len(load_existing_results(path))}")
+    store.compact()
+    log(f"\n✅ Category finished: {category}. Newly added unique this run: {total_new_unique}. Total on disk: {len(store)}")
 
 
 def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--rescrape-older-than",
+        type=float,
+        metavar="DAYS",
+        help="Also re-run cities last scraped more than DAYS ago (default: skip every covered city).",
+    )
+    args = ap.parse_args()
+
     os.makedirs(HERE, exist_ok=True)
 
     log("\n" + "=" * 70)
     log("OUTSCRAPER IL SCRAPER (REMAINING CATEGORIES)")
-    log(f"Batch size: {BATCH_SIZE} | Poll interval: {POLL_INTERVAL_S}s | Timeout: {POLL_TIMEOUT_S/60:.0f}m")
+    log(f"Batch size: {BATCH_SIZE} (adaptive) | Poll interval: {POLL_INTERVAL_S}s+ | Timeout: {POLL_TIMEOUT_S/60:.0f}m")
     log("=" * 70)
 
     bal = get_balance()
@@ -408,7 +424,9 @@ def main() -> int:
         cats.append("home inspector")
 
     for cat in cats:
-        run_category(cat)
+        # A home inspector rerun re-checks every city.
+        older = 0.0 if cat == "home inspector" and RERUN_HOME_INSPECTOR else args.rescrape_older_than
+        run_category(cat, rescrape_older_than_days=older)
         bal = get_balance()
         if bal is not None:
             log(f"Balance after '{cat}': ${bal:.2f}")
@@ -2,19 +2,21 @@
 """
 Outscraper Full Illinois Scrape
 Searches Google Maps for real estate professionals across all IL zip codes.
-Uses async API to batch queries efficiently.
+Uses async API to batch queries efficiently; batches whose queries are all fresh
+in the response cache (response_cache.py) are answered without a new job.
+Each batch is saved in one transaction to the shared places store
+(places_store.py); the per-category files and il_all_professionals_master.json
+are exported from it.
 """
 
-import json
 import os
 import sys
 import time
-import urllib.request
-import urllib.parse
-import urllib.error
 
-API_KEY = ""
-BASE_URL = "https://api.app.outscraper.com"
+from outscraper_client import SyncOutscraperClient
+from places_store import PlacesStore, city_from_query
+from response_cache import ResponseCache
+
 DATA_DIR = os.path.dirname(os.path.abspath(__file__))
 LOG_FILE = os.path.join(DATA_DIR, "scrape_log.txt")
 
@@ -35,32 +37,27 @@ def log(msg):
     with open(LOG_FILE, "a") as f:
         f.write(line + "\n")
 
-def api_request(endpoint, params=None):
-    """Make a GET request to Outscraper API"""
-    url = f"{BASE_URL}{endpoint}"
-    if params:
-        url += "?" + urllib.parse.urlencode(params, doseq=True)
-    
-    req = urllib.request.Request(url)
-    req.add_header("X-API-KEY", API_KEY)
-    
-    try:
-        with urllib.request.urlopen(req, timeout=120) as resp:
-            return json.loads(resp.read().decode())
-    except urllib.error.HTTPError as e:
-        body = e.read().decode() if e.fp else ""
-        log(f"  HTTP Error {e.code}: {body[:300]}")
-        return {"error": f"HTTP {e.code}", "detail": body[:300]}
-    except Exception as e:
-        log(f"  Request error: {e}")
-        return {"error": str(e)}
+# Shared keep-alive client (reads OUTSCRAPER_API_KEY / OUTSCRAPER_BASE_URL)
+CLIENT = SyncOutscraperClient(log=log)
 
-def start_async_search(queries, enrichments=None):
-    """Start an async search job with multiple queries"""
+# Per-query response cache: reruns reuse fresh results instead of paying again
+CACHE = ResponseCache()
+SEARCH_ENDPOINT = "/maps/search-v3"
+
+# Every category's places (dedup by place_id per category), one SQLite store
+PLACES = PlacesStore()
+
+def api_request(endpoint, params=None, submit=False):
+    """Make a GET request to Outscraper API (submit=True: starts a job, so not retried once sent)"""
+    resp = CLIENT.submit(endpoint, params) if submit else CLIENT.get(endpoint, params)
+    if "error" in resp:
+        log(f"  {resp['error']}: {resp.get('detail', '')[:300]}")
+    return resp
+
+def search_params(enrichments=None):
+    """Search params minus the queries (also the response-cache key, with each query)"""
     params = {
-        "query": queries,
         "limit": 500,  # max results per query
-        "async": "true",
         "language": "en",
         "region": "US",
         "dropDuplicates": "true",
@@ -69,18 +66,25 @@ def start_async_search(queries, enrichments=None):
     if enrichments:
         params["enrichments"] = enrichments
     
-    return api_request("/maps/search-v3", params)
+    return params
+
+def start_async_search(queries, enrichments=None):
+    """Start an async search job with multiple queries (served from cache when all are fresh)"""
+    cached = CACHE.get_batch(SEARCH_ENDPOINT, queries, search_params(enrichments))
+    if cached is not None:
+        return {"status": "Success", "data": cached, "cached": True}
+    
+    params = {"query": queries, "async": "true", **search_params(enrichments)}
+    return api_request(SEARCH_ENDPOINT, params, submit=True)
 
 def check_job(request_id):
     """Check the status of an async job"""
     return api_request(f"/requests/{request_id}")
 
-def save_results(results, filename):
-    """Save results to JSON file"""
-    filepath = os.path.join(DATA_DIR, filename)
-    with open(filepath, "w") as f:
-        json.dump(results, f, indent=2)
-    log(f"  Saved {len(results)} results to {filename}")
+def save_results(store, filename):
+    """Export a category from the places store to its JSON file"""
+    n = store.compact()
+    log(f"  Saved {n} results to {filename}")
 
 def build_queries_for_category(category):
     """Build search queries for a category across Illinois.
@@ -190,8 +194,9 @@ def run_category(category):
     log(f"Total queries: {len(queries)}")
     log(f"{'='*60}")
     
-    all_results = []
-    seen_place_ids = set()
+    filename = f"il_{safe_cat}_results.json"
+    store = PLACES.category(category, os.path.join(DATA_DIR, filename))
+    start_count = len(store)
     
     # Batch queries in groups of 25 (API limit per request)
     batch_size = 25
@@ -205,7 +210,8 @@ def run_category(category):
         log(f"  Queries: {batch_queries[0]} ... {batch_queries[-1]}")
         
         # Start async job
-        resp = start_async_search(batch_queries, enrichments=["emails_and_contacts"])
+        enrichments = ["emails_and_contacts"]
+        resp = start_async_search(batch_queries, enrichments=enrichments)
         
         if "error" in resp:
             log(f"  ❌ Error starting batch: {resp}")
@@ -214,20 +220,19 @@ def run_category(category):
         
         request_id = resp.get("id")
         if not request_id:
-            log(f"  ❌ No request ID returned: {resp}")
+            if resp.get("cached"):
+                log(f"  💾 All queries served from cache")
+            else:
+                log(f"  ❌ No request ID returned: {resp}")
             # If sync response with data
             if resp.get("data"):
-                for query_results in resp["data"]:
-                    if query_results:
-                        for item in query_results:
-                            pid = item.get("place_id", "")
-                            if pid and pid not in seen_place_ids:
-                                seen_place_ids.add(pid)
-                                all_results.append(item)
-                log(f"  Got {len(all_results)} unique results so far")
+                items = (item for query_results in resp["data"] if query_results for item in query_results)
+                total, _ = store.append(items, cities=[city_from_query(q) for q in batch_queries])
+                log(f"  Got {total} unique results so far")
             continue
         
         log(f"  Job started: {request_id}")
+        started = time.time()
         
         # Poll for completion
         max_polls = 120  # 10 minutes max
@@ -238,16 +243,10 @@ def run_category(category):
             state = status.get("status", "unknown")
             if state == "Success":
                 data = status.get("data", [])
-                batch_count = 0
-                for query_results in data:
-                    if query_results:
-                        for item in query_results:
-                            pid = item.get("place_id", "")
-                            if pid and pid not in seen_place_ids:
-                                seen_place_ids.add(pid)
-                                all_results.append(item)
-                                batch_count += 1
-                log(f"  ✅ Batch complete: +{batch_count} new records ({len(all_results)} total unique)")
+                CACHE.put_batch(SEARCH_ENDPOINT, batch_queries, search_params(enrichments), data or [], time.time() - started)
+                items = (item for query_results in data if query_results for item in query_results)
+                total, batch_count = store.append(items, cities=[city_from_query(q) for q in batch_queries])
+                log(f"  ✅ Batch complete: +{batch_count} new records ({total} total unique)")
                 break
             elif state == "Error":
                 log(f"  ❌ Job failed: {status.get('error', 'unknown')}")
@@ -260,17 +259,14 @@ def run_category(category):
         else:
             log(f"  ⚠️ Timed out waiting for batch")
         
-        # Save intermediate results after each batch
-        save_results(all_results, f"il_{safe_cat}_results.json")
-        
         # Small delay between batches
         time.sleep(2)
     
     # Final save
-    save_results(all_results, f"il_{safe_cat}_results.json")
-    log(f"\n  Category '{category}' complete: {len(all_results)} unique records")
+    save_results(store, filename)
+    log(f"\n  Category '{category}' complete: {len(store)} unique records ({len(store) - start_count} new)")
     
-    return all_results
+    return store
 
 def main():
     log("\n" + "=" * 60)
@@ -301,23 +297,10 @@ def main():
     log(f"Grand total unique records: {grand_total}")
     log(f"{'=' * 60}")
     
-    # Merge all results into one master file
-    master = []
-    seen = set()
-    for cat in CATEGORIES:
-        safe_cat = cat.replace(" ", "_")
-        filepath = os.path.join(DATA_DIR, f"il_{safe_cat}_results.json")
-        if os.path.exists(filepath):
-            with open(filepath) as f:
-                data = json.load(f)
-                for item in data:
-                    pid = item.get("place_id", "")
-                    if pid not in seen:
-                        seen.add(pid)
-                        master.append(item)
-    
-    save_results(master, "il_all_professionals_master.json")
-    log(f"Master file: {len(master)} unique records across all categories")
+    # Master file: one record per place_id, straight from the store
+    n = PLACES.export_master(os.path.join(DATA_DIR, "il_all_professionals_master.json"), CATEGORIES)
+    log(f"  Saved {n} results to il_all_professionals_master.json")
+    log(f"Master file: {n} unique records across all categories")
     
     # Final balance
     profile = api_request("/profile")
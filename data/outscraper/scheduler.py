@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""scheduler.py
+
+Adaptive batch sizing + polling for the Outscraper async scrapers.
+
+The scripts used to hardcode a batch size (15, or 5 for dense categories) and
+poll every 15s. This learns, per category, how long a job takes:
+
+  latency_s ~= overhead_s + s_per_result * (queries * results_per_query)
+
+fitted by exponentially-weighted least squares over past batches (recent runs
+count most), plus an EWMA of results per query. From that it picks:
+
+- the largest batch whose predicted latency stays under `safety` x the poll
+  timeout (bigger batches = fewer jobs, so more throughput), never more than
+  double the last batch that completed, never above `max_batch` (the script's
+  own limit; at most the API's 25 queries per request), and never above a cap
+  that is halved whenever a batch times out
+- poll times: first poll at the predicted completion, then exponential backoff
+  from `min_poll_s` up to `max_poll_s`
+
+Until a category has an observation the script's own default batch size and
+poll interval are used. The model is persisted (atomically) to
+scheduler_model.json next to the scripts; each save merges into the file, so
+scripts running side by side keep each other's categories.
+
+Usage
+  SCHED = AdaptiveScheduler(MODEL_FILE, timeout_s=POLL_TIMEOUT_S,
+                            default_batch=BATCH_SIZE, max_batch=MAX_BATCH,
+                            min_poll_s=POLL_INTERVAL_S)
+  n = SCHED.batch_size(category)
+  for wait in SCHED.poll_delays(category, n): ...
+  SCHED.observe(category, n, n_results, latency_s)  # or observe_timeout(category, n)
+
+Only stdlib is used.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODEL_FILE = os.path.join(HERE, "scheduler_model.json")
+API_MAX_BATCH = 25  # Outscraper accepts at most 25 queries per request
+
+
+def _empty_model() -> Dict[str, Any]:
+    return {
+        "observations": 0,
+        "timeouts": 0,
+        # Decayed sums for the fit (x = results in the batch, y = latency seconds, q = queries)
+        "w": 0.0,
+        "sx": 0.0,
+        "sy": 0.0,
+        "sxx": 0.0,
+        "sxy": 0.0,
+        "sq": 0.0,
+        "results_per_query": None,
+        "last_ok_batch": None,
+        "cap": None,
+    }
+
+
+class AdaptiveScheduler:
+    def __init__(
+        self,
+        path: str = MODEL_FILE,
+        timeout_s: float = 45 * 60,
+        default_batch: int = 15,
+        min_batch: int = 1,
+        max_batch: int = API_MAX_BATCH,
+        safety: float = 0.5,
+        min_poll_s: float = 5.0,
+        max_poll_s: float = 60.0,
+        alpha: float = 0.3,
+    ) -> None:
+        self.path = path
+        self.timeout_s = timeout_s
+        self.default_batch = default_batch
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.safety = safety
+        self.min_poll_s = min_poll_s
+        self.max_poll_s = max_poll_s
+        self.alpha = alpha
+        self.models: Dict[str, Dict[str, Any]] = self._load()
+        self._dirty: Set[str] = set()
+
+    # -- persistence ------------------------------------------------------
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def save(self) -> None:
+        merged = self._load()
+        for key in self._dirty:
+            merged[key] = self.models[key]
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(merged, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+        self._dirty.clear()
+
+    def _model(self, key: str) -> Dict[str, Any]:
+        m = self.models.get(key)
+        if m is None:
+            m = self.models[key] = _empty_model()
+        return m
+
+    # -- model ------------------------------------------------------------
+
+    def _fit(self, m: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        """(overhead_s, s_per_result), or None if nothing has been observed."""
+        w, sx, sy = m["w"], m["sx"], m["sy"]
+        if m["observations"] == 0 or w <= 0:
+            return None
+        var = w * m["sxx"] - sx * sx
+        if m["observations"] >= 2 and var > 1e-9 * w * w:
+            b = (w * m["sxy"] - sx * sy) / var
+            a = (sy - b * sx) / w
+            if b > 0 and a >= 0:
+                return (a, b)
+        # Not enough spread in batch sizes yet: assume latency is proportional.
+        if sx > 0:
+            return (0.0, sy / sx)
+        return None
+
+    def predict(self, key: str, n_queries: int) -> Optional[float]:
+        """Predicted job latency in seconds for a batch of `n_queries` (None if unknown)."""
+        m = self.models.get(key)
+        if not m:
+            return None
+        fit = self._fit(m)
+        rpq = m["results_per_query"]
+        if fit is not None and rpq:
+            a, b = fit
+            return a + b * n_queries * rpq
+        # Only empty results so far: scale by queries instead.
+        if m["observations"] and m["sq"] > 0:
+            return m["sy"] / m["sq"] * n_queries
+        return None
+
+    def batch_size(self, key: str) -> int:
+        m = self.models.get(key)
+        if not m or not m["observations"]:
+            n = self.default_batch
+            if m and m["cap"]:
+                n = min(n, m["cap"])
+            return max(self.min_batch, min(n, self.max_batch))
+
+        target = self.safety * self.timeout_s
+        hi = self.max_batch
+        if m["cap"]:
+            hi = min(hi, m["cap"])
+        if m["last_ok_batch"]:
+            hi = min(hi, 2 * m["last_ok_batch"])
+
+        # predict() is increasing in n; take the largest n that fits.
+        n = self.min_batch
+        for cand in range(max(self.min_batch, hi), self.min_batch - 1, -1):
+            p = self.predict(key, cand)
+            if p is None or p <= target:
+                n = cand
+                break
+        return n
+
+    def poll_delays(self, key: str, n_queries: int) -> Iterator[float]:
+        """Seconds to wait before each poll after the first (immediate) one."""
+        p = self.predict(key, n_queries)
+        if p is not None:
+            yield max(self.min_poll_s, min(p, self.timeout_s))
+        delay = self.min_poll_s
+        while True:
+            yield delay
+            delay = min(delay * 2, self.max_poll_s)
+
+    def observe(self, key: str, n_queries: int, n_results: int, latency_s: float) -> None:
+        """Record a completed batch and persist the model."""
+        if n_queries <= 0:
+            return
+        m = self._model(key)
+        d = 1.0 - self.alpha
+        x, y = float(n_results), float(latency_s)
+        m["w"] = m["w"] * d + 1.0
+        m["sx"] = m["sx"] * d + x
+        m["sy"] = m["sy"] * d + y
+        m["sxx"] = m["sxx"] * d + x * x
+        m["sxy"] = m["sxy"] * d + x * y
+        m["sq"] = m["sq"] * d + n_queries
+        rpq = n_results / n_queries
+        prev = m["results_per_query"]
+        m["results_per_query"] = rpq if prev is None else self.alpha * rpq + d * prev
+        m["observations"] += 1
+        m["last_ok_batch"] = max(n_queries, m["last_ok_batch"] or 0)
+        if m["cap"] is not None and n_queries >= m["cap"]:
+            # Completed at the cap: let it grow back slowly.
+            m["cap"] = min(self.max_batch, m["cap"] + max(1, m["cap"] // 4))
+        self._dirty.add(key)
+        self.save()
+
+    def observe_timeout(self, key: str, n_queries: int) -> None:
+        """Record a batch that hit the poll timeout: halve the cap below its size."""
+        m = self._model(key)
+        m["timeouts"] += 1
+        m["cap"] = max(self.min_batch, n_queries // 2)
+        m["last_ok_batch"] = m["cap"]
+        self._dirty.add(key)
+        self.save()
+
+    def describe(self, key: str) -> str:
+        m = self.models.get(key)
+        if not m or not m["observations"]:
+            return f"no history (batch {self.batch_size(key)})"
+        fit = self._fit(m)
+        parts = [f"{m['observations']} obs"]
+        if fit is not None:
+            parts.append(f"overhead {fit[0]:.0f}s + {fit[1]:.2f}s/result")
+        if m["results_per_query"] is not None:
+            parts.append(f"{m['results_per_query']:.0f} results/query")
+        if m["cap"]:
+            parts.append(f"cap {m['cap']} after {m['timeouts']} timeout(s)")
+        n = self.batch_size(key)
+        p = self.predict(key, n)
+        parts.append(f"batch {n}" + (f" (~{p:.0f}s)" if p is not None else ""))
+        return ", ".join(parts)
+
+
+def main() -> int:
+    sched = AdaptiveScheduler()
+    if not sched.models:
+        print(f"No scheduler history in {MODEL_FILE}")
+        return 0
+    for key in sorted(sched.models):
+        print(f"{key}: {sched.describe(key)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""search_journal.py
+
+Append-only resume log for targeted_search_all.py.
+
+`targeted_search_journal.jsonl` gets one line per finished batch:
+
+  {"batch": 12, "ts": "...", "searched": 15, "licenses": [...], "matches": [...]}
+
+so saving a batch costs O(batch) no matter how far the run has got, instead of
+rewriting the full searched-license list and the full results list each time.
+Startup replays the journal into the searched set and the counters; a torn
+last line (crash mid-write) is dropped.
+
+On first use an existing `targeted_search_progress.json` (with
+`searched_licenses`) and `targeted_search_results.json` are imported as a
+single seed line. After that the progress file only carries counters and
+`write_results()` rebuilds the results JSON array from the journal.
+
+Usage
+  from search_journal import SearchJournal, iter_matches
+  journal = SearchJournal(JOURNAL_FILE, PROGRESS_FILE, RESULTS_FILE)
+  journal.append(batch_num, licenses, matches, searched=len(batch))
+  journal.write_results(RESULTS_FILE)
+
+Only stdlib is used.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+
+
+def _dump(obj: Any) -> str:
+    # Same separators as json.dump(..., ensure_ascii=False), so write_results()
+    # produces the same bytes the old full rewrite did.
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def iter_journal(path: str) -> Iterator[Dict[str, Any]]:
+    """Read-only replay of a journal (skips a torn last line instead of repairing it)."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                return
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_matches(path: str) -> Iterator[Dict[str, Any]]:
+    for rec in iter_journal(path):
+        yield from rec.get("matches", [])
+
+
+class SearchJournal:
+    def __init__(
+        self,
+        path: str,
+        legacy_progress: Optional[str] = None,
+        legacy_results: Optional[str] = None,
+    ) -> None:
+        self.path = path
+        self.searched: Set[str] = set()
+        self.total_searched = 0
+        self.matches_found = 0
+        self.last_batch = 0
+
+        if not os.path.exists(path):
+            self._import_legacy(legacy_progress, legacy_results)
+        else:
+            self._drop_torn_tail()
+        self._replay()
+
+    # -- startup ----------------------------------------------------------
+
+    def _replay(self) -> None:
+        for rec in iter_journal(self.path):
+            licenses = rec.get("licenses", [])
+            self.searched.update(licenses)
+            self.total_searched += rec.get("searched", len(licenses))
+            self.matches_found += len(rec.get("matches", []))
+            self.last_batch = rec.get("batch", self.last_batch)
+
+    def _import_legacy(self, progress_path: Optional[str], results_path: Optional[str]) -> None:
+        progress: Dict[str, Any] = {}
+        if progress_path and os.path.exists(progress_path):
+            with open(progress_path, "r", encoding="utf-8") as f:
+                progress = json.load(f)
+        results: List[Dict[str, Any]] = []
+        if results_path and os.path.exists(results_path):
+            with open(results_path, "r", encoding="utf-8") as f:
+                results = json.load(f)
+
+        licenses = progress.get("searched_licenses", [])
+        lines = ""
+        if licenses or results:
+            seed = {
+                "batch": progress.get("last_batch", 0),
+                "ts": progress.get("last_updated", time.strftime("%Y-%m-%dT%H:%M:%S")),
+                "searched": progress.get("total_searched", len(licenses)),
+                "licenses": licenses,
+                "matches": results,
+            }
+            lines = _dump(seed) + "\n"
+
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(lines)
+        os.replace(tmp, self.path)
+
+    def _drop_torn_tail(self) -> None:
+        size = os.path.getsize(self.path)
+        if size == 0:
+            return
+        with open(self.path, "rb+") as f:
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Lines are one batch each, so the last newline is never far back.
+            f.seek(max(0, size - (1 << 20)))
+            chunk = f.read()
+            i = chunk.rfind(b"\n")
+            f.truncate(size - len(chunk) + i + 1 if i >= 0 else 0)
+
+    # -- writes -----------------------------------------------------------
+
+    def append(
+        self,
+        batch: int,
+        licenses: Sequence[str],
+        matches: Sequence[Dict[str, Any]],
+        searched: Optional[int] = None,
+    ) -> None:
+        """Record one finished batch (its licenses + matches) durably."""
+        n = len(licenses) if searched is None else searched
+        rec = {
+            "batch": batch,
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "searched": n,
+            "licenses": list(licenses),
+            "matches": list(matches),
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(_dump(rec) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.searched.update(licenses)
+        self.total_searched += n
+        self.matches_found += len(matches)
+        self.last_batch = batch
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters for the progress file (constant size)."""
+        return {
+            "total_searched": self.total_searched,
+            "matches_found": self.matches_found,
+            "last_batch": self.last_batch,
+            "last_updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+    def write_results(self, results_path: str) -> int:
+        """Rebuild the results JSON array from the journal. Returns the match count.
+
+        Never replaces a non-empty results file with an empty array.
+        """
+        if not self.matches_found and os.path.exists(results_path) and os.path.getsize(results_path) > 2:
+            return 0
+
+        tmp = results_path + ".tmp"
+        n = 0
+        with open(tmp, "w", encoding="utf-8") as out:
+            out.write("[")
+            for m in iter_matches(self.path):
+                if n:
+                    out.write(", ")
+                out.write(_dump(m))
+                n += 1
+            out.write("]")
+        os.replace(tmp, results_path)
+        return n
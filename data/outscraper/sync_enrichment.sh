@@ -4,16 +4,21 @@
 
 cd /Users/Clawdbot/clawd/Relays
 
-RESULTS="data/outscraper/targeted_search_results.json"
+JOURNAL="data/outscraper/targeted_search_journal.jsonl"
 ENRICHMENT="data/idfpr/idfpr_outscraper_enrichment.json"
 
-if [ ! -f "$RESULTS" ]; then
-    echo "No results file yet"
+if [ ! -f "$JOURNAL" ]; then
+    echo "No search journal yet"
     exit 0
 fi
 
 # Count current matches in results vs enrichment
-RESULT_COUNT=$(python3 -c "import json; print(len(json.load(open('$RESULTS'))))" 2>/dev/null)
+RESULT_COUNT=$(python3 -c "
+import sys
+sys.path.insert(0, 'data/outscraper')
+from search_journal import iter_journal
+print(sum(len(r.get('matches', [])) for r in iter_journal('$JOURNAL')))
+" 2>/dev/null)
 ENRICHED_COUNT=$(python3 -c "
 import json
 with open('$ENRICHMENT') as f:
@@ -21,7 +26,7 @@ with open('$ENRICHMENT') as f:
 print(sum(1 for v in d['byLicenseNumber'].values() if v.get('googlePlaceId')))
 " 2>/dev/null)
 
-echo "Results file: $RESULT_COUNT matches"
+echo "Search journal: $RESULT_COUNT matches"
 echo "Enrichment file: $ENRICHED_COUNT with Google data"
 
 NEW_TO_ADD=$((RESULT_COUNT - ENRICHED_COUNT + 527))  # 527 were from original bulk scrape
@@ -34,13 +39,15 @@ fi
 echo "Merging $NEW_TO_ADD new matches..."
 
 python3 << 'PYEOF'
-import json, time
+import json, sys, time
+sys.path.insert(0, 'data/outscraper')
+from search_journal import iter_matches
 
 with open('data/idfpr/idfpr_outscraper_enrichment.json') as f:
     enrichment = json.load(f)
 
-with open('data/outscraper/targeted_search_results.json') as f:
-    new_matches = json.load(f)
+# Read the live journal; targeted_search_results.json is only rebuilt at the end of a run
+new_matches = iter_matches('data/outscraper/targeted_search_journal.jsonl')
 
 added = 0
 for m in new_matches:
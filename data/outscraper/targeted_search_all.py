@@ -2,44 +2,77 @@
 """targeted_search_all.py
 
 Search unmatched IDFPR brokers by name on Outscraper to find their Google Maps profiles.
-Resilient: saves progress after every batch, can resume from where it left off.
+Resilient: journals every batch (targeted_search_journal.jsonl, see search_journal.py)
+and resumes from where it left off. Batch size and poll timing adapt to past job
+latency (scheduler.py, key "targeted broker search"). A batch whose name queries
+are all fresh in the response cache (response_cache.py) is not re-sent.
+
+A batch that times out (--job-timeout, default POLL_TIMEOUT_S) or fails is
+requeued, re-split to the scheduler's (now smaller) batch size, up to
+--max-attempts times; brokers that still fail are not journaled, so the next
+run searches them again.
+
+Concurrent mode (`--in-flight N`, N > 1) keeps N jobs running at once, polls
+every outstanding request id in one loop and journals each batch as its job
+finishes. The balance guard still runs every BALANCE_CHECK_EVERY finished
+batches; below MIN_BALANCE no new job is started and the ones in flight are
+collected before exiting.
 
 Run: nohup python3 targeted_search_all.py > targeted_search.log 2>&1 &
+     nohup python3 targeted_search_all.py --in-flight 8 > targeted_search.log 2>&1 &
 """
 
 from __future__ import annotations
 
-import csv
+import argparse
 import json
 import os
 import sys
 import time
-import urllib.error
-import urllib.parse
-import urllib.request
-from typing import Any, Dict, List, Optional, Tuple
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
 
-API_KEY = os.environ.get("OUTSCRAPER_API_KEY", "")
-BASE_URL = "https://api.app.outscraper.com"
+from outscraper_client import SyncOutscraperClient
+from response_cache import ResponseCache
+from scheduler import AdaptiveScheduler
+from search_journal import SearchJournal
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 IDFPR_DIR = os.path.join(os.path.dirname(HERE), "idfpr") if os.path.basename(HERE) == "outscraper" else HERE
 
+sys.path.insert(0, IDFPR_DIR)
+from roster_cache import load_roster  # noqa: E402
+
 # Paths
 BROKER_CSV = os.path.join(IDFPR_DIR, "real_estate_broker.csv")
 ENRICHMENT_JSON = os.path.join(IDFPR_DIR, "idfpr_outscraper_enrichment.json")
 PROGRESS_FILE = os.path.join(HERE, "targeted_search_progress.json")
 RESULTS_FILE = os.path.join(HERE, "targeted_search_results.json")
+JOURNAL_FILE = os.path.join(HERE, "targeted_search_journal.jsonl")
+SCHEDULER_FILE = os.path.join(HERE, "scheduler_model.json")
 LOG_FILE = os.path.join(HERE, "targeted_search.log")
 
 # Tuning
-BATCH_SIZE = 15       # queries per Outscraper batch
-POLL_INTERVAL_S = 15  # seconds between polls
+BATCH_SIZE = 15       # queries per Outscraper batch (until the scheduler has history)
+MAX_BATCH = 25        # Outscraper API limit: queries per request
+POLL_INTERVAL_S = 15  # minimum seconds between polls
 POLL_TIMEOUT_S = 300  # 5 min timeout per batch
+MAX_ATTEMPTS = 3      # submits per broker before leaving it for the next run
+MAX_CONSECUTIVE_ERRORS = 5
+SUBMIT_BACKOFF_S = 30  # after a submit error (jobs in flight keep being polled)
 SAVE_EVERY = 1        # save after every batch (resilient)
 BALANCE_CHECK_EVERY = 50  # check balance every N batches
 MIN_BALANCE = 10.0    # stop if balance drops below this
 
+SEARCH_ENDPOINT = "/maps/search-v3"
+# Everything but the queries; with each query this is also the response-cache key.
+SEARCH_PARAMS: Dict[str, Any] = {
+    "limit": 1,  # We only need the top result per name search
+    "language": "en",
+    "region": "US",
+}
+
 
 def log(msg: str) -> None:
     ts = time.strftime("%Y-%m-%d %H:%M:%S")
@@ -47,45 +80,38 @@ def log(msg: str) -> None:
     print(line, flush=True)
 
 
-def api_get(endpoint: str, params: Optional[Dict[str, Any]] = None, timeout_s: int = 180) -> Dict[str, Any]:
-    url = f"{BASE_URL}{endpoint}"
-    if params:
-        url += "?" + urllib.parse.urlencode(params, doseq=True)
-    req = urllib.request.Request(url)
-    req.add_header("X-API-KEY", API_KEY)
-    for attempt in range(3):
-        try:
-            with urllib.request.urlopen(req, timeout=timeout_s) as resp:
-                return json.loads(resp.read().decode("utf-8"))
-        except urllib.error.HTTPError as e:
-            body = e.read().decode("utf-8", errors="replace") if hasattr(e, "read") else ""
-            if e.code == 429:
-                wait = 30 * (attempt + 1)
-                log(f"  Rate limited (429). Waiting {wait}s...")
-                time.sleep(wait)
-                continue
-            return {"error": f"HTTP {e.code}", "detail": body[:500]}
-        except Exception as e:
-            if attempt < 2:
-                log(f"  Request error (attempt {attempt+1}): {e}. Retrying in 10s...")
-                time.sleep(10)
-                continue
-            return {"error": str(e)}
-    return {"error": "Max retries exceeded"}
+# Shared keep-alive client (reads OUTSCRAPER_API_KEY / OUTSCRAPER_BASE_URL)
+CLIENT = SyncOutscraperClient(log=log)
+
+# Learned batch size / poll timing for name searches
+SCHED_KEY = "targeted broker search"
+SCHED = AdaptiveScheduler(
+    SCHEDULER_FILE,
+    timeout_s=POLL_TIMEOUT_S,
+    default_batch=BATCH_SIZE,
+    max_batch=MAX_BATCH,
+    min_poll_s=POLL_INTERVAL_S,
+)
+
+# Per-query response cache: reruns reuse fresh results instead of paying again
+CACHE = ResponseCache()
 
 
 def get_balance() -> Optional[float]:
-    prof = api_get("/profile")
+    prof = CLIENT.get("/profile")
     try:
         return float(prof.get("balance", 0))
     except Exception:
         return None
 
 
-def load_brokers() -> List[Dict[str, str]]:
-    """Load all IDFPR brokers from CSV."""
-    with open(BROKER_CSV, "r", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+# Columns used by build_query / match_broker_to_results / the results rows.
+BROKER_FIELDS = ("license_number", "name", "city", "state")
+
+
+def iter_brokers() -> Iterator[Dict[str, str]]:
+    """IDFPR brokers from the CSV's columnar cache, keeping only BROKER_FIELDS."""
+    return load_roster(BROKER_CSV).records(BROKER_FIELDS)
 
 
 def load_already_matched() -> set:
@@ -101,35 +127,14 @@ def load_already_matched() -> set:
     return matched
 
 
-def load_progress() -> Dict[str, Any]:
-    """Load progress state (which brokers have been searched)."""
-    if not os.path.exists(PROGRESS_FILE):
-        return {"searched_licenses": [], "total_searched": 0, "matches_found": 0}
-    with open(PROGRESS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
 def save_progress(progress: Dict[str, Any]) -> None:
+    """Counters only (for check_targeted_search.sh); the journal holds the state."""
     tmp = PROGRESS_FILE + ".tmp"
     with open(tmp, "w", encoding="utf-8") as f:
         json.dump(progress, f)
     os.replace(tmp, PROGRESS_FILE)
 
 
-def load_results() -> List[Dict[str, Any]]:
-    if not os.path.exists(RESULTS_FILE):
-        return []
-    with open(RESULTS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def save_results(results: List[Dict[str, Any]]) -> None:
-    tmp = RESULTS_FILE + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False)
-    os.replace(tmp, RESULTS_FILE)
-
-
 def build_query(broker: Dict[str, str]) -> str:
     """Build a targeted search query for a broker."""
     name = broker.get("name", "").strip()
@@ -166,31 +171,28 @@ def match_broker_to_results(broker: Dict[str, str], results: List[Dict[str, Any]
 
 
 def submit_batch(queries: List[str]) -> Dict[str, Any]:
-    """Submit a batch of queries to Outscraper async API."""
-    params = {
-        "query": queries,
-        "limit": 1,  # We only need the top result per name search
-        "async": "true",
-        "language": "en",
-        "region": "US",
-    }
-    return api_get("/maps/search-v3", params)
-
-
-def poll_batch(request_id: str) -> Dict[str, Any]:
-    """Poll until batch completes or times out."""
-    deadline = time.time() + POLL_TIMEOUT_S
+    """Submit a batch of queries to Outscraper async API (or answer it from the cache)."""
+    cached = CACHE.get_batch(SEARCH_ENDPOINT, queries, SEARCH_PARAMS)
+    if cached is not None:
+        return {"status": "Success", "data": cached, "cached": True}
+    params = {"query": queries, "async": "true", **SEARCH_PARAMS}
+    return CLIENT.submit(SEARCH_ENDPOINT, params)
+
+
+def poll_batch(request_id: str, delays: Iterator[float], timeout_s: float = POLL_TIMEOUT_S) -> Dict[str, Any]:
+    """Poll until batch completes or times out (waits between polls come from `delays`)."""
+    deadline = time.time() + timeout_s
     poll_n = 0
     while True:
         poll_n += 1
-        status = api_get(f"/requests/{request_id}")
+        status = CLIENT.get(f"/requests/{request_id}")
         st = status.get("status")
         if st in ("Success", "Error"):
             return status
         if time.time() >= deadline:
             status["status"] = "Timeout"
             return status
-        time.sleep(POLL_INTERVAL_S)
+        time.sleep(min(next(delays), max(0.0, deadline - time.time())))
 
 
 def extract_results_nested(data: Any) -> List[List[Dict[str, Any]]]:
@@ -205,7 +207,218 @@ def extract_results_nested(data: Any) -> List[List[Dict[str, Any]]]:
     return []
 
 
+def record_batch(journal: SearchJournal, batch_brokers: List[Dict[str, str]], per_query: List[Any]) -> int:
+    """Match a finished batch's results to its brokers and journal it. Returns the new matches."""
+    batch_results: List[Dict[str, Any]] = []
+    batch_licenses: List[str] = []
+    for i, broker in enumerate(batch_brokers):
+        query_results = per_query[i] if i < len(per_query) else []
+        if not isinstance(query_results, list):
+            query_results = [query_results] if isinstance(query_results, dict) else []
+
+        match = match_broker_to_results(broker, query_results)
+        if match:
+            batch_results.append({
+                "license_number": broker.get("license_number", ""),
+                "broker_name": broker.get("name", ""),
+                "broker_city": broker.get("city", ""),
+                "google_name": match.get("name", ""),
+                "google_place_id": match.get("place_id", ""),
+                "google_rating": match.get("rating"),
+                "google_reviews": match.get("reviews"),
+                "google_phone": match.get("phone", ""),
+                "google_website": match.get("site", ""),
+                "google_photo": match.get("photo", ""),
+                "google_address": match.get("full_address", ""),
+            })
+
+        # Track as searched
+        lic = broker.get("license_number", "")
+        if lic:
+            batch_licenses.append(lic)
+
+    # Journal the batch (O(batch), not O(progress)), then the counters
+    journal.append(journal.last_batch + 1, batch_licenses, batch_results, searched=len(batch_brokers))
+    save_progress(journal.summary())
+    return len(batch_results)
+
+
+def balance_ok() -> bool:
+    bal = get_balance()
+    if bal is None:
+        return True
+    log(f"  Outscraper balance: ${bal:.2f}")
+    if bal < MIN_BALANCE:
+        log(f"  ❌ Balance dropped below ${MIN_BALANCE}. Stopping.")
+        return False
+    return True
+
+
+@dataclass
+class RunningJob:
+    bnum: int
+    brokers: List[Dict[str, str]]
+    attempt: int
+    started: float
+    deadline: float
+    delays: Iterator[float]
+    next_poll: float
+    polls: int = 0
+
+
+def run_concurrent(
+    to_search: List[Dict[str, str]],
+    journal: SearchJournal,
+    in_flight: int,
+    timeout_s: float,
+    max_attempts: int,
+) -> None:
+    """Keep up to `in_flight` name-search jobs running; journal each batch as its job finishes.
+
+    Failed and timed-out batches go back on a retry queue that is drained
+    before new brokers are taken. Journal writes happen on this thread only.
+    """
+    retry: Deque[Tuple[List[Dict[str, str]], int]] = deque()
+    running: Dict[str, RunningJob] = {}
+    pos = 0
+    bnum = 0
+    finished = 0
+    consecutive_errors = 0
+    stopping = False
+    next_submit_at = 0.0
+
+    def requeue(brokers: List[Dict[str, str]], attempt: int, why: str) -> None:
+        nonlocal consecutive_errors, stopping
+        consecutive_errors += 1
+        if stopping:
+            log(f"  ⚠️ {why}; stopping, {len(brokers)} brokers left for the next run.")
+        elif attempt >= max_attempts:
+            log(f"  ⚠️ {why}; giving up on {len(brokers)} brokers after {attempt} attempts (left for the next run).")
+        else:
+            n = SCHED.batch_size(SCHED_KEY)
+            for i in range(0, len(brokers), n):
+                retry.append((brokers[i : i + n], attempt))
+            log(f"  🔁 {why}; requeued {len(brokers)} brokers (attempt {attempt + 1}/{max_attempts}).")
+        if consecutive_errors >= MAX_CONSECUTIVE_ERRORS and not stopping:
+            log(f"  Too many consecutive errors. Stopping after the {len(running)} jobs in flight.")
+            stopping = True
+
+    def done(bnum: int, brokers: List[Dict[str, str]], per_query: List[Any]) -> None:
+        nonlocal finished, consecutive_errors, stopping
+        consecutive_errors = 0
+        finished += 1
+        new_matches = record_batch(journal, brokers, per_query)
+        log(f"  Finished batch {bnum}: {len(brokers)} queries, {new_matches} new matches | totalSearched={journal.total_searched} matchesFound={journal.matches_found}")
+        if finished % BALANCE_CHECK_EVERY == 0 and not stopping and not balance_ok():
+            stopping = True
+
+    while running or (not stopping and (retry or pos < len(to_search))):
+        while (
+            not stopping
+            and len(running) < in_flight
+            and (retry or pos < len(to_search))
+            and time.time() >= next_submit_at
+        ):
+            if retry:
+                brokers, attempt = retry.popleft()
+            else:
+                n = SCHED.batch_size(SCHED_KEY)
+                brokers, attempt = to_search[pos : pos + n], 0
+                pos += len(brokers)
+            bnum += 1
+            queries = [build_query(b) for b in brokers]
+            remaining = len(to_search) - pos + sum(len(b) for b, _ in retry)
+            log(f"Batch {bnum}: {len(queries)} queries{f' (retry {attempt})' if attempt else ''} | {remaining} brokers queued, {len(running)} jobs in flight")
+
+            resp = submit_batch(queries)
+            if "error" in resp:
+                requeue(brokers, attempt + 1, f"Submit error: {resp['error']}")
+                next_submit_at = time.time() + SUBMIT_BACKOFF_S
+                continue
+
+            request_id = resp.get("id")
+            if not request_id:
+                if resp.get("cached"):
+                    log("  💾 All queries served from cache.")
+                done(bnum, brokers, extract_results_nested(resp.get("data", [])))
+                continue
+
+            now = time.time()
+            running[request_id] = RunningJob(
+                bnum, brokers, attempt, now, now + timeout_s, SCHED.poll_delays(SCHED_KEY, len(queries)), now
+            )
+            log(f"  Batch request id: {request_id}")
+
+        now = time.time()
+        if not running:
+            if not stopping:
+                time.sleep(max(0.0, next_submit_at - now))
+            continue
+
+        # Only poll jobs whose next poll time has come; sleep until the earliest
+        # (or until submits may resume) otherwise.
+        due = [rid for rid, job in running.items() if job.next_poll <= now]
+        if not due:
+            wake = min(job.next_poll for job in running.values())
+            if next_submit_at > now and len(running) < in_flight:
+                wake = min(wake, next_submit_at)
+            time.sleep(max(0.0, wake - now))
+            continue
+
+        statuses = CLIENT.poll_many(due)
+        for request_id in due:
+            job = running[request_id]
+            status = statuses[request_id]
+            job.polls += 1
+            st = status.get("status")
+            if st == "Success":
+                del running[request_id]
+                elapsed = time.time() - job.started
+                queries = [build_query(b) for b in job.brokers]
+                per_query = extract_results_nested(status.get("data", []))
+                n_results = sum(len(r) if isinstance(r, list) else 1 for r in per_query)
+                SCHED.observe(SCHED_KEY, len(queries), n_results, elapsed)
+                CACHE.put_batch(SEARCH_ENDPOINT, queries, SEARCH_PARAMS, status.get("data") or [], elapsed)
+                done(job.bnum, job.brokers, per_query)
+            elif st == "Error":
+                del running[request_id]
+                requeue(job.brokers, job.attempt + 1, f"Batch {job.bnum} failed: {status.get('error') or status.get('detail')}")
+            elif time.time() >= job.deadline:
+                del running[request_id]
+                SCHED.observe_timeout(SCHED_KEY, len(job.brokers))
+                requeue(job.brokers, job.attempt + 1, f"Batch {job.bnum} timed out after {timeout_s:.0f}s")
+            else:
+                if "error" in status:
+                    log(f"  ❌ Poll error (batch {job.bnum}, poll {job.polls}): {status.get('error')}")
+                job.next_poll = min(time.time() + next(job.delays), job.deadline)
+
+
 def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--in-flight",
+        type=int,
+        default=1,
+        help="Search jobs to keep running at once (default: 1 = one batch at a time).",
+    )
+    ap.add_argument(
+        "--job-timeout",
+        type=float,
+        default=POLL_TIMEOUT_S,
+        metavar="SECONDS",
+        help=f"Give up on a job after this long and requeue its batch (default: {POLL_TIMEOUT_S}).",
+    )
+    ap.add_argument(
+        "--max-attempts",
+        type=int,
+        default=MAX_ATTEMPTS,
+        help=f"Submits per broker before leaving it for the next run (default: {MAX_ATTEMPTS}).",
+    )
+    args = ap.parse_args()
+    timeout_s = max(1.0, args.job_timeout)
+    max_attempts = max(1, args.max_attempts)
+    SCHED.timeout_s = timeout_s  # batch sizes target the timeout actually used
+
     log("=" * 70)
     log("TARGETED BROKER SEARCH — Outscraper Name-Based Matching")
     log("=" * 70)
@@ -218,59 +431,83 @@ def main() -> int:
             log(f"❌ Balance too low (< ${MIN_BALANCE}). Stopping.")
             return 1
 
-    # Load data
-    log("Loading IDFPR brokers...")
-    all_brokers = load_brokers()
-    log(f"Total IDFPR brokers: {len(all_brokers)}")
-
     already_matched = load_already_matched()
     log(f"Already have Google match: {len(already_matched)}")
 
-    # Filter to unmatched only
-    unmatched = [b for b in all_brokers if b.get("license_number", "") not in already_matched]
-    log(f"Unmatched brokers to search: {len(unmatched)}")
+    # Replay the journal (resume support; imports the legacy progress/results once)
+    journal = SearchJournal(JOURNAL_FILE, PROGRESS_FILE, RESULTS_FILE)
+    searched_set = journal.searched
+    log(f"Previously searched (from journal): {len(searched_set)}")
 
-    # Load progress (resume support)
-    progress = load_progress()
-    searched_set = set(progress.get("searched_licenses", []))
-    log(f"Previously searched (from progress file): {len(searched_set)}")
-
-    # Filter out already-searched
-    to_search = [b for b in unmatched if b.get("license_number", "") not in searched_set]
+    # Stream brokers, keeping only unmatched + not-yet-searched ones
+    log("Loading IDFPR brokers...")
+    total_brokers = 0
+    unmatched_count = 0
+    to_search: List[Dict[str, str]] = []
+    for b in iter_brokers():
+        total_brokers += 1
+        lic = b.get("license_number", "")
+        if lic in already_matched:
+            continue
+        unmatched_count += 1
+        if lic not in searched_set:
+            to_search.append(b)
+    log(f"Total IDFPR brokers: {total_brokers}")
+    log(f"Unmatched brokers to search: {unmatched_count}")
     log(f"Remaining to search this run: {len(to_search)}")
 
     if not to_search:
+        journal.write_results(RESULTS_FILE)
         log("✅ All brokers already searched!")
         return 0
 
-    # Load existing results
-    results = load_results()
-    matches_found = progress.get("matches_found", len(results))
-    total_searched = progress.get("total_searched", len(searched_set))
-    log(f"Existing matches: {matches_found}")
+    log(f"Existing matches: {journal.matches_found}")
 
-    total_batches = (len(to_search) + BATCH_SIZE - 1) // BATCH_SIZE
-    log(f"Batches remaining: {total_batches} (batch size {BATCH_SIZE})")
+    n = SCHED.batch_size(SCHED_KEY)
+    log(f"Batches remaining: ~{(len(to_search) + n - 1) // n} (batch size {n}; scheduler: {SCHED.describe(SCHED_KEY)})")
+    log(f"In flight: {args.in_flight} | Job timeout: {timeout_s:.0f}s | Attempts: {max_attempts}")
     log("")
 
+    if args.in_flight > 1:
+        run_concurrent(to_search, journal, args.in_flight, timeout_s, max_attempts)
+        return finish(journal)
+
     batch_count = 0
     consecutive_errors = 0
-
-    for bstart in range(0, len(to_search), BATCH_SIZE):
-        bend = min(bstart + BATCH_SIZE, len(to_search))
-        batch_brokers = to_search[bstart:bend]
+    bstart = 0
+    attempts: Dict[int, int] = {}  # id(broker) -> failed submits, for requeueing
+
+    def requeue(batch_brokers: List[Dict[str, str]]) -> None:
+        kept = 0
+        for b in batch_brokers:
+            attempts[id(b)] = attempts.get(id(b), 0) + 1
+            if attempts[id(b)] < max_attempts:
+                to_search.append(b)
+                kept += 1
+        if kept:
+            log(f"  🔁 Requeued {kept} brokers at the end of the run.")
+        if kept < len(batch_brokers):
+            log(f"  Giving up on {len(batch_brokers) - kept} brokers after {max_attempts} attempts (left for the next run).")
+
+    while bstart < len(to_search):
+        n = SCHED.batch_size(SCHED_KEY)
+        batch_brokers = to_search[bstart : bstart + n]
+        remaining = len(to_search) - bstart
+        bstart += len(batch_brokers)
         batch_count += 1
 
         queries = [build_query(b) for b in batch_brokers]
 
-        log(f"Batch {batch_count}/{total_batches}: {len(queries)} queries (progress {total_searched}/{total_searched + len(to_search) - bstart})")
+        total_searched = journal.total_searched
+        log(f"Batch {batch_count}/~{batch_count - 1 + (remaining + n - 1) // n}: {len(queries)} queries (progress {total_searched}/{total_searched + remaining})")
 
         # Submit
         resp = submit_batch(queries)
         if "error" in resp:
             log(f"  ❌ Submit error: {resp['error']}")
+            requeue(batch_brokers)
             consecutive_errors += 1
-            if consecutive_errors >= 5:
+            if consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
                 log("  Too many consecutive errors. Stopping.")
                 break
             time.sleep(30)
@@ -278,90 +515,58 @@ def main() -> int:
 
         request_id = resp.get("id")
         if not request_id:
-            # Sync response
+            # Sync response (or every query was cached)
+            if resp.get("cached"):
+                log("  💾 All queries served from cache.")
             data = resp.get("data", [])
             per_query = extract_results_nested(data)
         else:
             log(f"  Batch request id: {request_id}")
-            status = submit_result = poll_batch(request_id)
+            started = time.time()
+            status = poll_batch(request_id, SCHED.poll_delays(SCHED_KEY, len(queries)), timeout_s)
             st = status.get("status")
+            if st == "Timeout":
+                SCHED.observe_timeout(SCHED_KEY, len(queries))
             if st != "Success":
-                log(f"  ⚠️ Batch {st}. Skipping.")
+                log(f"  ⚠️ Batch {st}.")
+                requeue(batch_brokers)
                 consecutive_errors += 1
-                if consecutive_errors >= 5:
+                if consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
                     log("  Too many consecutive errors. Stopping.")
                     break
                 continue
             per_query = extract_results_nested(status.get("data", []))
+            n_results = sum(len(r) if isinstance(r, list) else 1 for r in per_query)
+            SCHED.observe(SCHED_KEY, len(queries), n_results, time.time() - started)
+            CACHE.put_batch(SEARCH_ENDPOINT, queries, SEARCH_PARAMS, status.get("data") or [], time.time() - started)
 
         consecutive_errors = 0  # Reset on success
 
-        # Match results to brokers
-        batch_matches = 0
-        for i, broker in enumerate(batch_brokers):
-            query_results = per_query[i] if i < len(per_query) else []
-            if not isinstance(query_results, list):
-                query_results = [query_results] if isinstance(query_results, dict) else []
-
-            match = match_broker_to_results(broker, query_results)
-            if match:
-                results.append({
-                    "license_number": broker.get("license_number", ""),
-                    "broker_name": broker.get("name", ""),
-                    "broker_city": broker.get("city", ""),
-                    "google_name": match.get("name", ""),
-                    "google_place_id": match.get("place_id", ""),
-                    "google_rating": match.get("rating"),
-                    "google_reviews": match.get("reviews"),
-                    "google_phone": match.get("phone", ""),
-                    "google_website": match.get("site", ""),
-                    "google_photo": match.get("photo", ""),
-                    "google_address": match.get("full_address", ""),
-                })
-                batch_matches += 1
-                matches_found += 1
-
-            # Track as searched
-            lic = broker.get("license_number", "")
-            if lic:
-                searched_set.add(lic)
-
-        total_searched += len(batch_brokers)
-
-        # Save progress after every batch
-        progress = {
-            "searched_licenses": list(searched_set),
-            "total_searched": total_searched,
-            "matches_found": matches_found,
-            "last_batch": batch_count,
-            "last_updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
-        }
-        save_progress(progress)
-        save_results(results)
-
-        elapsed_msg = f"totalSearched={total_searched} matchesFound={matches_found}"
-        log(f"  Finished batch: {len(queries)} queries, {batch_matches} new matches | {elapsed_msg}")
+        new_matches = record_batch(journal, batch_brokers, per_query)
+        elapsed_msg = f"totalSearched={journal.total_searched} matchesFound={journal.matches_found}"
+        log(f"  Finished batch: {len(queries)} queries, {new_matches} new matches | {elapsed_msg}")
 
         # Periodic balance check
-        if batch_count % BALANCE_CHECK_EVERY == 0:
-            bal = get_balance()
-            if bal is not None:
-                log(f"  Outscraper balance: ${bal:.2f}")
-                if bal < MIN_BALANCE:
-                    log(f"  ❌ Balance dropped below ${MIN_BALANCE}. Stopping.")
-                    break
+        if batch_count % BALANCE_CHECK_EVERY == 0 and not balance_ok():
+            break
 
         # Small delay between batches
         time.sleep(1)
 
-    # Final summary
+    return finish(journal)
+
+
+def finish(journal: SearchJournal) -> int:
+    """Rebuild the results file and log the final summary."""
+    n_results = journal.write_results(RESULTS_FILE)
+    total_searched, matches_found = journal.total_searched, journal.matches_found
     log("")
     log("=" * 70)
     bal = get_balance()
     log(f"FINISHED. Total searched: {total_searched} | Matches: {matches_found} | Rate: {matches_found/max(total_searched,1)*100:.1f}%")
     if bal is not None:
         log(f"Final balance: ${bal:.2f}")
-    log(f"Results saved to: {RESULTS_FILE}")
+    log(f"Results saved to: {RESULTS_FILE} ({n_results} matches, from {JOURNAL_FILE})")
     log(f"Progress saved to: {PROGRESS_FILE}")
     log("=" * 70)
     return 0
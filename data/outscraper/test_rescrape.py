@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""--rescrape-older-than must send stale cities to the API, not answer them from the response cache.
+
+Runs run_fixed_scrape.run_category() against temp stores and a fake client
+that records the queries it is asked to search (no network, no API key).
+
+  python3 -m unittest data/outscraper/test_rescrape.py
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+from typing import Any, Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+_TMP = tempfile.mkdtemp(prefix="rescrape-test-")
+os.environ["OUTSCRAPER_PLACES_DB"] = os.path.join(_TMP, "places.sqlite")
+os.environ["OUTSCRAPER_CACHE"] = os.path.join(_TMP, "cache.sqlite")
+sys.path.insert(0, HERE)
+
+import run_fixed_scrape as rfs  # noqa: E402
+
+CATEGORY = "home inspector"
+CITIES = ["Aurora", "Elgin", "Joliet"]
+DAY = 86400
+
+
+class FakeClient:
+    """Answers every search at once (no request id) with one place per query."""
+
+    def __init__(self) -> None:
+        self.searched: List[str] = []
+
+    def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        queries = list((params or {}).get("query") or [])
+        self.searched += queries
+        data = [[{"place_id": f"{q}#{time.time()}", "name": q}] for q in queries]
+        return {"status": "Success", "data": data}
+
+    submit = get
+
+
+class RescrapeTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.mkdtemp(dir=_TMP)
+        rfs.HERE = self.dir
+        rfs.LOG_FILE = os.path.join(self.dir, "log.txt")
+        rfs.CITIES_IL = list(CITIES)
+        rfs.SCHED.path = os.path.join(self.dir, "sched.json")
+        rfs.CLIENT = self.client = FakeClient()
+        rfs.PLACES.db.execute("DELETE FROM places")
+        rfs.PLACES.db.execute("DELETE FROM coverage")
+        rfs.CACHE.db.execute("DELETE FROM entries")
+        rfs.time.sleep = lambda s: None
+
+        # Every city scraped (and its answer cached) 10 days ago.
+        queries = rfs.build_queries(CATEGORY, CITIES)
+        store = rfs.PLACES.category(CATEGORY, rfs.category_to_filename(CATEGORY))
+        store.append([{"place_id": f"old-{c}", "name": c} for c in CITIES], cities=CITIES)
+        rfs.CACHE.put_batch(rfs.SEARCH_ENDPOINT, queries, rfs.SEARCH_PARAMS, [[{"place_id": "cached"}]] * 3)
+        then = time.time() - 10 * DAY
+        with rfs.PLACES.db:
+            rfs.PLACES.db.execute("UPDATE coverage SET last_scraped = ?", (then,))
+        with rfs.CACHE.db:
+            rfs.CACHE.db.execute("UPDATE entries SET fetched_at = ?, last_used = ?", (then, then))
+        self.queries = queries
+
+    def test_stale_cities_are_searched_again(self) -> None:
+        rfs.run_category(CATEGORY, rescrape_older_than_days=5)
+        self.assertEqual(sorted(self.client.searched), sorted(self.queries))
+        covered = rfs.PLACES.coverage(CATEGORY)
+        self.assertTrue(all(time.time() - ts < DAY for ts, _ in covered.values()))
+
+    def test_rescrape_everything(self) -> None:
+        # RERUN_HOME_INSPECTOR's older = 0.0: no cached answer is recent enough.
+        rfs.run_category(CATEGORY, rescrape_older_than_days=0.0)
+        self.assertEqual(sorted(self.client.searched), sorted(self.queries))
+
+    def test_fresh_cities_are_skipped(self) -> None:
+        rfs.run_category(CATEGORY, rescrape_older_than_days=20)
+        self.assertEqual(self.client.searched, [])
+
+    def test_cache_newer_than_cutoff_is_used(self) -> None:
+        with rfs.CACHE.db:
+            rfs.CACHE.db.execute("UPDATE entries SET fetched_at = ?", (time.time() - DAY,))
+        rfs.run_category(CATEGORY, rescrape_older_than_days=5)
+        self.assertEqual(self.client.searched, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""Benchmark the row normalizers in normalize_state_data.py against the
+original regex/strptime helpers, and check that both produce identical rows.
+
+For each state input the same state plugin is compiled and run twice: once
+with the module's current field helpers and once with the legacy ones below
+patched in (helpers are bound when a plugin is compiled). Rows must match
+exactly; the timing difference is the helper cost. A per-helper
+micro-benchmark runs over the values actually found in the inputs, plus a
+fixed set of date edge cases (Feb 29, day 31, 2-digit / pre-1000 years).
+
+Run:
+  python3 scripts/bench_normalizers.py                      # TX, CA, FL default inputs
+  python3 scripts/bench_normalizers.py --states texas new_york
+  python3 scripts/bench_normalizers.py --input texas=/tmp/trec.csv --repeat 3
+
+Inputs that don't exist are skipped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import normalize_state_data as nsd  # noqa: E402
+
+
+# ---- legacy helpers (reference behaviour, copied from the original module) ----
+
+def legacy_norm_space(s: str) -> str:
+    return re.sub(r"\s+", " ", (s or "").strip())
+
+
+def legacy_safe_title(name: str) -> str:
+    # Keep mostly readable; avoid lowercasing everything if already mixed.
+    s = legacy_norm_space(name)
+    if not s:
+        return ""
+    # If it's all-caps (common in exports), title-case it.
+    letters = re.sub(r"[^A-Za-z]+", "", s)
+    if letters and letters.upper() == letters:
+        return s.title()
+    return s
+
+
+def legacy_fmt_date_yyyymmdd(s: str) -> str:
+    s = legacy_norm_space(s)
+    if not s:
+        return ""
+    try:
+        dt = datetime.strptime(s, "%Y%m%d")
+        return dt.strftime("%Y-%m-%d")
+    except Exception:
+        return s
+
+
+def legacy_fmt_date_mdy(s: str) -> str:
+    s = legacy_norm_space(s)
+    if not s:
+        return ""
+    for fmt in ("%m/%d/%Y", "%m/%d/%y"):
+        try:
+            dt = datetime.strptime(s, fmt)
+            return dt.strftime("%Y-%m-%d")
+        except Exception:
+            pass
+    return s
+
+
+def legacy_fmt_date_dd_mmm_yy(s: str) -> str:
+    s = legacy_norm_space(s)
+    if not s:
+        return ""
+    try:
+        dt = datetime.strptime(s, "%d-%b-%y")
+        return dt.strftime("%Y-%m-%d")
+    except Exception:
+        return s
+
+
+def legacy_parse_last_comma_first(name: str) -> str:
+    """"LAST, FIRST MIDDLE" -> "FIRST MIDDLE LAST"""
+    s = legacy_norm_space(name)
+    if not s:
+        return ""
+    if "," not in s:
+        return legacy_safe_title(s)
+    last, rest = s.split(",", 1)
+    last = legacy_norm_space(last)
+    rest = legacy_norm_space(rest)
+    combined = legacy_norm_space(f"{rest} {last}")
+    return legacy_safe_title(combined)
+
+
+def legacy_parse_last_first_no_comma(name: str) -> str:
+    """"LAST FIRST" -> "FIRST LAST" (best-effort)"""
+    s = legacy_norm_space(name)
+    if not s:
+        return ""
+    parts = s.split(" ")
+    if len(parts) < 2:
+        return legacy_safe_title(s)
+    last = parts[0]
+    first_rest = " ".join(parts[1:])
+    return legacy_safe_title(legacy_norm_space(f"{first_rest} {last}"))
+
+
+LEGACY = {
+    "norm_space": legacy_norm_space,
+    "safe_title": legacy_safe_title,
+    "title_cached": legacy_safe_title,
+    "fmt_date_yyyymmdd": legacy_fmt_date_yyyymmdd,
+    "fmt_date_mdy": legacy_fmt_date_mdy,
+    "fmt_date_dd_mmm_yy": legacy_fmt_date_dd_mmm_yy,
+    "parse_last_comma_first": legacy_parse_last_comma_first,
+    "parse_last_first_no_comma": legacy_parse_last_first_no_comma,
+}
+
+# Which helper each state's raw columns go through (for the micro-benchmark).
+FIELDS: Dict[str, List[Tuple[str, str]]] = {
+    "texas": [
+        ("Full Name", "safe_title"),
+        ("Related License Full Name", "title_cached"),
+        ("License Number", "norm_space"),
+        ("Original License Date", "fmt_date_mdy"),
+        ("License Expiration Date", "fmt_date_mdy"),
+    ],
+    "california": [
+        ("city", "title_cached"),
+        ("county_name", "title_cached"),
+        ("zip_code", "norm_space"),
+        ("lic_number", "norm_space"),
+        ("original_date_of_license", "fmt_date_yyyymmdd"),
+        ("lic_expiration_date", "fmt_date_yyyymmdd"),
+    ],
+    "florida": [
+        ("1", "parse_last_comma_first"),
+        ("19", "title_cached"),
+        ("7", "title_cached"),
+        ("10", "title_cached"),
+        ("11", "norm_space"),
+        ("14", "fmt_date_dd_mmm_yy"),
+        ("16", "fmt_date_dd_mmm_yy"),
+    ],
+    "new_york": [
+        ("License Holder Name", "parse_last_first_no_comma"),
+        ("Business Name", "title_cached"),
+        ("Business City", "title_cached"),
+        ("License Expiration Date", "fmt_date_mdy"),
+    ],
+}
+
+DATE_EDGE_CASES: Dict[str, Sequence[str]] = {
+    "fmt_date_yyyymmdd": ["20240229", "20230229", "20230431", "20231231", "09991231", "2023011", "202301011",
+                          "00000101", "2023 0101", "２０２３０１０１", " 20230105 ", ""],
+    "fmt_date_mdy": ["2/29/2024", "02/29/2023", "4/31/2023", "12/31/99", "1/1/68", "1/1/69", "01/02/0999",
+                     "13/01/2000", "00/10/2000", "1/1/20201", "001/1/2020", "1 / 1 / 2020", "", "x"],
+    "fmt_date_dd_mmm_yy": ["29-Feb-24", "29-FEB-23", "31-apr-23", "01-JAN-68", "01-Jan-69", "1-Sep-05",
+                           "01-Sept-05", "01-JAN-2005", "001-JAN-05", "15-Jan-98", "", "x"],
+}
+
+
+def _patched(overrides: Dict[str, Callable[[str], str]]) -> Dict[str, Callable[[str], str]]:
+    saved = {k: getattr(nsd, k) for k in overrides}
+    for k, fn in overrides.items():
+        setattr(nsd, k, fn)
+    return saved
+
+
+def _clear_caches() -> None:
+    for name in ("title_cached", "fmt_date_yyyymmdd", "fmt_date_mdy", "fmt_date_dd_mmm_yy"):
+        getattr(nsd, name).cache_clear()
+    nsd.compile_plugin.cache_clear()
+
+
+def run_state(fn: Callable, path: Path, legacy: bool) -> Tuple[float, List[Tuple[str, ...]]]:
+    _clear_caches()
+    saved = _patched(LEGACY) if legacy else {}
+    try:
+        t0 = time.perf_counter()
+        rows = list(fn(path))
+        return time.perf_counter() - t0, rows
+    finally:
+        _patched(saved)
+
+
+def column_values(state: str, path: Path) -> Dict[str, List[str]]:
+    cols = [c for c, _ in FIELDS[state]]
+    out: Dict[str, List[str]] = {c: [] for c in cols}
+    if not nsd.REGISTRY[state].has_header:
+        for row in nsd.iter_list_rows(path):
+            for c in cols:
+                i = int(c)
+                out[c].append(row[i] if i < len(row) else "")
+    else:
+        for row in nsd.iter_dict_rows(path):
+            for c in cols:
+                out[c].append(row.get(c) or "")
+    return out
+
+
+def check_edge_cases() -> int:
+    bad = 0
+    for name, cases in DATE_EDGE_CASES.items():
+        fast, ref = getattr(nsd, name), LEGACY[name]
+        for s in cases:
+            if fast(s) != ref(s):
+                print(f"  MISMATCH {name}({s!r}): {fast(s)!r} != {ref(s)!r}")
+                bad += 1
+    print(f"Date edge cases: {sum(map(len, DATE_EDGE_CASES.values())) - bad} ok, {bad} mismatched")
+    return bad
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--states", nargs="*", default=["texas", "california", "florida"], help="States to run")
+    ap.add_argument("--input", action="append", default=[], metavar="STATE=PATH", help="Override an input path")
+    ap.add_argument("--repeat", type=int, default=1, help="Timing runs per variant (best is reported)")
+    args = ap.parse_args()
+
+    repo_root = Path(__file__).resolve().parents[1]
+    jobs = {p.key: (in_path, partial(nsd.iter_rows, p)) for p, in_path, _ in nsd.build_jobs(repo_root)}
+    for spec in args.input:
+        key, _, path = spec.partition("=")
+        jobs[key] = (Path(path), jobs[key][1])
+
+    failures = check_edge_cases()
+
+    for state in args.states:
+        in_path, fn = jobs[state]
+        if not in_path.exists():
+            print(f"\n{state}: {in_path} not found, skipped")
+            continue
+        size_mb = in_path.stat().st_size / 1e6
+        print(f"\n{state}: {in_path} ({size_mb:.1f} MB)")
+
+        t_old = t_new = float("inf")
+        for _ in range(max(1, args.repeat)):
+            dt, old_rows = run_state(fn, in_path, legacy=True)
+            t_old = min(t_old, dt)
+            dt, new_rows = run_state(fn, in_path, legacy=False)
+            t_new = min(t_new, dt)
+        same = old_rows == new_rows
+        if not same:
+            failures += 1
+            diff = next(i for i, (a, b) in enumerate(zip(old_rows + [()], new_rows + [()])) if a != b)
+            print(f"  ROWS DIFFER at row {diff}: {old_rows[diff:diff + 1]} vs {new_rows[diff:diff + 1]}")
+        print(
+            f"  {state}: {len(new_rows):,} rows | legacy {t_old:.2f}s | fast {t_new:.2f}s | "
+            f"{t_old / max(t_new, 1e-9):.1f}x | identical={same}"
+        )
+
+        for col, values in column_values(state, in_path).items():
+            helper = dict(FIELDS[state])[col]
+            fast, ref = getattr(nsd, helper), LEGACY[helper]
+            if hasattr(fast, "cache_clear"):
+                fast.cache_clear()
+            t0 = time.perf_counter()
+            ref_out = [ref(v) for v in values]
+            t1 = time.perf_counter()
+            fast_out = [fast(v) for v in values]
+            t2 = time.perf_counter()
+            ok = ref_out == fast_out
+            failures += not ok
+            label = f"{helper}({col})"
+            print(f"    {label:<48} legacy {t1 - t0:6.2f}s | fast {t2 - t1:6.2f}s | {(t1 - t0) / max(t2 - t1, 1e-9):5.1f}x | identical={ok}")
+
+    print("\nOK" if not failures else f"\n{failures} mismatch(es)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""Offline scaling benchmark for the data pipeline stages.
+
+Generates synthetic rosters in each source's real layout (TREC, DRE, DBPR
+headerless, DOS, the IDFPR broker roster, Outscraper place records) at each
+requested size, then times every stage in its own subprocess so peak RSS is
+per stage:
+
+  normalize_texas / normalize_california / normalize_florida / normalize_new_york
+      CSV in -> normalized CSV out (written to /dev/null)
+  build_index                  IDFPR roster -> per-city blocked index (Homes.com matcher)
+  best_match                   Homes.com-style agents (1 per 10 roster rows, <= 50K) vs that index
+  places_store_append          Outscraper places in 500-record batches, ~10% repeat place_ids,
+                               into the SQLite places store (one transaction each), then the
+                               category + master exports
+  match_broker_to_results      one broker vs a 3-place search result (targeted search)
+
+Reported per stage and size: rows, seconds, rows/s, peak RSS. Results are saved
+as JSON tagged with the git commit, so two commits can be compared:
+
+Run:
+  python3 scripts/bench_pipeline.py                                 # 10K, 100K, 1M
+  python3 scripts/bench_pipeline.py --sizes 10000 100000 --stages normalize_texas best_match --repeat 3
+  python3 scripts/bench_pipeline.py --compare .bench/results/pipeline-<old commit>.json
+
+Generated inputs are kept in .bench/data (reused across runs, same seed -> same
+bytes); results go to .bench/results/pipeline-<commit>.json. No network access.
+best_match / build_index need rapidfuzz (as the matcher does); without it those
+stages are reported as skipped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS_DIR = REPO_ROOT / "scripts"
+HOMES_DIR = REPO_ROOT / "data" / "homes_com"
+OUTSCRAPER_DIR = REPO_ROOT / "data" / "outscraper"
+BENCH_DIR = REPO_ROOT / ".bench"
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+NORMALIZE_STATES = ["texas", "california", "florida", "new_york"]
+STAGES = [f"normalize_{s}" for s in NORMALIZE_STATES] + [
+    "build_index",
+    "best_match",
+    "places_store_append",
+    "match_broker_to_results",
+]
+
+AGENTS_PER_ROSTER_ROW = 0.1
+MAX_AGENTS = 50_000
+STORE_BATCH = 500
+CHUNK = 10_000
+
+
+# ---- synthetic data -----------------------------------------------------------
+
+_ONSETS = ["b", "br", "c", "ch", "d", "f", "g", "h", "j", "k", "l", "m", "n", "p", "r", "s", "sh", "t", "v", "w", "z"]
+_VOWELS = ["a", "e", "i", "o", "u", "ai", "ea", "ie", "ou"]
+_CODAS = ["", "", "n", "r", "s", "l", "th", "rd", "ck", "nd", "m"]
+
+
+class Synth:
+    """Deterministic name / city / company pools with a skewed (Zipf-like) draw,
+    so repetition across rows looks like a real roster."""
+
+    def __init__(self, seed: int) -> None:
+        self.rng = random.Random(seed)
+        self.first = self._pool(400, 2)
+        self.last = self._pool(5000, 3)
+        self.cities = self._pool(600, 3)
+        self.companies = [f"{w} {s}" for w, s in zip(self._pool(3000, 2), self._suffixes(3000))]
+        self._city_cw = list(accumulate(1.0 / (i + 1) for i in range(len(self.cities))))
+        self._co_cw = list(accumulate(1.0 / (i + 1) ** 0.8 for i in range(len(self.companies))))
+
+    def _word(self, syllables: int) -> str:
+        r = self.rng
+        return "".join(r.choice(_ONSETS) + r.choice(_VOWELS) + r.choice(_CODAS) for _ in range(syllables))
+
+    def _pool(self, n: int, max_syl: int) -> List[str]:
+        seen: Dict[str, None] = {}
+        while len(seen) < n:
+            seen[self._word(self.rng.randint(1, max_syl)).capitalize()] = None
+        return list(seen)
+
+    def _suffixes(self, n: int) -> List[str]:
+        return [self.rng.choice(["Realty", "Properties", "Real Estate LLC", "Group, Inc.", "Homes"]) for _ in range(n)]
+
+    def first_name(self) -> str:
+        return self.rng.choice(self.first)
+
+    def last_name(self) -> str:
+        return self.rng.choice(self.last)
+
+    def middle(self) -> str:
+        return self.rng.choice("ABCDEFGHJKLMNPRSTW") if self.rng.random() < 0.4 else ""
+
+    def city(self) -> str:
+        return self.rng.choices(self.cities, cum_weights=self._city_cw)[0]
+
+    def company(self) -> str:
+        return self.rng.choices(self.companies, cum_weights=self._co_cw)[0] if self.rng.random() < 0.85 else ""
+
+    def date_parts(self) -> Tuple[int, int, int]:
+        r = self.rng
+        return r.randint(1970, 2025), r.randint(1, 12), r.randint(1, 31 if r.random() < 0.05 else 28)
+
+    def pick(self, weighted: Dict[str, float]) -> str:
+        return self.rng.choices(list(weighted), list(weighted.values()))[0]
+
+
+_MON = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+
+
+def _texas_rows(s: Synth, n: int) -> Iterator[List[str]]:
+    yield ["License Type", "License Number", "Full Name", "Status", "Original License Date",
+           "License Expiration Date", "Related License Full Name"]
+    for i in range(n):
+        y, m, d = s.date_parts()
+        ey = s.rng.randint(2025, 2028)
+        mid = s.middle()
+        yield [
+            s.pick({"Sales Agent": 0.7, "Broker": 0.2, "Inspector": 0.1}),
+            str(400000 + i),
+            " ".join(p for p in (s.first_name(), mid, s.last_name()) if p).upper(),
+            s.pick({"Active": 0.8, "Probation - Active": 0.02, "Inactive": 0.18}),
+            f"{m}/{d}/{y}",
+            f"{m:02d}/{min(d, 28):02d}/{ey}",
+            s.company().upper(),
+        ]
+
+
+def _california_rows(s: Synth, n: int) -> Iterator[List[str]]:
+    yield ["lic_number", "lic_type", "lic_status", "lastname_primary", "firstname_secondary",
+           "related_lastname_primary", "related_firstname_secondary", "city", "state", "zip_code",
+           "county_name", "original_date_of_license", "lic_expiration_date"]
+    for i in range(n):
+        y, m, d = s.date_parts()
+        co = s.company().upper()
+        yield [
+            f"0{1000000 + i}",
+            s.pick({"Salesperson": 0.7, "Broker": 0.25, "Corporation": 0.05}),
+            s.pick({"Licensed": 0.85, "Expired": 0.15}),
+            s.last_name().upper(),
+            (s.first_name() + (" " + s.middle() if s.rng.random() < 0.3 else "")).upper().strip(),
+            co, "",
+            s.city().upper(),
+            "CA",
+            f"9{s.rng.randint(0, 6999):04d}",
+            s.city().upper(),
+            f"{y}{m:02d}{d:02d}",
+            f"{s.rng.randint(2025, 2028)}{m:02d}{min(d, 28):02d}",
+        ]
+
+
+def _florida_rows(s: Synth, n: int) -> Iterator[List[str]]:
+    for i in range(n):
+        y, m, d = s.date_parts()
+        yield [
+            "2501",
+            f"{s.last_name().upper()}, {s.first_name().upper()} {s.middle()}".strip(),
+            "",
+            s.pick({"SL Sales Associate": 0.7, "BK Broker": 0.15, "BL Broker Sales": 0.1, "CQ Corporation": 0.05}),
+            f"{s.rng.randint(1, 9999)} {s.last_name().upper()} ST", "", "",
+            s.city().upper(),
+            "FL",
+            f"3{s.rng.randint(2000, 4999):04d}",
+            s.city().upper(),
+            f"SL{3000000 + i}",
+            s.pick({"Current": 0.85, "Null": 0.15}),
+            s.pick({"Active": 0.9, "Inactive": 0.1}),
+            f"{d:02d}-{_MON[m - 1]}-{y % 100:02d}",
+            "",
+            f"31-MAR-{s.rng.randint(25, 28)}",
+            "", "",
+            s.company().upper(),
+            f"CQ{s.rng.randint(1000000, 1099999)}",
+        ]
+
+
+def _new_york_rows(s: Synth, n: int) -> Iterator[List[str]]:
+    yield ["License Holder Name", "License Number", "License Type", "Business Name", "Business City",
+           "Business State", "Business Zip", "County", "License Expiration Date"]
+    for i in range(n):
+        _, m, d = s.date_parts()
+        city = s.city().upper()
+        yield [
+            f"{s.last_name().upper()} {s.first_name().upper()} {s.middle()}".strip(),
+            str(10400000000 + i),
+            s.pick({"REAL ESTATE SALESPERSON": 0.75, "REAL ESTATE BROKER": 0.15, "BRANCH OFFICE": 0.1}),
+            s.company().upper(),
+            city,
+            "NY",
+            f"1{s.rng.randint(0, 4999):04d}",
+            city,
+            f"{m:02d}/{min(d, 28):02d}/{s.rng.randint(2025, 2028)}",
+        ]
+
+
+STATE_GENERATORS: Dict[str, Callable[[Synth, int], Iterator[List[str]]]] = {
+    "texas": _texas_rows,
+    "california": _california_rows,
+    "florida": _florida_rows,
+    "new_york": _new_york_rows,
+}
+
+
+def ensure_state_csv(state: str, rows: int, seed: int, data_dir: Path) -> Path:
+    path = data_dir / f"{state}-{rows}-s{seed}.csv"
+    if path.exists():
+        return path
+    data_dir.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(STATE_GENERATORS[state](Synth(seed), rows))
+    os.replace(tmp, path)
+    return path
+
+
+def idfpr_roster(s: Synth, n: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "license_number": str(475000000 + i),
+            "first_name": s.first_name().upper(),
+            "middle": s.middle(),
+            "last_name": s.last_name().upper(),
+            "city": s.city().upper(),
+        }
+        for i in range(n)
+    ]
+
+
+def homes_agents(s: Synth, roster: List[Dict[str, Any]], n: int) -> List[Dict[str, str]]:
+    """Agents drawn from the roster (some with a typo or a dropped middle), plus ~15% strangers."""
+    out = []
+    for _ in range(n):
+        if s.rng.random() < 0.15:
+            out.append({"agent_name": f"{s.first_name()} {s.last_name()}", "city": s.city()})
+            continue
+        rec = s.rng.choice(roster)
+        last = rec["last_name"].title()
+        if s.rng.random() < 0.2 and len(last) > 3:
+            k = s.rng.randrange(1, len(last))
+            last = last[:k] + last[k + 1 :]
+        out.append({"agent_name": f"{rec['first_name'].title()} {last}", "city": rec["city"].title()})
+    return out
+
+
+def place_batch(s: Synth, start: int, n: int, dup_rate: float = 0.1) -> List[Dict[str, Any]]:
+    out = []
+    for i in range(start, start + n):
+        pid = i if (i == 0 or s.rng.random() >= dup_rate) else s.rng.randrange(0, i)
+        city = s.city()
+        out.append(
+            {
+                "query": f"real estate agent in {city}, IL",
+                "name": f"{s.first_name()} {s.last_name()} - {s.company() or 'Realtor'}",
+                "place_id": f"ChIJ{pid:012d}",
+                "full_address": f"{s.rng.randint(1, 9999)} Main St, {city}, IL 60{s.rng.randint(0, 999):03d}",
+                "city": city,
+                "phone": f"+1 312-555-{s.rng.randint(0, 9999):04d}",
+                "site": f"https://{s.last_name().lower()}.example.com/",
+                "category": "Real estate agent",
+                "rating": round(s.rng.uniform(3, 5), 1),
+                "reviews": s.rng.randint(0, 400),
+                "latitude": 41.8 + s.rng.random(),
+                "longitude": -87.6 - s.rng.random(),
+            }
+        )
+    return out
+
+
+def broker_with_results(s: Synth) -> Tuple[Dict[str, str], List[Dict[str, Any]]]:
+    first, last = s.first_name(), s.last_name()
+    broker = {"license_number": "", "name": f"{first} {s.middle()} {last}".replace("  ", " "), "city": s.city(), "state": "IL"}
+    results = [
+        {"name": f"{s.first_name()} {s.last_name()} Realty", "category": "Real estate agency"},
+        {"name": f"{s.company()} Real Estate", "category": "Real estate agency"},
+        {"name": f"{first} {last} - Broker" if s.rng.random() < 0.5 else f"{last} Team", "type": "Real estate agent"},
+    ]
+    return broker, results
+
+
+# ---- child: run one stage -----------------------------------------------------
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def run_stage(stage: str, rows: int, seed: int, data_dir: Path) -> Dict[str, Any]:
+    """Set up, then time, one stage. Setup (imports, loading inputs) is untimed."""
+    s = Synth(seed)
+    extra: Dict[str, Any] = {}
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    if stage.startswith("normalize_"):
+        sys.path.insert(0, str(SCRIPTS_DIR))
+        import normalize_state_data as nsd
+
+        state = stage[len("normalize_"):]
+        plugin = nsd.REGISTRY[state]
+        path = ensure_state_csv(state, rows, seed, data_dir)
+        setup_rss = _peak_rss_mb()
+        t0 = time.perf_counter()
+        out = nsd.write_normalized_csv(Path(os.devnull), nsd.iter_rows(plugin, path))
+        elapsed = time.perf_counter() - t0
+        n = rows
+        extra["rows_out"] = out
+        extra["input_mb"] = round(path.stat().st_size / 1e6, 1)
+
+    elif stage in ("build_index", "best_match"):
+        sys.path.insert(0, str(HOMES_DIR))
+        import match_agents_to_idfpr as m
+
+        roster = idfpr_roster(s, rows)
+        if stage == "build_index":
+            setup_rss = _peak_rss_mb()
+            t0 = time.perf_counter()
+            index = m.build_index(roster)
+            elapsed = time.perf_counter() - t0
+            n = rows
+            extra["cities"] = len(index)
+        else:
+            index = m.build_index(roster)
+            agents = homes_agents(s, roster, min(MAX_AGENTS, max(1, int(rows * AGENTS_PER_ROSTER_ROW))))
+            setup_rss = _peak_rss_mb()
+            t0 = time.perf_counter()
+            matches = [m.best_match(a["agent_name"], a["city"], index) for a in agents]
+            elapsed = time.perf_counter() - t0
+            n = len(agents)
+            extra["roster_rows"] = rows
+            extra["matched_ge_92"] = sum(1 for x in matches if x and x.score >= 92)
+
+    elif stage == "places_store_append":
+        sys.path.insert(0, str(OUTSCRAPER_DIR))
+        from places_store import PlacesStore
+
+        with tempfile.TemporaryDirectory(dir=data_dir) as tmp:
+            places = PlacesStore(os.path.join(tmp, "places.sqlite"))
+            store = places.category("bench", os.path.join(tmp, "il_bench_results.json"))
+            setup_rss = _peak_rss_mb()
+            elapsed = 0.0
+            for start in range(0, rows, STORE_BATCH):
+                batch = place_batch(s, start, min(STORE_BATCH, rows - start))
+                t0 = time.perf_counter()
+                store.append(batch)
+                elapsed += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            extra["unique"] = store.compact()
+            extra["compact_s"] = round(time.perf_counter() - t0, 3)
+            t0 = time.perf_counter()
+            places.export_master(os.path.join(tmp, "master.json"), ["bench"])
+            extra["master_s"] = round(time.perf_counter() - t0, 3)
+            places.close()
+        n = rows
+
+    elif stage == "match_broker_to_results":
+        sys.path.insert(0, str(OUTSCRAPER_DIR))
+        # Import side effects are local only: an idle client, the scheduler model read.
+        from targeted_search_all import match_broker_to_results
+
+        setup_rss = _peak_rss_mb()
+        elapsed = 0.0
+        hits = 0
+        for start in range(0, rows, CHUNK):
+            pairs = [broker_with_results(s) for _ in range(min(CHUNK, rows - start))]
+            t0 = time.perf_counter()
+            for broker, results in pairs:
+                if match_broker_to_results(broker, results) is not None:
+                    hits += 1
+            elapsed += time.perf_counter() - t0
+        n = rows
+        extra["matched"] = hits
+
+    else:
+        raise ValueError(f"unknown stage {stage!r}")
+
+    return {
+        "stage": stage,
+        "size": rows,
+        "rows": n,
+        "seconds": round(elapsed, 4),
+        "rows_per_s": round(n / elapsed) if elapsed > 0 else None,
+        "setup_rss_mb": round(setup_rss, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        **extra,
+    }
+
+
+# ---- parent -------------------------------------------------------------------
+
+
+def git_commit() -> Tuple[str, bool]:
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"],
+                cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        )
+        return sha, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def spawn(stage: str, rows: int, seed: int, data_dir: Path, timeout_s: Optional[float]) -> Dict[str, Any]:
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--child", stage, "--sizes", str(rows),
+           "--seed", str(seed), "--data-dir", str(data_dir)]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout_s)
+    except subprocess.TimeoutExpired:
+        return {"stage": stage, "size": rows, "error": f"timed out after {timeout_s:.0f}s"}
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines() or [f"exit {proc.returncode}"]
+        err = lines[-1]
+        key = "skipped" if "ModuleNotFoundError" in err else "error"
+        return {"stage": stage, "size": rows, key: err}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def fmt_row(r: Dict[str, Any], base: Optional[Dict[str, Any]] = None) -> str:
+    head = f"  {r['stage']:<26} {r['size']:>9,}"
+    if "rows_per_s" not in r:
+        return f"{head}  {r.get('skipped') or r.get('error')}"
+    line = (
+        f"{head}  {r['rows']:>9,} rows  {r['seconds']:>8.2f}s  {r['rows_per_s'] or 0:>10,} rows/s"
+        f"  peak {r['peak_rss_mb']:>7.1f} MB"
+    )
+    if base and base.get("rows_per_s") and r.get("rows_per_s"):
+        speed = r["rows_per_s"] / base["rows_per_s"] - 1
+        mem = r["peak_rss_mb"] - base["peak_rss_mb"]
+        line += f"  | vs base {speed * 100:+.0f}% rows/s, {mem:+.1f} MB"
+    return line
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Time pipeline stages on synthetic rosters (offline).")
+    ap.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Roster rows per run")
+    ap.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, metavar="STAGE",
+                    help=f"Stages to run (default: all of {', '.join(STAGES)})")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--data-dir", type=Path, default=BENCH_DIR / "data", help="Generated inputs (kept)")
+    ap.add_argument("--out", type=Path, help="Results JSON (default: .bench/results/pipeline-<commit>.json)")
+    ap.add_argument("--compare", type=Path, help="Earlier results JSON to show deltas against")
+    ap.add_argument("--repeat", type=int, default=1, help="Runs per stage and size; the fastest is kept")
+    ap.add_argument("--timeout", type=float, default=None, help="Per-stage timeout in seconds")
+    ap.add_argument("--child", choices=STAGES, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(run_stage(args.child, args.sizes[0], args.seed, args.data_dir)))
+        return 0
+
+    sha, dirty = git_commit()
+    base: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    if args.compare:
+        prev = json.loads(args.compare.read_text(encoding="utf-8"))
+        base = {(r["stage"], r["size"]): r for r in prev.get("results", [])}
+        print(f"Comparing against {args.compare} (commit {prev.get('commit')})")
+
+    print(f"Commit {sha}{' (dirty)' if dirty else ''} | Python {platform.python_version()} | {os.cpu_count()} CPU")
+    results: List[Dict[str, Any]] = []
+    for size in args.sizes:
+        for state in NORMALIZE_STATES:
+            if f"normalize_{state}" in args.stages:
+                ensure_state_csv(state, size, args.seed, args.data_dir)
+        for stage in args.stages:
+            runs = [spawn(stage, size, args.seed, args.data_dir, args.timeout) for _ in range(max(1, args.repeat))]
+            timed = [x for x in runs if "seconds" in x]
+            r = min(timed, key=lambda x: x["seconds"]) if timed else runs[0]
+            results.append(r)
+            print(fmt_row(r, base.get((stage, size))), flush=True)
+
+    out = args.out or BENCH_DIR / "results" / f"pipeline-{sha}{'-dirty' if dirty else ''}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "commit": sha,
+        "dirty": dirty,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "results": results,
+    }
+    out.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    print(f"Saved {out}")
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
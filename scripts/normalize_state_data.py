@@ -4,26 +4,59 @@
 Outputs CSVs with header:
 name,license_number,type,company,city,state,zip,county,licensed_since,expires,disciplined
 
-State inputs:
+Each state is a StatePlugin in REGISTRY (bottom of this file) declaring its
+input layout, row filters and field mappings:
 - Texas (TREC): data/texas/trec_active_brokers.csv
 - California (DRE): data/california/dre_active_individuals.csv
 - Florida (DBPR): data/florida/dbpr_active_licensees.csv (no header)
 - New York (DOS): data/new_york/dos_all_active.csv
 
+A plugin is compiled once per input header into a row transformer with the
+column indices resolved up front (`compile_plugin`). Adding a state is one
+`register(StatePlugin(...))`; it is only compiled when its job runs.
+
 Run:
   python3 scripts/normalize_state_data.py
+  python3 scripts/normalize_state_data.py --state florida --state texas
+  python3 scripts/normalize_state_data.py --list
+
+Parallel (all states at once, large inputs split into byte-range shards):
+  python3 scripts/normalize_state_data.py --workers 0 --shard-mb 32
+
+Change-data-capture (after each state's output, write only the rows inserted,
+updated or expired since the previous run; see roster_diff.py):
+  python3 scripts/normalize_state_data.py --changes
+
+Other output formats (gzip / zstd CSV, Parquet, Arrow IPC) and files rolled
+over every N rows; see roster_formats.py:
+  python3 scripts/normalize_state_data.py --format csv.gz --chunk-rows 250000
+  python3 scripts/normalize_state_data.py --format parquet
+
+Shard boundaries are snapped to the next record boundary: the next newline
+outside a quoted field, so a value with an embedded line break stays whole.
+
+Field helpers vs the original regex/strptime versions (timing + identical rows):
+  python3 scripts/bench_normalizers.py
 """
 
 from __future__ import annotations
 
+import argparse
 import csv
+import io
 import os
 import re
-from dataclasses import dataclass
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
+import roster_formats
 
 OUT_HEADERS = [
     "name",
@@ -41,9 +74,25 @@ OUT_HEADERS = [
 
 REALTOR_TYPE = "LICENSED REAL ESTATE BROKER"
 
+# (start, end) byte offsets into an input file; end is exclusive.
+ByteRange = Tuple[int, int]
+
+
+# Per-row field normalizers. They run for ~10 fields on every row of
+# million-row inputs, so they avoid regex passes and datetime round-trips on
+# the common paths; anything unusual falls back to the strptime versions
+# (`_strptime_date`), which define the expected output.
+
+_NON_LETTERS = re.compile(r"[^A-Za-z]+")
+
+_MONTHS = {m: i for i, m in enumerate(
+    ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"), 1
+)}
+
 
 def norm_space(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "").strip())
+    # Same as re.sub(r"\s+", " ", s.strip()): str.split() and \s agree on whitespace.
+    return " ".join(s.split()) if s else ""
 
 
 def safe_title(name: str) -> str:
@@ -52,45 +101,84 @@ def safe_title(name: str) -> str:
     if not s:
         return ""
     # If it's all-caps (common in exports), title-case it.
-    letters = re.sub(r"[^A-Za-z]+", "", s)
-    if letters and letters.upper() == letters:
-        return s.title()
+    if s.isascii():
+        # Has an uppercase letter and no lowercase one.
+        all_caps = s.upper() == s and s.lower() != s
+    else:
+        letters = _NON_LETTERS.sub("", s)
+        all_caps = bool(letters) and letters.upper() == letters
+    return s.title() if all_caps else s
+
+
+# Company / city / county values repeat heavily across rows; names don't.
+title_cached = lru_cache(maxsize=1 << 16)(safe_title)
+
+
+def _strptime_date(s: str, fmts: Tuple[str, ...]) -> str:
+    for fmt in fmts:
+        try:
+            return datetime.strptime(s, fmt).strftime("%Y-%m-%d")
+        except Exception:
+            pass
     return s
 
 
+def _ymd(y: str, m: str, d: str) -> Optional[str]:
+    """Zero-padded YYYY-MM-DD when the parts are plainly valid, else None.
+
+    Days past 28, years before 1000 and anything non-ASCII go to strptime.
+    """
+    if not (y.isascii() and y.isdigit() and len(y) == 4 and y[0] != "0"):
+        return None
+    if not (m.isascii() and m.isdigit() and 1 <= len(m) <= 2 and d.isascii() and d.isdigit() and 1 <= len(d) <= 2):
+        return None
+    mi, di = int(m), int(d)
+    if not (1 <= mi <= 12 and 1 <= di <= 28):
+        return None
+    return f"{y}-{mi:02d}-{di:02d}"
+
+
+@lru_cache(maxsize=1 << 16)
 def fmt_date_yyyymmdd(s: str) -> str:
     s = norm_space(s)
     if not s:
         return ""
-    try:
-        dt = datetime.strptime(s, "%Y%m%d")
-        return dt.strftime("%Y-%m-%d")
-    except Exception:
-        return s
+    if len(s) == 8:
+        out = _ymd(s[:4], s[4:6], s[6:])
+        if out:
+            return out
+    return _strptime_date(s, ("%Y%m%d",))
 
 
+@lru_cache(maxsize=1 << 16)
 def fmt_date_mdy(s: str) -> str:
     s = norm_space(s)
     if not s:
         return ""
-    for fmt in ("%m/%d/%Y", "%m/%d/%y"):
-        try:
-            dt = datetime.strptime(s, fmt)
-            return dt.strftime("%Y-%m-%d")
-        except Exception:
-            pass
-    return s
+    parts = s.split("/")
+    if len(parts) == 3:
+        out = _ymd(parts[2], parts[0], parts[1])
+        if out:
+            return out
+    return _strptime_date(s, ("%m/%d/%Y", "%m/%d/%y"))
 
 
+@lru_cache(maxsize=1 << 16)
 def fmt_date_dd_mmm_yy(s: str) -> str:
     s = norm_space(s)
     if not s:
         return ""
-    try:
-        dt = datetime.strptime(s, "%d-%b-%y")
-        return dt.strftime("%Y-%m-%d")
-    except Exception:
-        return s
+    parts = s.split("-")
+    if len(parts) == 3:
+        d, mon, yy = parts
+        mi = _MONTHS.get(mon.upper())
+        if mi and len(yy) == 2 and yy.isascii() and yy.isdigit():
+            # %y pivot: 69-99 -> 19xx, 00-68 -> 20xx
+            y = ("19" if yy >= "69" else "20") + yy
+            out = _ymd(y, str(mi), d)
+            if out:
+                return out
+    return _strptime_date(s, ("%d-%b-%y",))
 
 
 def parse_last_comma_first(name: str) -> str:
@@ -126,93 +214,403 @@ class NormalizeResult:
     input_path: Path
     output_path: Path
     rows_out: int
+    # Files actually written: output_path itself for plain CSV, else the
+    # --format file or its --chunk-rows chunks (see roster_formats.py).
+    output_paths: List[Path] = field(default_factory=list)
+    bad_values: int = 0
 
 
-def write_normalized_csv(output_path: Path, rows: Iterable[Dict[str, str]]) -> int:
+def write_normalized_csv(output_path: Path, rows: Iterable[Sequence[str]], header: bool = True) -> int:
+    """Write rows that are already in OUT_HEADERS order (as iter_rows() yields them)."""
     output_path.parent.mkdir(parents=True, exist_ok=True)
     count = 0
     with output_path.open("w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=OUT_HEADERS, extrasaction="ignore")
-        w.writeheader()
+        w = csv.writer(f)
+        if header:
+            w.writerow(OUT_HEADERS)
         for row in rows:
-            # Ensure all keys exist
-            out_row = {k: (row.get(k) or "") for k in OUT_HEADERS}
-            w.writerow(out_row)
+            w.writerow(row)
             count += 1
     return count
 
 
-def normalize_texas(input_path: Path) -> Iterator[Dict[str, str]]:
-    with input_path.open(newline="", encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            status = (row.get("Status") or "").strip()
-            if status not in ("Active", "Probation - Active"):
-                continue
+class _BoundedReader(io.RawIOBase):
+    """Raw reader over [start, end) of a binary file."""
 
-            lic_type = (row.get("License Type") or "").strip()
-            if lic_type not in ("Sales Agent", "Broker"):
-                continue
+    def __init__(self, f: io.BufferedReader, start: int, end: int) -> None:
+        f.seek(start)
+        self._f = f
+        self._remaining = end - start
 
-            license_number = norm_space(row.get("License Number") or "")
-            if not license_number:
-                continue
+    def readable(self) -> bool:
+        return True
 
-            yield {
-                "name": safe_title(row.get("Full Name") or ""),
-                "license_number": license_number,
-                "type": REALTOR_TYPE,
-                "company": safe_title(row.get("Related License Full Name") or ""),
-                "city": "",
-                "state": "TX",
-                "zip": "",
-                "county": "",
-                "licensed_since": fmt_date_mdy(row.get("Original License Date") or ""),
-                "expires": fmt_date_mdy(row.get("License Expiration Date") or ""),
-                "disciplined": "N",
-            }
-
-
-def normalize_california(input_path: Path) -> Iterator[Dict[str, str]]:
-    with input_path.open(newline="", encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            if (row.get("lic_status") or "").strip().lower() != "licensed":
-                continue
-            lic_type = (row.get("lic_type") or "").strip()
-            if lic_type not in ("Salesperson", "Broker"):
-                continue
+    def readinto(self, b) -> int:  # type: ignore[override]
+        if self._remaining <= 0:
+            return 0
+        view = memoryview(b)[: self._remaining]
+        n = self._f.readinto(view) or 0
+        self._remaining -= n
+        return n
+
+    def close(self) -> None:
+        # RawIOBase.close() leaves the wrapped file open.
+        if not self.closed:
+            self._f.close()
+        super().close()
+
+
+def _open_text(input_path: Path, byte_range: Optional[ByteRange]) -> io.TextIOBase:
+    """Open the whole file, or one shard of it, with the same newline handling."""
+    if byte_range is None:
+        return input_path.open(newline="", encoding="utf-8")
+    raw = _BoundedReader(input_path.open("rb"), *byte_range)
+    return io.TextIOWrapper(io.BufferedReader(raw), encoding="utf-8", newline="")
 
-            license_number = norm_space(row.get("lic_number") or "")
-            if not license_number:
-                continue
 
-            first = row.get("firstname_secondary") or ""
-            last = row.get("lastname_primary") or ""
-            name = safe_title(norm_space(f"{first} {last}"))
-
-            rel_first = row.get("related_firstname_secondary") or ""
-            rel_last = row.get("related_lastname_primary") or ""
-            company = safe_title(norm_space(f"{rel_first} {rel_last}"))
-
-            yield {
-                "name": name,
-                "license_number": license_number,
-                "type": REALTOR_TYPE,
-                "company": company,
-                "city": safe_title(row.get("city") or ""),
-                "state": norm_space(row.get("state") or "CA") or "CA",
-                "zip": norm_space(row.get("zip_code") or ""),
-                "county": safe_title(row.get("county_name") or ""),
-                "licensed_since": fmt_date_yyyymmdd(row.get("original_date_of_license") or ""),
-                "expires": fmt_date_yyyymmdd(row.get("lic_expiration_date") or ""),
-                "disciplined": "N",
-            }
-
-
-def normalize_florida(input_path: Path) -> Iterator[Dict[str, str]]:
-    # No header row.
-    cols = [
+def read_header(input_path: Path) -> List[str]:
+    with input_path.open(newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), [])
+
+
+def iter_dict_rows(input_path: Path, byte_range: Optional[ByteRange] = None) -> Iterator[Dict[str, str]]:
+    """csv.DictReader over the file, or over a shard using the file's header row."""
+    fieldnames = None if byte_range is None else read_header(input_path)
+    with _open_text(input_path, byte_range) as f:
+        yield from csv.DictReader(f, fieldnames=fieldnames)
+
+
+def iter_list_rows(input_path: Path, byte_range: Optional[ByteRange] = None) -> Iterator[List[str]]:
+    with _open_text(input_path, byte_range) as f:
+        yield from csv.reader(f)
+
+
+def _read_record(f: io.BufferedReader, open_quote: bool) -> bool:
+    """Read to the end of the current CSV record. Returns whether a quote is still open.
+
+    A line break inside a quoted field is not the end of a record: with
+    doubled-quote escaping, a record ends at a newline once it has an even
+    number of `"` bytes (a quote byte never occurs inside a UTF-8 sequence).
+    """
+    while True:
+        line = f.readline()
+        if not line:
+            return open_quote
+        open_quote ^= line.count(b'"') % 2 == 1
+        if not open_quote:
+            return False
+
+
+def plan_shards(input_path: Path, shard_bytes: int, has_header: bool = True) -> List[ByteRange]:
+    """Split a file into ~shard_bytes ranges that start and end on record boundaries.
+
+    The header record (if any) is excluded; shards are read with `read_header`.
+    The file is read once to count quotes, so a quoted field spanning lines
+    never straddles two shards.
+    """
+    size = input_path.stat().st_size
+    with input_path.open("rb") as f:
+        open_quote = _read_record(f, False) if has_header else False
+        bounds = [f.tell()]
+        target = bounds[0] + shard_bytes
+        while target < size:
+            while f.tell() < target:
+                chunk = f.read(min(1 << 20, target - f.tell()))
+                if not chunk:
+                    break
+                open_quote ^= chunk.count(b'"') % 2 == 1
+            # Finish the line (and any quoted field) we stopped in.
+            line = f.readline()
+            open_quote ^= line.count(b'"') % 2 == 1
+            if open_quote:
+                open_quote = _read_record(f, True)
+            pos = f.tell()
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+            target = pos + shard_bytes
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+# ---- state plugins ----------------------------------------------------------
+#
+# Each state is declared as a StatePlugin: where its export lives, its layout
+# (a header row, or fixed `columns` for a headerless file), the filters a row
+# must pass, and how each output column is built. compile_plugin() turns a
+# plugin plus the input's header into one function over csv.reader rows, with
+# column names resolved to list indices and helpers looked up front, so a row
+# costs a few index lookups and helper calls instead of building a dict and
+# doing a `.get` per field.
+
+
+@dataclass(frozen=True)
+class Col:
+    """An input column, passed through the field helper named `helper` (if any).
+
+    An empty result becomes `default`; with `required` the row is dropped instead.
+    """
+
+    column: str
+    helper: Optional[str] = None
+    default: str = ""
+    required: bool = False
+
+
+@dataclass(frozen=True)
+class Join:
+    """Input columns joined with a space and whitespace-collapsed, then `helper`."""
+
+    columns: Tuple[str, ...]
+    helper: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class OneOf:
+    """Keep rows whose stripped value (lower/upper-cased if `case` says so) is in `values`."""
+
+    column: str
+    values: Tuple[str, ...]
+    case: str = ""
+
+
+@dataclass(frozen=True)
+class Lacks:
+    """Keep rows whose stripped value (cased as `case`) does not contain `text`."""
+
+    column: str
+    text: str
+    case: str = ""
+
+
+Field = Union[str, Col, Join]  # a str is a constant
+Filter = Union[OneOf, Lacks]
+
+# Field helpers a plugin may name; they are looked up when a plugin is compiled.
+FIELD_HELPERS = (
+    "norm_space",
+    "safe_title",
+    "title_cached",
+    "fmt_date_yyyymmdd",
+    "fmt_date_mdy",
+    "fmt_date_dd_mmm_yy",
+    "parse_last_comma_first",
+    "parse_last_first_no_comma",
+)
+
+
+@dataclass(frozen=True, eq=False)
+class StatePlugin:
+    key: str
+    input: str  # relative to the repo root
+    output: str
+    fields: Dict[str, Field]  # OUT_HEADERS name -> spec; missing names are ""
+    filters: Tuple[Filter, ...] = ()
+    columns: Tuple[str, ...] = ()  # headerless layout; empty = the first line is the header
+
+    @property
+    def has_header(self) -> bool:
+        return not self.columns
+
+
+REGISTRY: Dict[str, StatePlugin] = {}
+
+
+def register(plugin: StatePlugin) -> StatePlugin:
+    unknown = set(plugin.fields) - set(OUT_HEADERS)
+    if unknown:
+        raise ValueError(f"{plugin.key}: unknown output fields {sorted(unknown)}")
+    for spec in plugin.fields.values():
+        helper = getattr(spec, "helper", None)
+        if helper is not None and helper not in FIELD_HELPERS:
+            raise ValueError(f"{plugin.key}: unknown field helper {helper!r}")
+    for f in plugin.filters:
+        if f.case not in ("", "lower", "upper"):
+            raise ValueError(f"{plugin.key}: bad case {f.case!r} on {f.column!r}")
+    REGISTRY[plugin.key] = plugin
+    return plugin
+
+
+def plugin_columns(plugin: StatePlugin) -> List[str]:
+    """Every input column the plugin reads."""
+    cols: List[str] = [f.column for f in plugin.filters]
+    for spec in plugin.fields.values():
+        if isinstance(spec, Col):
+            cols.append(spec.column)
+        elif isinstance(spec, Join):
+            cols.extend(spec.columns)
+    return list(dict.fromkeys(cols))
+
+
+RowTransform = Callable[[Iterable[List[str]]], Iterator[Tuple[str, ...]]]
+Value = Union[str, Callable[[List[str]], str]]
+
+
+@lru_cache(maxsize=None)
+def compile_plugin(plugin: StatePlugin, header: Tuple[str, ...]) -> RowTransform:
+    """Build the row transformer for one plugin and one input header.
+
+    Each filter and field becomes one closure over its column indices (or a
+    constant). Columns missing from the header read as "" (as
+    `row.get(...) or ""` did); fields that only use missing columns are
+    computed once here.
+    """
+    index = {name: i for i, name in enumerate(header)}  # duplicates: the last one wins, as in DictReader
+    width = max((index[c] + 1 for c in plugin_columns(plugin) if c in index), default=0)
+
+    def helper(name: Optional[str]) -> Optional[Callable[[str], str]]:
+        return globals()[name] if name else None
+
+    def keeper(f: Filter) -> Optional[Callable[[List[str]], bool]]:
+        """None if every row passes; a constant column is decided here."""
+        i = index.get(f.column)
+        fold = getattr(str, f.case) if f.case else None
+        if isinstance(f, OneOf):
+            keep = frozenset(f.values)
+            if i is None:
+                return None if (fold("") if fold else "") in keep else (lambda row: False)
+            if fold:
+                return lambda row: fold(row[i].strip()) in keep
+            return lambda row: row[i].strip() in keep
+        text = f.text
+        if i is None:
+            return None if text not in "" else (lambda row: False)
+        if fold:
+            return lambda row: text not in fold(row[i].strip())
+        return lambda row: text not in row[i].strip()
+
+    def column_field(spec: Col, default: str) -> Value:
+        i = index.get(spec.column)
+        fn = helper(spec.helper)
+        if i is None:
+            return (fn("") if fn else "") or default
+        if fn and default:
+            return lambda row: fn(row[i]) or default
+        if fn:
+            return lambda row: fn(row[i])
+        if default:
+            return lambda row: row[i] or default
+        return itemgetter(i)
+
+    def join_field(spec: Join) -> Value:
+        # norm_space() collapses the separators of missing (empty) columns anyway.
+        present = [index[c] for c in spec.columns if c in index]
+        fn = helper(spec.helper)
+        if not present:
+            return fn("") if fn else ""
+        if len(present) == 1:
+            i = present[0]
+            text: Callable[[List[str]], str] = lambda row: norm_space(row[i])
+        else:
+            pick = itemgetter(*present)
+            text = lambda row: norm_space(" ".join(pick(row)))
+        return (lambda row: fn(text(row))) if fn else text
+
+    keeps = [k for k in map(keeper, plugin.filters) if k is not None]
+    template = [""] * len(OUT_HEADERS)
+    computed: List[Tuple[int, Callable[[List[str]], str]]] = []
+    required: List[int] = []
+    for pos, name in enumerate(OUT_HEADERS):
+        spec = plugin.fields.get(name, "")
+        if isinstance(spec, str):
+            value: Value = spec
+        elif isinstance(spec, Join):
+            value = join_field(spec)
+        else:
+            # A required value that is kept is non-empty, so its default never applies.
+            value = column_field(spec, "" if spec.required else spec.default)
+            if spec.required:
+                if not value:
+                    keeps.append(lambda row: False)
+                elif not isinstance(value, str):
+                    required.append(pos)
+        if isinstance(value, str):
+            template[pos] = value
+        else:
+            computed.append((pos, value))
+
+    def transform(rows: Iterable[List[str]]) -> Iterator[Tuple[str, ...]]:
+        for row in rows:
+            if not row:
+                continue
+            if len(row) < width:
+                row = row + [""] * (width - len(row))
+            for keep in keeps:
+                if not keep(row):
+                    break
+            else:
+                out = template.copy()
+                for pos, get in computed:
+                    out[pos] = get(row)
+                for pos in required:
+                    if not out[pos]:
+                        break
+                else:
+                    yield tuple(out)
+
+    return transform
+
+
+def iter_rows(plugin: StatePlugin, input_path: Path, byte_range: Optional[ByteRange] = None) -> Iterator[Tuple[str, ...]]:
+    """Normalized rows (in OUT_HEADERS order) from the file, or from one shard of it."""
+    header = plugin.columns or tuple(read_header(input_path))
+    transform = compile_plugin(plugin, header)
+    with _open_text(input_path, byte_range) as f:
+        rows = csv.reader(f)
+        if plugin.has_header and byte_range is None:
+            next(rows, None)
+        yield from transform(rows)
+
+
+register(StatePlugin(
+    key="texas",
+    input="data/texas/trec_active_brokers.csv",
+    output="data/texas/normalized_brokers.csv",
+    filters=(
+        OneOf("Status", ("Active", "Probation - Active")),
+        OneOf("License Type", ("Sales Agent", "Broker")),
+    ),
+    fields={
+        "name": Col("Full Name", "safe_title"),
+        "license_number": Col("License Number", "norm_space", required=True),
+        "type": REALTOR_TYPE,
+        "company": Col("Related License Full Name", "title_cached"),
+        "state": "TX",
+        "licensed_since": Col("Original License Date", "fmt_date_mdy"),
+        "expires": Col("License Expiration Date", "fmt_date_mdy"),
+        "disciplined": "N",
+    },
+))
+
+register(StatePlugin(
+    key="california",
+    input="data/california/dre_active_individuals.csv",
+    output="data/california/normalized_brokers.csv",
+    filters=(
+        OneOf("lic_status", ("licensed",), case="lower"),
+        OneOf("lic_type", ("Salesperson", "Broker")),
+    ),
+    fields={
+        "name": Join(("firstname_secondary", "lastname_primary"), "safe_title"),
+        "license_number": Col("lic_number", "norm_space", required=True),
+        "type": REALTOR_TYPE,
+        "company": Join(("related_firstname_secondary", "related_lastname_primary"), "title_cached"),
+        "city": Col("city", "title_cached"),
+        "state": Col("state", "norm_space", default="CA"),
+        "zip": Col("zip_code", "norm_space"),
+        "county": Col("county_name", "title_cached"),
+        "licensed_since": Col("original_date_of_license", "fmt_date_yyyymmdd"),
+        "expires": Col("lic_expiration_date", "fmt_date_yyyymmdd"),
+        "disciplined": "N",
+    },
+))
+
+register(StatePlugin(
+    key="florida",
+    input="data/florida/dbpr_active_licensees.csv",
+    output="data/florida/normalized_brokers.csv",
+    columns=(
         "License Code",
         "Licensee Name",
         "DBA Name",
@@ -234,116 +632,223 @@ def normalize_florida(input_path: Path) -> Iterator[Dict[str, str]]:
         "Self Proprietor's Name",
         "Employer's Name",
         "Employer's License Number",
-    ]
-
-    realtor_ranks = {"BK Broker", "SL Sales Associate", "BL Broker Sales"}
-
-    with input_path.open(newline="", encoding="utf-8") as f:
-        r = csv.reader(f)
-        for row in r:
-            if not row:
-                continue
-            if len(row) < len(cols):
-                # pad
-                row = row + [""] * (len(cols) - len(row))
-            d = {cols[i]: row[i] for i in range(len(cols))}
-
-            if (d.get("Primary Status") or "").strip().lower() != "current":
-                continue
-            if (d.get("Secondary Status") or "").strip().lower() != "active":
-                continue
-
-            rank = (d.get("Rank") or "").strip()
-            if rank not in realtor_ranks:
-                continue
-
-            license_number = norm_space(d.get("License Number") or "")
-            if not license_number:
-                continue
-
-            yield {
-                "name": parse_last_comma_first(d.get("Licensee Name") or ""),
-                "license_number": license_number,
-                "type": REALTOR_TYPE,
-                "company": safe_title(d.get("Employer's Name") or ""),
-                "city": safe_title(d.get("City") or ""),
-                "state": norm_space(d.get("State") or "FL") or "FL",
-                "zip": norm_space(d.get("Zip") or ""),
-                "county": safe_title(d.get("County Name") or ""),
-                "licensed_since": fmt_date_dd_mmm_yy(d.get("Original License Date") or ""),
-                "expires": fmt_date_dd_mmm_yy(d.get("License Expiration Date") or ""),
-                "disciplined": "N",
-            }
-
-
-def normalize_new_york(input_path: Path) -> Iterator[Dict[str, str]]:
-    with input_path.open(newline="", encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            lic_type = (row.get("License Type") or "").strip().upper()
-            if "OFFICE" in lic_type:
-                continue
-            # Keep to individual broker/salesperson-ish types. If unknown but not office, still include.
-
-            license_number = norm_space(row.get("License Number") or "")
-            if not license_number:
-                continue
-
-            yield {
-                "name": parse_last_first_no_comma(row.get("License Holder Name") or ""),
-                "license_number": license_number,
-                "type": REALTOR_TYPE,
-                "company": safe_title(row.get("Business Name") or ""),
-                "city": safe_title(row.get("Business City") or ""),
-                "state": norm_space(row.get("Business State") or "NY") or "NY",
-                "zip": norm_space(row.get("Business Zip") or ""),
-                "county": safe_title(row.get("County") or ""),
-                "licensed_since": "",
-                "expires": fmt_date_mdy(row.get("License Expiration Date") or ""),
-                "disciplined": "N",
-            }
+    ),
+    filters=(
+        OneOf("Primary Status", ("current",), case="lower"),
+        OneOf("Secondary Status", ("active",), case="lower"),
+        OneOf("Rank", ("BK Broker", "SL Sales Associate", "BL Broker Sales")),
+    ),
+    fields={
+        "name": Col("Licensee Name", "parse_last_comma_first"),
+        "license_number": Col("License Number", "norm_space", required=True),
+        "type": REALTOR_TYPE,
+        "company": Col("Employer's Name", "title_cached"),
+        "city": Col("City", "title_cached"),
+        "state": Col("State", "norm_space", default="FL"),
+        "zip": Col("Zip", "norm_space"),
+        "county": Col("County Name", "title_cached"),
+        "licensed_since": Col("Original License Date", "fmt_date_dd_mmm_yy"),
+        "expires": Col("License Expiration Date", "fmt_date_dd_mmm_yy"),
+        "disciplined": "N",
+    },
+))
+
+register(StatePlugin(
+    key="new_york",
+    input="data/new_york/dos_all_active.csv",
+    output="data/new_york/normalized_brokers.csv",
+    # Individual broker/salesperson-ish types; anything but an office is kept.
+    filters=(Lacks("License Type", "OFFICE", case="upper"),),
+    fields={
+        "name": Col("License Holder Name", "parse_last_first_no_comma"),
+        "license_number": Col("License Number", "norm_space", required=True),
+        "type": REALTOR_TYPE,
+        "company": Col("Business Name", "title_cached"),
+        "city": Col("Business City", "title_cached"),
+        "state": Col("Business State", "norm_space", default="NY"),
+        "zip": Col("Business Zip", "norm_space"),
+        "county": Col("County", "title_cached"),
+        "expires": Col("License Expiration Date", "fmt_date_mdy"),
+        "disciplined": "N",
+    },
+))
+
+
+Job = Tuple[StatePlugin, Path, Path]
+
+
+def build_jobs(repo_root: Path, states: Optional[Sequence[str]] = None) -> List[Job]:
+    plugins = [REGISTRY[k] for k in states] if states else list(REGISTRY.values())
+    return [(p, repo_root / p.input, repo_root / p.output) for p in plugins]
+
+
+def _plain(fmt: str, chunk_rows: int) -> bool:
+    return fmt == "csv" and not chunk_rows
+
+
+def run_serial(jobs: List[Job], fmt: str = "csv", chunk_rows: int = 0) -> List[NormalizeResult]:
+    results: List[NormalizeResult] = []
+    for plugin, in_path, out_path in jobs:
+        if _plain(fmt, chunk_rows):
+            rows_out = write_normalized_csv(out_path, iter_rows(plugin, in_path))
+            results.append(NormalizeResult(plugin.key, in_path, out_path, rows_out, [out_path]))
+            continue
+        rows_out, paths, bad_values = roster_formats.write_rows(
+            out_path, iter_rows(plugin, in_path), fmt, chunk_rows, OUT_HEADERS
+        )
+        results.append(NormalizeResult(plugin.key, in_path, out_path, rows_out, paths, bad_values))
+    return results
+
+
+def _normalize_shard(
+    state_key: str,
+    in_path: Path,
+    byte_range: ByteRange,
+    part_path: Path,
+    header: bool,
+) -> int:
+    # Workers get the key, not the plugin: each compiles it once per process.
+    return write_normalized_csv(part_path, iter_rows(REGISTRY[state_key], in_path, byte_range), header=header)
+
+
+def _part_rows(futures: List[Tuple[Path, Any]]) -> Iterator[List[str]]:
+    for part_path, fut in futures:
+        fut.result()
+        with part_path.open(newline="", encoding="utf-8") as f:
+            yield from csv.reader(f)
+
+
+def run_parallel(
+    jobs: List[Job], workers: int, shard_bytes: int, fmt: str = "csv", chunk_rows: int = 0
+) -> List[NormalizeResult]:
+    """Normalize every state at once; each input is split into byte-range shards.
+
+    Each shard is written to its own part file and the parts are concatenated in
+    order, so the merged CSV is byte-for-byte what `run_serial` produces. For
+    another format (or chunked output) the parts are headerless and their rows
+    go through roster_formats in order instead.
+    """
+    plain = _plain(fmt, chunk_rows)
+    results: List[NormalizeResult] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for plugin, in_path, out_path in jobs:
+            shards = plan_shards(in_path, shard_bytes, has_header=plugin.has_header)
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            part_dir = Path(tempfile.mkdtemp(prefix=f".{plugin.key}-parts-", dir=out_path.parent))
+            futures = []
+            for i, byte_range in enumerate(shards or [(0, 0)]):
+                part_path = part_dir / f"part-{i:05d}.csv"
+                futures.append(
+                    (part_path, pool.submit(_normalize_shard, plugin.key, in_path, byte_range, part_path, plain and i == 0))
+                )
+            pending.append((plugin.key, in_path, out_path, part_dir, futures))
+
+        for state_key, in_path, out_path, part_dir, futures in pending:
+            try:
+                if not plain:
+                    rows_out, paths, bad_values = roster_formats.write_rows(
+                        out_path, _part_rows(futures), fmt, chunk_rows, OUT_HEADERS
+                    )
+                    results.append(NormalizeResult(state_key, in_path, out_path, rows_out, paths, bad_values))
+                    continue
+                rows_out = 0
+                tmp_path = out_path.with_name(out_path.name + ".tmp")
+                with tmp_path.open("wb") as out:
+                    for part_path, fut in futures:
+                        rows_out += fut.result()
+                        with part_path.open("rb") as part:
+                            shutil.copyfileobj(part, out)
+                os.replace(tmp_path, out_path)
+            finally:
+                shutil.rmtree(part_dir, ignore_errors=True)
+            results.append(NormalizeResult(state_key, in_path, out_path, rows_out, [out_path]))
+    return results
 
 
 def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--state",
+        action="append",
+        choices=sorted(REGISTRY),
+        help="Normalize only this state (repeatable; default: every registered state).",
+    )
+    ap.add_argument("--list", action="store_true", help="List the registered states and exit.")
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes (default: 1 = serial; 0 = one per CPU).",
+    )
+    ap.add_argument(
+        "--shard-mb",
+        type=float,
+        default=32.0,
+        help="Approximate shard size in MB for parallel mode (default: 32).",
+    )
+    ap.add_argument(
+        "--format",
+        choices=list(roster_formats.FORMATS),
+        default="csv",
+        help="Output format (default: csv). csv.zst needs zstandard; parquet / arrow need pyarrow.",
+    )
+    ap.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=0,
+        help="Start a new output file every N rows (default: 0 = one file).",
+    )
+    ap.add_argument(
+        "--changes",
+        action="store_true",
+        help="Diff each output against its previous snapshot and write a changeset (roster_diff.py).",
+    )
+    args = ap.parse_args()
+
     repo_root = Path(__file__).resolve().parents[1]
+    jobs = build_jobs(repo_root, args.state)
 
-    jobs = [
-        (
-            "texas",
-            repo_root / "data" / "texas" / "trec_active_brokers.csv",
-            repo_root / "data" / "texas" / "normalized_brokers.csv",
-            normalize_texas,
-        ),
-        (
-            "california",
-            repo_root / "data" / "california" / "dre_active_individuals.csv",
-            repo_root / "data" / "california" / "normalized_brokers.csv",
-            normalize_california,
-        ),
-        (
-            "florida",
-            repo_root / "data" / "florida" / "dbpr_active_licensees.csv",
-            repo_root / "data" / "florida" / "normalized_brokers.csv",
-            normalize_florida,
-        ),
-        (
-            "new_york",
-            repo_root / "data" / "new_york" / "dos_all_active.csv",
-            repo_root / "data" / "new_york" / "normalized_brokers.csv",
-            normalize_new_york,
-        ),
-    ]
+    if args.list:
+        for plugin, in_path, out_path in jobs:
+            have = "ok" if in_path.exists() else "missing"
+            print(f"{plugin.key:<12} {plugin.input} ({have}) -> {plugin.output}")
+        return
 
-    results: List[NormalizeResult] = []
-    for state_key, in_path, out_path, fn in jobs:
+    need = roster_formats.missing_dependency(args.format)
+    if need:
+        raise SystemExit(f"--format {args.format} needs {need}")
+
+    for plugin, in_path, _ in jobs:
         if not in_path.exists():
             raise SystemExit(f"Missing input file: {in_path}")
-        rows_out = write_normalized_csv(out_path, fn(in_path))
-        results.append(NormalizeResult(state_key, in_path, out_path, rows_out))
+        if plugin.has_header:
+            missing = set(plugin_columns(plugin)) - set(read_header(in_path))
+            if missing:
+                print(f"warning: {plugin.key}: columns not in {in_path.name} (read as empty): {sorted(missing)}")
+
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    chunk_rows = max(0, args.chunk_rows)
+    if workers == 1:
+        results = run_serial(jobs, args.format, chunk_rows)
+    else:
+        results = run_parallel(jobs, workers, max(1, int(args.shard_mb * 1024 * 1024)), args.format, chunk_rows)
 
     print("Normalization complete:")
     for r in results:
-        print(f"- {r.state_key}: {r.rows_out:,} -> {r.output_path.relative_to(repo_root)}")
+        first = r.output_paths[0].relative_to(repo_root)
+        more = f" (+{len(r.output_paths) - 1} more chunks)" if len(r.output_paths) > 1 else ""
+        print(f"- {r.state_key}: {r.rows_out:,} -> {first}{more}")
+        if r.bad_values:
+            print(f"  note: {r.bad_values:,} values did not convert to date/bool; kept as text in the _raw columns")
+
+    if args.changes:
+        import roster_diff
+
+        print("Changes since the previous snapshot:")
+        for r in results:
+            diff = roster_diff.diff_roster(r.output_path, files=r.output_paths)
+            print(f"- {r.state_key}: {roster_diff.describe(diff)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""Change-data-capture for normalized state rosters.
+
+TREC and DRE publish daily, DBPR weekly, and each run of
+normalize_state_data.py rewrites the whole normalized_brokers.csv. This
+compares a fresh output with the snapshot taken the previous time, by
+license_number, and writes only what changed:
+
+  data/<state>/changes/normalized_brokers-<UTC stamp>.jsonl.gz
+    {"op": "meta", "state_file": "...", "previous": <ts or null>, "inserted": n, ...}
+    {"op": "insert", "row": {...OUT_HEADERS...}}
+    {"op": "update", "row": {...}}
+    {"op": "expire", "license_number": "..."}
+
+The roster can be in any roster_formats.py format, chunked or not; the
+snapshot and changesets are named after the plain CSV either way, so
+switching --format does not reset the history.
+
+The snapshot (`normalized_brokers.csv.fp` next to the CSV) holds no row
+data, just every license_number (sorted) with a 64-bit BLAKE2b fingerprint
+of its row:
+
+- MAGIC, a uint32 header length, a JSON header (rows, created_at, ...)
+- uint32 key offsets + one UTF-8 blob of license numbers, in sorted order
+- uint64 row fingerprints in the same order
+
+It is memory-mapped on load. The new roster is read twice: once to fingerprint
+and sort its keys for a merge join with the snapshot, and once to pull the
+inserted / updated rows. A license listed more than once keeps its last row,
+as an upsert by license_number would. The changeset is written before the
+snapshot is replaced, so a crash between the two repeats the changes rather
+than losing them. Without a previous snapshot every row is an insert.
+
+Usage
+  python3 scripts/roster_diff.py data/texas/normalized_brokers.csv [...]
+  python3 scripts/roster_diff.py data/texas/normalized_brokers.csv --files data/texas/normalized_brokers-*.parquet
+  python3 scripts/normalize_state_data.py --changes   # after each state's output
+
+Stdlib only (reading Parquet / Arrow / zstd output needs what writing it did).
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from roster_formats import read_rows
+
+MAGIC = b"RFP1\n"
+KEY_FIELD = "license_number"
+
+_U32 = "I" if array("I").itemsize == 4 else "L"
+_U64 = "Q"
+_LEN = struct.Struct("<I")
+_SEP = "\x1f"
+
+
+@dataclass
+class DiffResult:
+    csv_path: Path
+    changes_path: Optional[Path]
+    rows: int
+    inserted: int
+    updated: int
+    expired: int
+
+    @property
+    def changed(self) -> int:
+        return self.inserted + self.updated + self.expired
+
+
+def snapshot_path_for(csv_path: Path) -> Path:
+    return csv_path.with_name(csv_path.name + ".fp")
+
+
+def changes_dir_for(csv_path: Path) -> Path:
+    return csv_path.parent / "changes"
+
+
+def fingerprint(row: Sequence[str]) -> int:
+    digest = hashlib.blake2b(_SEP.join(row).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _pad8(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+def _read(files: Sequence[Path]) -> Tuple[List[str], Iterator[Sequence[str]]]:
+    """Header and rows of a roster, which may be split into chunk files."""
+    header, first = read_rows(files[0])
+
+    def rows() -> Iterator[Sequence[str]]:
+        yield from first
+        for path in files[1:]:
+            h, more = read_rows(path)
+            if h != header:
+                raise ValueError(f"{path}: header differs from {files[0].name}")
+            yield from more
+
+    return header, rows()
+
+
+class Snapshot:
+    """Sorted license_number -> fingerprint pairs, memory-mapped."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with path.open("rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: not a roster snapshot")
+        (hlen,) = _LEN.unpack_from(self._mm, len(MAGIC))
+        start = len(MAGIC) + _LEN.size
+        self.meta: Dict[str, Any] = json.loads(bytes(self._mm[start : start + hlen]))
+        if self.meta.get("byteorder", sys.byteorder) != sys.byteorder:
+            self._mm.close()
+            raise ValueError(f"{path}: written on a {self.meta['byteorder']}-endian machine")
+        view = memoryview(self._mm)[start + hlen :]
+        n = self.meta["rows"]
+        o = self.meta["offsets_off"]
+        b = self.meta["blob_off"]
+        self._offsets = view[o : o + 4 * (n + 1)].cast(_U32)
+        self._blob = view[b : b + self.meta["blob_len"]]
+        f_off = self.meta["fps_off"]
+        self.fps = view[f_off : f_off + 8 * n].cast(_U64)
+        self.rows: int = n
+
+    def key(self, i: int) -> str:
+        return str(self._blob[self._offsets[i] : self._offsets[i + 1]], "utf-8")
+
+    def close(self) -> None:
+        # Views must go before the mmap they point into.
+        del self._offsets, self._blob, self.fps
+        self._mm.close()
+
+
+def write_snapshot(path: Path, keys: Sequence[str], fps: Sequence[int], meta: Dict[str, Any]) -> None:
+    """Write sorted keys and their fingerprints (atomically)."""
+    encoded = [k.encode("utf-8") for k in keys]
+    offsets = array(_U32, [0]) * (len(encoded) + 1)
+    pos = 0
+    for i, b in enumerate(encoded):
+        pos += len(b)
+        offsets[i + 1] = pos
+    blob = b"".join(encoded)
+    blob += b"\0" * _pad8(len(offsets) * offsets.itemsize + len(blob))
+    fp_arr = array(_U64, fps)
+
+    meta = dict(meta, rows=len(keys), offsets_off=0, blob_off=len(offsets) * offsets.itemsize, blob_len=pos)
+    meta["fps_off"] = meta["blob_off"] + len(blob)
+    header = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    header += b" " * _pad8(len(MAGIC) + _LEN.size + len(header))
+
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(MAGIC)
+        f.write(_LEN.pack(len(header)))
+        f.write(header)
+        f.write(offsets.tobytes())
+        f.write(blob)
+        f.write(fp_arr.tobytes())
+    os.replace(tmp, path)
+
+
+def diff_roster(
+    csv_path: Path,
+    snapshot_path: Optional[Path] = None,
+    changes_dir: Optional[Path] = None,
+    files: Optional[Sequence[Path]] = None,
+) -> DiffResult:
+    """Write the changeset for `csv_path` against its last snapshot, then update the snapshot.
+
+    `csv_path` names the roster (snapshot and changeset names come from it);
+    `files` are the files actually written, when that is not just csv_path
+    (another --format, or --chunk-rows chunks, in order).
+    """
+    snapshot_path = snapshot_path or snapshot_path_for(csv_path)
+    changes_dir = changes_dir or changes_dir_for(csv_path)
+    files = list(files or [csv_path])
+
+    # Pass 1: fingerprint every row.
+    header, rows = _read(files)
+    ki = header.index(KEY_FIELD)
+    keys: List[str] = []
+    fps = array(_U64)
+    for row in rows:
+        keys.append(row[ki])
+        fps.append(fingerprint(row))
+    n = len(keys)
+    order = sorted(range(n), key=keys.__getitem__)
+    # Keep the last row of a repeated license (sorted() is stable).
+    last = [i for j, i in enumerate(order) if j + 1 == n or keys[order[j + 1]] != keys[i]]
+
+    prev = Snapshot(snapshot_path) if snapshot_path.exists() else None
+    emit: Dict[int, str] = {}  # row index -> "insert" / "update"
+    expired: List[str] = []
+    p, m = 0, prev.rows if prev else 0
+    for i in last:
+        k = keys[i]
+        while p < m and prev.key(p) < k:
+            expired.append(prev.key(p))
+            p += 1
+        if p < m and prev.key(p) == k:
+            if prev.fps[p] != fps[i]:
+                emit[i] = "update"
+            p += 1
+        else:
+            emit[i] = "insert"
+    while p < m:
+        expired.append(prev.key(p))
+        p += 1
+    prev_created = prev.meta.get("created_at") if prev else None
+    if prev:
+        prev.close()
+
+    now = time.time()
+    result = DiffResult(
+        csv_path, None, n,
+        sum(1 for op in emit.values() if op == "insert"),
+        sum(1 for op in emit.values() if op == "update"),
+        len(expired),
+    )
+
+    # Pass 2: pull the changed rows, in file order.
+    if result.changed:
+        changes_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(now))
+        out = changes_dir / f"{csv_path.stem}-{stamp}.jsonl.gz"
+        seq = 1
+        while out.exists():  # two runs in the same second
+            seq += 1
+            out = changes_dir / f"{csv_path.stem}-{stamp}-{seq}.jsonl.gz"
+        tmp = out.with_name(out.name + ".tmp")
+        meta = {
+            "op": "meta",
+            "state_file": csv_path.name,
+            "previous": prev_created,
+            "created_at": now,
+            "rows": n,
+            "inserted": result.inserted,
+            "updated": result.updated,
+            "expired": result.expired,
+        }
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write(json.dumps(meta) + "\n")
+            _, rows = _read(files)
+            for i, row in enumerate(rows):
+                op = emit.get(i)
+                if op:
+                    rec = dict(zip(header, row))
+                    f.write(json.dumps({"op": op, "row": rec}, ensure_ascii=False) + "\n")
+            for k in expired:
+                f.write(json.dumps({"op": "expire", KEY_FIELD: k}, ensure_ascii=False) + "\n")
+        os.replace(tmp, out)
+        result.changes_path = out
+
+    write_snapshot(
+        snapshot_path,
+        [keys[i] for i in last],
+        [fps[i] for i in last],
+        {"source": csv_path.name, "created_at": now, "byteorder": sys.byteorder},
+    )
+    return result
+
+
+def describe(r: DiffResult) -> str:
+    where = f" -> {r.changes_path}" if r.changes_path else " (no changes)"
+    return f"{r.rows:,} rows: +{r.inserted:,} ~{r.updated:,} -{r.expired:,}{where}"
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("csv", nargs="+", type=Path, help="normalized_brokers.csv file(s)")
+    ap.add_argument(
+        "--files",
+        nargs="+",
+        type=Path,
+        help="The files holding a single roster's rows, in order, if not the CSV itself.",
+    )
+    args = ap.parse_args()
+    if args.files and len(args.csv) != 1:
+        ap.error("--files takes one roster")
+    for path in args.csv:
+        print(f"{path}: {describe(diff_roster(path, files=args.files))}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
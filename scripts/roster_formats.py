@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""Output formats for normalized rosters.
+
+normalize_state_data.py writes plain CSV by default (what license-data.ts
+and import_licensed.mjs read). With --format / --chunk-rows it can write:
+
+  csv       normalized_brokers.csv
+  csv.gz    normalized_brokers.csv.gz        gzip, level 6
+  csv.zst   normalized_brokers.csv.zst       zstd; needs Python 3.14+ or `zstandard`
+  parquet   normalized_brokers.parquet       needs pyarrow
+  arrow     normalized_brokers.arrow         Arrow IPC file (Feather v2); needs pyarrow
+
+--chunk-rows N rolls over to a new file every N rows:
+normalized_brokers-00000.csv.gz, normalized_brokers-00001.csv.gz, ... (every
+CSV chunk has the header). Chunks left over from a longer earlier run are
+removed.
+
+Parquet and Arrow are typed: licensed_since / expires are date32 and
+disciplined is a bool (Y/N); everything else stays a string, so zip codes
+and license numbers keep their leading zeros. Each typed column has a
+`<column>_raw` string column beside it, null except where the value did not
+convert (the normalizer passes dates it cannot parse through as-is); those
+are counted in `RosterWriter.bad_values`, and nothing is lost. Both formats
+are zstd-compressed and written in record batches of BATCH_ROWS.
+
+Rows come in as sequences already in header order (iter_rows() tuples);
+nothing builds a dict per row. Every file is written under a .tmp name and
+renamed into place on close.
+
+`read_rows()` reads any of these back as the same strings the CSV holds,
+for roster_diff.py.
+
+Only stdlib is used, plus the optional modules above.
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import itertools
+import os
+import re
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+FORMATS: Dict[str, str] = {
+    "csv": ".csv",
+    "csv.gz": ".csv.gz",
+    "csv.zst": ".csv.zst",
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+}
+
+DATE_COLUMNS = ("licensed_since", "expires")
+BOOL_COLUMNS = ("disciplined",)
+RAW_SUFFIX = "_raw"
+BATCH_ROWS = 1 << 16
+GZIP_LEVEL = 6
+
+
+def _zstd() -> Any:
+    try:
+        from compression import zstd  # Python 3.14+
+
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard
+
+        return zstandard
+    except ImportError:
+        return None
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def missing_dependency(fmt: str) -> Optional[str]:
+    """What has to be installed for `fmt`, or None if it can be written here."""
+    if fmt == "csv.zst" and _zstd() is None:
+        return "zstandard (pip install zstandard) or Python 3.14+"
+    if fmt in ("parquet", "arrow") and _pyarrow() is None:
+        return "pyarrow (pip install pyarrow)"
+    return None
+
+
+def format_of(path: Path) -> str:
+    for fmt, suffix in sorted(FORMATS.items(), key=lambda kv: -len(kv[1])):
+        if path.name.endswith(suffix):
+            return fmt
+    raise ValueError(f"{path}: unknown roster format")
+
+
+def _stem(base: Path) -> str:
+    """normalized_brokers.csv -> normalized_brokers (base is the plugin's output path)."""
+    try:
+        return base.name[: -len(FORMATS[format_of(base)])]
+    except ValueError:
+        return base.stem
+
+
+def output_path(base: Path, fmt: str) -> Path:
+    """The single-file output for `fmt`."""
+    return base.with_name(_stem(base) + FORMATS[fmt])
+
+
+def chunk_path(base: Path, fmt: str, i: int) -> Path:
+    return base.with_name(f"{_stem(base)}-{i:05d}{FORMATS[fmt]}")
+
+
+def chunk_paths(base: Path, fmt: str) -> List[Path]:
+    """Existing chunks of `base` in `fmt`, in order."""
+    pattern = re.compile(re.escape(_stem(base)) + r"-\d{5}" + re.escape(FORMATS[fmt]) + "$")
+    if not base.parent.is_dir():
+        return []
+    return sorted(p for p in base.parent.iterdir() if pattern.match(p.name))
+
+
+def open_text(path: Path, mode: str = "r", fmt: Optional[str] = None) -> IO[str]:
+    """Open a .csv / .csv.gz / .csv.zst file as text ("r" or "w"), newline="" for csv.
+
+    `fmt` defaults to the one the file name says.
+    """
+    fmt = fmt or format_of(path)
+    if fmt == "csv.gz":
+        return gzip.open(path, mode + "t", compresslevel=GZIP_LEVEL, encoding="utf-8", newline="")
+    if fmt == "csv.zst":
+        zstd = _zstd()
+        if zstd is None:
+            raise RuntimeError(f"{path}: needs {missing_dependency('csv.zst')}")
+        return zstd.open(path, mode + "t", encoding="utf-8", newline="")
+    return path.open(mode, encoding="utf-8", newline="")
+
+
+@lru_cache(maxsize=1 << 16)
+def _parse_date(s: str) -> Optional[date]:
+    try:
+        d = date.fromisoformat(s)
+    except ValueError:
+        return None
+    # 3.11+ also takes "20200102" and "2020W011"; only YYYY-MM-DD round-trips.
+    return d if d.isoformat() == s else None
+
+
+_BOOLS = {"Y": True, "N": False}
+_PARSERS = {"date": _parse_date, "bool": _BOOLS.get}
+
+
+class _CsvSink:
+    def __init__(self, tmp: Path, fmt: str, header: Sequence[str]) -> None:
+        self.f = open_text(tmp, "w", fmt)
+        self.w = csv.writer(self.f)
+        if header:
+            self.w.writerow(header)
+
+    def write(self, rows: Iterable[Sequence[str]]) -> int:
+        n = 0
+        w = self.w
+        for row in rows:
+            w.writerow(row)
+            n += 1
+        return n
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class _ArrowSink:
+    def __init__(self, tmp: Path, fmt: str, header: Sequence[str]) -> None:
+        pa = _pyarrow()
+        if pa is None:
+            raise RuntimeError(f"{fmt}: needs {missing_dependency(fmt)}")
+        self.pa = pa
+        self.schema = schema(header)
+        self.kinds = [_kind(c) for c in header]
+        self.bad_values = 0
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            self.writer = pq.ParquetWriter(str(tmp), self.schema, compression="zstd")
+        else:
+            options = pa.ipc.IpcWriteOptions(compression="zstd")
+            self.writer = pa.ipc.new_file(str(tmp), self.schema, options=options)
+
+    def write(self, rows: Iterable[Sequence[str]]) -> int:
+        n = 0
+        it = iter(rows)
+        while True:
+            batch = list(itertools.islice(it, BATCH_ROWS))
+            if not batch:
+                return n
+            n += len(batch)
+            self.writer.write_batch(self._record_batch(batch))
+
+    def _record_batch(self, rows: List[Sequence[str]]) -> Any:
+        pa = self.pa
+        arrays = []
+        for col, kind in enumerate(self.kinds):
+            values = [r[col] for r in rows]
+            if kind == "str":
+                arrays.append(pa.array(values, type=pa.string()))
+                continue
+            parse = _PARSERS[kind]
+            typed = [parse(v) if v else None for v in values]
+            raw = [v if v and t is None else None for v, t in zip(values, typed)]
+            self.bad_values += len(raw) - raw.count(None)
+            arrays.append(pa.array(typed, type=self.schema.field(len(arrays)).type))
+            arrays.append(pa.array(raw, type=pa.string()))
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def _kind(column: str) -> str:
+    if column in DATE_COLUMNS:
+        return "date"
+    if column in BOOL_COLUMNS:
+        return "bool"
+    return "str"
+
+
+def schema(header: Sequence[str]) -> Any:
+    """The Arrow schema for a roster header (pyarrow required), with the `_raw` columns."""
+    pa = _pyarrow()
+    types = {"date": pa.date32(), "bool": pa.bool_()}
+    fields = []
+    for c in header:
+        kind = _kind(c)
+        if kind == "str":
+            fields.append(pa.field(c, pa.string()))
+        else:
+            fields.append(pa.field(c, types[kind]))
+            fields.append(pa.field(c + RAW_SUFFIX, pa.string()))
+    return pa.schema(fields)
+
+
+class RosterWriter:
+    """Write roster rows to `base` (the plugin's output path) in `fmt`, optionally chunked.
+
+    with RosterWriter(out_path, "csv.gz", chunk_rows=250_000, header=OUT_HEADERS) as w:
+        w.write(iter_rows(plugin, in_path))
+    w.paths  # files written, in order
+    """
+
+    def __init__(self, base: Path, fmt: str = "csv", chunk_rows: int = 0, header: Sequence[str] = ()) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown format {fmt!r} (choose from {', '.join(FORMATS)})")
+        self.base = base
+        self.fmt = fmt
+        self.chunk_rows = max(0, chunk_rows)
+        self.header = list(header)
+        self.rows = 0
+        self.bad_values = 0
+        self.paths: List[Path] = []
+        self._tmps: List[Path] = []
+
+    def __enter__(self) -> "RosterWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _open(self, path: Path) -> Any:
+        tmp = path.with_name(path.name + ".tmp")
+        self.paths.append(path)
+        self._tmps.append(tmp)
+        if self.fmt in ("parquet", "arrow"):
+            return _ArrowSink(tmp, self.fmt, self.header)
+        return _CsvSink(tmp, self.fmt, self.header)
+
+    def _finish(self, sink: Any) -> None:
+        sink.close()
+        self.bad_values += getattr(sink, "bad_values", 0)
+
+    def write(self, rows: Iterable[Sequence[str]]) -> int:
+        """Write every row from `rows`; call once. Returns the row count."""
+        self.base.parent.mkdir(parents=True, exist_ok=True)
+        if not self.chunk_rows:
+            sink = self._open(output_path(self.base, self.fmt))
+            try:
+                self.rows = sink.write(rows)
+            finally:
+                self._finish(sink)
+            return self.rows
+
+        it = iter(rows)
+        first = next(it, None)
+        i = 0
+        while first is not None or i == 0:
+            # Always at least one (possibly header-only) chunk.
+            sink = self._open(chunk_path(self.base, self.fmt, i))
+            try:
+                if first is not None:
+                    self.rows += sink.write(itertools.chain((first,), itertools.islice(it, self.chunk_rows - 1)))
+            finally:
+                self._finish(sink)
+            first = next(it, None)
+            i += 1
+        return self.rows
+
+    def close(self) -> List[Path]:
+        """Move the files into place and remove chunks from a longer earlier run."""
+        for tmp, path in zip(self._tmps, self.paths):
+            os.replace(tmp, path)
+        self._tmps = []
+        if self.chunk_rows:
+            keep = set(self.paths)
+            for stale in chunk_paths(self.base, self.fmt):
+                if stale not in keep:
+                    stale.unlink()
+        return self.paths
+
+    def abort(self) -> None:
+        for tmp in self._tmps:
+            tmp.unlink(missing_ok=True)
+        self._tmps = []
+        self.paths = []
+
+
+def write_rows(
+    base: Path, rows: Iterable[Sequence[str]], fmt: str = "csv", chunk_rows: int = 0, header: Sequence[str] = ()
+) -> Tuple[int, List[Path], int]:
+    """RosterWriter in one call: (rows written, paths, unparsable dates stored as null)."""
+    with RosterWriter(base, fmt, chunk_rows, header) as w:
+        w.write(rows)
+    return w.rows, w.paths, w.bad_values
+
+
+def _arrow_batches(path: Path, fmt: str) -> Tuple[List[str], Iterator[Any]]:
+    pa = _pyarrow()
+    if pa is None:
+        raise RuntimeError(f"{path}: needs {missing_dependency(fmt)}")
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(str(path))
+        return list(pf.schema_arrow.names), pf.iter_batches(batch_size=BATCH_ROWS)
+    reader = pa.ipc.open_file(str(path))
+    return list(reader.schema.names), (reader.get_batch(i) for i in range(reader.num_record_batches))
+
+
+def _as_text(values: List[Any], raw: List[Optional[str]], kind: str) -> List[str]:
+    if kind == "date":
+        text = [v.isoformat() if v is not None else "" for v in values]
+    else:
+        text = ["" if v is None else ("Y" if v else "N") for v in values]
+    return [t if r is None else r for t, r in zip(text, raw)]
+
+
+def read_rows(path: Path) -> Tuple[List[str], Iterator[Sequence[str]]]:
+    """(header, rows) for one roster file of any format; rows are string sequences."""
+    fmt = format_of(path)
+    if fmt in ("parquet", "arrow"):
+        names, batches = _arrow_batches(path, fmt)
+        raw_names = {c + RAW_SUFFIX for c in names if _kind(c) != "str"}
+        header = [c for c in names if c not in raw_names]
+
+        def arrow_rows() -> Iterator[Sequence[str]]:
+            for batch in batches:
+                cols = []
+                for c in header:
+                    values = batch.column(c).to_pylist()
+                    if _kind(c) == "str":
+                        cols.append(["" if v is None else v for v in values])
+                    else:
+                        cols.append(_as_text(values, batch.column(c + RAW_SUFFIX).to_pylist(), _kind(c)))
+                yield from zip(*cols)
+
+        return header, arrow_rows()
+
+    f = open_text(path)
+    reader = csv.reader(f)
+    header = next(reader, [])
+
+    def csv_rows() -> Iterator[Sequence[str]]:
+        with f:
+            for row in reader:
+                if row:
+                    yield row
+
+    return header, csv_rows()
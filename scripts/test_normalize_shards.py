@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Parallel (sharded) normalization must match serial when a quoted field spans lines.
+
+  python3 -m unittest scripts/test_normalize_shards.py
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import normalize_state_data as nsd  # noqa: E402
+
+HEADER = [
+    "License Type",
+    "License Number",
+    "Full Name",
+    "Status",
+    "Original License Date",
+    "License Expiration Date",
+    "Related License Full Name",
+]
+
+
+class ShardTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = Path(tempfile.mkdtemp(prefix="shard-test-"))
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.input = self.dir / "tx.csv"
+        with self.input.open("w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(HEADER)
+            for i in range(400):
+                # Every 7th company is quoted over several lines, with "" escapes
+                # and commas, so some shard targets fall inside it.
+                company = f'KW "Realty"\n{i}, Suite\r\n"B"' if i % 7 == 0 else f"Compass {i}"
+                w.writerow(["Broker", str(100000 + i), f"SMITH, JOHN {i}", "Active", "1/2/2003", "06/30/2026", company])
+        self.plugin = nsd.REGISTRY["texas"]
+
+    def test_shards_start_on_record_boundaries(self) -> None:
+        data = self.input.read_bytes()
+        for shard_bytes in (1, 50, 97, 1000):
+            shards = nsd.plan_shards(self.input, shard_bytes)
+            self.assertGreater(len(shards), 1)
+            for a, b in shards:
+                # Each shard alone parses to whole records of the right width.
+                text = data[a:b].decode("utf-8")
+                rows = list(csv.reader(text.splitlines(keepends=True)))
+                self.assertTrue(all(len(r) == len(HEADER) for r in rows), (shard_bytes, a, b))
+
+    def test_parallel_matches_serial(self) -> None:
+        serial = list(nsd.iter_rows(self.plugin, self.input))
+        self.assertEqual(len(serial), 400)
+        self.assertEqual(serial[0][3], 'KW "Realty" 0, Suite "B"')
+        for shard_bytes in (1, 97, 1000):
+            sharded = [
+                row
+                for byte_range in nsd.plan_shards(self.input, shard_bytes)
+                for row in nsd.iter_rows(self.plugin, self.input, byte_range)
+            ]
+            self.assertEqual(sharded, serial, shard_bytes)
+
+    def test_run_parallel_output(self) -> None:
+        serial_out = self.dir / "serial.csv"
+        parallel_out = self.dir / "parallel.csv"
+        nsd.run_serial([(self.plugin, self.input, serial_out)])
+        nsd.run_parallel([(self.plugin, self.input, parallel_out)], workers=2, shard_bytes=500)
+        self.assertEqual(parallel_out.read_bytes(), serial_out.read_bytes())
+
+
+if __name__ == "__main__":
+    unittest.main()